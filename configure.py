@@ -11,8 +11,8 @@ import site
 from distutils.sysconfig import get_python_inc, get_python_lib
 import subprocess
 
-if sys.version_info[0] < 3:
-    sys.exit('ERROR: py3exiv2 requires Python ≥ 3.3')
+if sys.version_info < (3, 7):
+    sys.exit('ERROR: py3exiv2 requires Python ≥ 3.7')
 
 def show_help():
     help = """
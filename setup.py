@@ -54,9 +54,12 @@ if os.name == 'nt':
     libboost = basep + r"\lib\boost_python"+py_version+r"-vc140-mt"
     libexiv = basep + r"\lib\exiv2"
     extra_compile_args = []
+    extra_link_args = []
 else:
     libboost = get_libboost_name()
-    extra_compile_args = []
+    # The native batch reader runs a pool of std::thread
+    extra_compile_args = ['-pthread']
+    extra_link_args = ['-pthread']
     libexiv = 'exiv2'
 
 setup(
@@ -76,14 +79,11 @@ setup(
         'Topic :: Software Development',
         'License :: OSI Approved :: GNU General Public License v3 (GPLv3)',
         'Programming Language :: C++',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8'
     ],
     keywords='exiv2 pyexiv2 EXIF IPTC XMP image metadata',
+    python_requires='>=3.7',
     packages = find_packages('src'),
     package_dir = {'': 'src'},
     package_data={'':['src/*.cpp', 'src/*.hpp',]},
@@ -94,6 +94,7 @@ setup(
         include_dirs=[],
         library_dirs=[],
         libraries=[libboost, libexiv],
-        extra_compile_args=extra_compile_args)
+        extra_compile_args=extra_compile_args,
+        extra_link_args=extra_link_args)
     ],
 )
\ No newline at end of file
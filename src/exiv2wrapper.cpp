@@ -27,7 +27,21 @@
 #include "exiv2wrapper.hpp"
 
 #include "boost/python/stl_iterator.hpp"
+#include <algorithm>
+#include <atomic>
+#include <cstdio>
+#include <cstring>
 #include <fstream>
+#include <functional>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <new>
+#include <system_error>
+#include <thread>
+#include <unordered_map>
+#include <unordered_set>
+#include <vector>
 
 
 // Custom error codes for Exiv2 exceptions
@@ -38,6 +52,7 @@
 #define EXISTING_PREFIX 105
 #define BUILTIN_NS 106
 #define NOT_REGISTERED 107
+#define PREVIEW_NOT_AVAILABLE 108
 
 #if EXIV2_MAJOR_VERSION >= 1 || (EXIV2_MAJOR_VERSION == 0 && EXIV2_MINOR_VERSION >= 27)
 #define HAVE_EXIV2_ERROR_CODE
@@ -54,6 +69,134 @@
 namespace exiv2wrapper
 {
 
+// Return the type name of an EXIF datum, the same way ExifTag computes it.
+static std::string _exifTypeName(const Exiv2::Exifdatum& datum)
+{
+#if EXIV2_MAJOR_VERSION >= 1 || (EXIV2_MAJOR_VERSION == 0 && EXIV2_MINOR_VERSION >= 21)
+    Exiv2::ExifKey exifKey(datum.key());
+    const char* defaultTypeName = Exiv2::TypeInfo::typeName(exifKey.defaultTypeId());
+#else
+    const char* defaultTypeName = Exiv2::TypeInfo::typeName(
+        Exiv2::ExifTags::tagType(datum.tag(), datum.ifdId()));
+#endif
+    std::string type;
+    if (defaultTypeName != 0)
+    {
+        type = defaultTypeName;
+    }
+    // Where available, extract the type from the metadata, it is more reliable
+    // than static type information. The exception is for user comments, for
+    // which we’d rather keep the 'Comment' type instead of 'Undefined'.
+    if (type != "Comment")
+    {
+        const char* typeName = datum.typeName();
+        if (typeName != 0)
+        {
+            type = typeName;
+        }
+    }
+    return type;
+}
+
+// Helpers to read the value of an XMP datum as the python types expected by
+// pyexiv2.xmp.XmpTag.
+static std::string _xmpTextValue(const Exiv2::Xmpdatum& datum)
+{
+    return dynamic_cast<const Exiv2::XmpTextValue*>(&datum.value())->value_;
+}
+
+static boost::python::list _xmpArrayValue(const Exiv2::Xmpdatum& datum)
+{
+#ifdef HAVE_EXIV2_ERROR_CODE
+    // We can't use &_datum->value())->value_ because value_ is private in
+    // this context (change in libexiv2 0.27)
+    const Exiv2::XmpArrayValue* xav =
+            dynamic_cast<const Exiv2::XmpArrayValue*>(&datum.value());
+    boost::python::list rvalue;
+    for(int i = 0; i < xav->count(); ++i)
+    {
+        std::string value = xav->toString(i);
+        rvalue.append(value);
+    }
+    return rvalue;
+#else
+    std::vector<std::string> value =
+        dynamic_cast<const Exiv2::XmpArrayValue*>(&datum.value())->value_;
+    boost::python::list rvalue;
+    for(std::vector<std::string>::const_iterator i = value.begin();
+        i != value.end(); ++i)
+    {
+        rvalue.append(*i);
+    }
+    return rvalue;
+#endif
+}
+
+static boost::python::dict _xmpLangAltValue(const Exiv2::Xmpdatum& datum)
+{
+    Exiv2::LangAltValue::ValueType value =
+        dynamic_cast<const Exiv2::LangAltValue*>(&datum.value())->value_;
+    boost::python::dict rvalue;
+    for (Exiv2::LangAltValue::ValueType::const_iterator i = value.begin();
+         i != value.end(); ++i)
+    {
+        rvalue[i->first] = i->second;
+    }
+    return rvalue;
+}
+
+// Return the raw value of an XMP datum as a string, a list or a dict
+// depending on its Exiv2 type.
+static boost::python::object _xmpRawValue(const Exiv2::Xmpdatum& datum)
+{
+    switch (datum.typeId())
+    {
+        case Exiv2::xmpText:
+            return boost::python::object(_xmpTextValue(datum));
+        case Exiv2::xmpAlt:
+        case Exiv2::xmpBag:
+        case Exiv2::xmpSeq:
+            return _xmpArrayValue(datum);
+        case Exiv2::langAlt:
+            return _xmpLangAltValue(datum);
+        default:
+            return boost::python::object(datum.toString());
+    }
+}
+
+KeyProjection::KeyProjection(const boost::python::list& keys)
+{
+    for(boost::python::stl_input_iterator<std::string> iterator(keys);
+        iterator != boost::python::stl_input_iterator<std::string>();
+        ++iterator)
+    {
+        const std::string key = *iterator;
+        const std::string family = key.substr(0, key.find('.'));
+        if (family == "Exif")
+        {
+            _keys.push_back(std::make_pair(EXIF, Exiv2::ExifKey(key).key()));
+        }
+        else if (family == "Iptc")
+        {
+            _keys.push_back(std::make_pair(IPTC, Exiv2::IptcKey(key).key()));
+        }
+        else if (family == "Xmp")
+        {
+            _keys.push_back(std::make_pair(XMP, Exiv2::XmpKey(key).key()));
+        }
+        else
+#ifdef HAVE_EXIV2_ERROR_CODE
+        {
+            throw Exiv2::Error(Exiv2::kerInvalidKey, key);
+        }
+#else
+        {
+            throw Exiv2::Error(KEY_NOT_FOUND, key);
+        }
+#endif
+    }
+}
+
 void Image::_instantiate_image()
 {
     _exifThumbnail = 0;
@@ -94,6 +237,9 @@ void Image::_instantiate_image()
     {
         assert(_image.get() != 0);
         _dataRead = false;
+        _dropIndexes();
+        _pixelWidth = -1;
+        _pixelHeight = -1;
     }
     else
     {
@@ -110,39 +256,64 @@ Image::Image(const std::string& filename)
 }
 
 // From buffer constructor
-Image::Image(const std::string& buffer, unsigned long size)
+Image::Image(const boost::python::object& buffer, long size)
 {
-    // Deep copy of the data buffer
-    _data = new Exiv2::byte[size];
-    for (unsigned long i = 0; i < size; ++i)
+    _data = 0;
+    _acquireBuffer(buffer.ptr(), size);
+    try
     {
-        _data[i] = buffer[i];
+        _instantiate_image();
+    }
+    catch (...)
+    {
+        // The destructor won't be called.
+        PyBuffer_Release(&_buffer);
+        throw;
     }
-
-    _size = size;
-    _instantiate_image();
 }
 
 // Copy constructor
 Image::Image(const Image& image)
 {
     _filename = image._filename;
+    _data = 0;
+    if (image._data != 0)
+    {
+        // Share the memory of the python object the image is read from.
+        _acquireBuffer(image._buffer.obj, image._size);
+    }
     _instantiate_image();
 }
 
 Image::~Image()
 {
+    if (_exifThumbnail != 0)
+    {
+        delete _exifThumbnail;
+    }
     if (_data != 0)
     {
-        delete[] _data;
+        // The image must not outlive the memory it reads from.
+        _image.reset();
+        PyBuffer_Release(&_buffer);
     }
-    if (_exifThumbnail != 0)
+}
+
+void Image::_acquireBuffer(PyObject* object, long size)
+{
+    // Get a view on the memory of the python object instead of copying it.
+    // The view holds a reference to the object and, as long as it is not
+    // released, prevents it from being resized (e.g. a bytearray) or closed
+    // (e.g. a mmap).
+    if (PyObject_GetBuffer(object, &_buffer, PyBUF_SIMPLE) != 0)
     {
-        delete _exifThumbnail;
+        boost::python::throw_error_already_set();
     }
+    _data = (Exiv2::byte*) _buffer.buf;
+    _size = (size < _buffer.len) ? size : _buffer.len;
 }
 
-void Image::readMetadata()
+void Image::readMetadata(bool exif, bool iptc, bool xmp)
 {
     // If an exception is thrown, it has to be done outside of the
     // Py_{BEGIN,END}_ALLOW_THREADS block.
@@ -158,10 +329,29 @@ void Image::readMetadata()
 
     try
     {
-        _image->readMetadata();
+        _pixelWidth = -1;
+        _pixelHeight = -1;
+        if ((exif && iptc && xmp) || !_readJpegMetadata(exif, iptc, xmp))
+        {
+            _image->readMetadata();
+            if (!exif)
+            {
+                _image->clearExifData();
+            }
+            if (!iptc)
+            {
+                _image->clearIptcData();
+            }
+            if (!xmp)
+            {
+                _image->clearXmpData();
+                _image->clearXmpPacket();
+            }
+        }
         _exifData = &_image->exifData();
         _iptcData = &_image->iptcData();
         _xmpData = &_image->xmpData();
+        _dropIndexes();
         _dataRead = true;
     }
 
@@ -180,10 +370,20 @@ void Image::readMetadata()
     }
 }
 
-void Image::writeMetadata()
+void Image::pruneMetadata(const KeyProjection& keys,
+                          const boost::python::list& prefixes)
 {
     CHECK_METADATA_READ
 
+    std::unordered_set<std::string> keptKeys;
+    for (size_t k = 0; k < keys._keys.size(); ++k)
+    {
+        keptKeys.insert(keys._keys[k].second);
+    }
+    const std::vector<std::string> keptPrefixes(
+        (boost::python::stl_input_iterator<std::string>(prefixes)),
+        boost::python::stl_input_iterator<std::string>());
+
     // If an exception is thrown, it has to be done outside of the
     // Py_{BEGIN,END}_ALLOW_THREADS block.
 #ifdef HAVE_EXIV2_ERROR_CODE
@@ -191,170 +391,731 @@ void Image::writeMetadata()
 #else
     Exiv2::Error error(0);
 #endif
+    bool outOfMemory = false;
 
     // Release the GIL to allow other python threads to run
-    // while writing metadata.
+    // while pruning metadata.
     Py_BEGIN_ALLOW_THREADS
 
     try
     {
-        _image->writeMetadata();
+        std::function<bool(const std::string&)> kept =
+            [&](const std::string& key)
+        {
+            if (keptKeys.count(key) != 0)
+            {
+                return true;
+            }
+            for (size_t p = 0; p < keptPrefixes.size(); ++p)
+            {
+                if (key.compare(0, keptPrefixes[p].size(),
+                                keptPrefixes[p]) == 0)
+                {
+                    return true;
+                }
+            }
+            return false;
+        };
+
+        for (Exiv2::ExifMetadata::iterator i = _exifData->begin();
+             i != _exifData->end();)
+        {
+            if (kept(i->key()))
+            {
+                ++i;
+            }
+            else
+            {
+                i = _exifData->erase(i);
+            }
+        }
+
+        // The IPTC and XMP data are vectors, copy the tags kept rather than
+        // erasing the other ones one at a time.
+        Exiv2::IptcData iptcData;
+        for (Exiv2::IptcMetadata::const_iterator i = _iptcData->begin();
+             i != _iptcData->end(); ++i)
+        {
+            if (kept(i->key()))
+            {
+                iptcData.add(*i);
+            }
+        }
+        _image->setIptcData(iptcData);
+
+        Exiv2::XmpData xmpData;
+        for (Exiv2::XmpMetadata::const_iterator i = _xmpData->begin();
+             i != _xmpData->end(); ++i)
+        {
+            if (kept(i->key()))
+            {
+                xmpData.add(*i);
+            }
+        }
+        _image->setXmpData(xmpData);
+        _image->clearXmpPacket();
     }
 
-    catch (Exiv2::Error& err) 
+    catch (Exiv2::Error& err)
     {
-        //std::cout << "Caught Exiv2 exception '" << err.code() << "'\n";
         error = err;
     }
 
+    catch (std::bad_alloc&)
+    {
+        outOfMemory = true;
+    }
+
+    // The metadata may have been partially pruned.
+    _dropIndexes();
+
     // Re-acquire the GIL
     Py_END_ALLOW_THREADS
 
+    if (outOfMemory)
+    {
+        throw std::bad_alloc();
+    }
     if (error.code() != 0)
     {
         throw error;
     }
 }
 
-unsigned int Image::pixelWidth() const
-{
-    CHECK_METADATA_READ
-    return _image->pixelWidth();
-}
-
-unsigned int Image::pixelHeight() const
-{
-    CHECK_METADATA_READ
-    return _image->pixelHeight();
-}
-
-std::string Image::mimeType() const
-{
-    CHECK_METADATA_READ
-    return _image->mimeType();
-}
-
-boost::python::list Image::exifKeys()
+// Log a warning through Exiv2, the way it reports the metadata it fails to
+// decode.
+static void _warn(const char* message)
 {
-    CHECK_METADATA_READ
-
-    boost::python::list keys;
-    for(Exiv2::ExifMetadata::iterator i = _exifData->begin();
-        i != _exifData->end();
-        ++i)
+    if ((Exiv2::LogMsg::warn >= Exiv2::LogMsg::level()) &&
+        Exiv2::LogMsg::handler())
     {
-        keys.append(i->key());
+        Exiv2::LogMsg(Exiv2::LogMsg::warn).os() << message << "\n";
     }
-    return keys;
 }
 
-const ExifTag Image::getExifTag(std::string key)
+bool Image::_readJpegMetadata(bool exif, bool iptc, bool xmp)
 {
-    CHECK_METADATA_READ
-
-    Exiv2::ExifKey exifKey = Exiv2::ExifKey(key);
-
-    if(_exifData->findKey(exifKey) == _exifData->end())
-#ifdef HAVE_EXIV2_ERROR_CODE
-    {
-        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
-    }
-#else
+    if (_image->imageType() != Exiv2::ImageType::jpeg)
     {
-        throw Exiv2::Error(KEY_NOT_FOUND, key);
+        return false;
     }
-#endif
-
-    return ExifTag(key, &(*_exifData)[key], _exifData, _image->byteOrder());
-}
 
-void Image::deleteExifTag(std::string key)
-{
-    CHECK_METADATA_READ
+    static const char exifId[] = "Exif\0\0";
+    static const long exifIdSize = 6;
+    static const char xmpId[] = "http://ns.adobe.com/xap/1.0/\0";
+    static const long xmpIdSize = 29;
+    static const char psId[] = "Photoshop 3.0\0";
+    static const long psIdSize = 14;
 
-    Exiv2::ExifKey exifKey = Exiv2::ExifKey(key);
-    Exiv2::ExifMetadata::iterator datum = _exifData->findKey(exifKey);
-    if(datum == _exifData->end())
-#ifdef HAVE_EXIV2_ERROR_CODE
+    Exiv2::BasicIo& io = _image->io();
+    if (io.open() != 0)
     {
-        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
-    }
+#ifdef HAVE_EXIV2_ERROR_CODE
+        throw Exiv2::Error(Exiv2::kerDataSourceOpenFailed, io.path(), Exiv2::strError());
 #else
-    {
-        throw Exiv2::Error(KEY_NOT_FOUND, key);
-    }
+        throw Exiv2::Error(9, io.path(), Exiv2::strError());
 #endif
-    _exifData->erase(datum);
-}
-
-boost::python::list Image::iptcKeys()
-{
-    CHECK_METADATA_READ
-
-    boost::python::list keys;
-    for(Exiv2::IptcMetadata::iterator i = _iptcData->begin();
-        i != _iptcData->end();
-        ++i)
-    {
-        // The key is appended to the list if and only if it is not already
-        // present.
-        if (keys.count(i->key()) == 0)
-        {
-            keys.append(i->key());
-        }
     }
-    return keys;
-}
-
-const IptcTag Image::getIptcTag(std::string key)
-{
-    CHECK_METADATA_READ
-
-    Exiv2::IptcKey iptcKey = Exiv2::IptcKey(key);
+    Exiv2::IoCloser closer(io);
 
-    if(_iptcData->findKey(iptcKey) == _iptcData->end())
-#ifdef HAVE_EXIV2_ERROR_CODE
-    {
-        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
-    }
-#else
+    Exiv2::byte header[2];
+    if ((io.read(header, 2) != 2) || (header[0] != 0xff) || (header[1] != 0xd8))
     {
-        throw Exiv2::Error(KEY_NOT_FOUND, key);
+        return false;
     }
-#endif
-    return IptcTag(key, _iptcData);
-}
 
-void Image::deleteIptcTag(std::string key)
-{
-    CHECK_METADATA_READ
+    _image->clearMetadata();
+    _image->clearXmpPacket();
 
-    Exiv2::IptcKey iptcKey = Exiv2::IptcKey(key);
-    Exiv2::IptcMetadata::iterator dataIterator = _iptcData->findKey(iptcKey);
+    bool exifFound = false;
+    bool xmpFound = false;
+    bool commentFound = false;
+    std::string xmpPacket;
+    std::vector<Exiv2::byte> psData;
 
-    if (dataIterator == _iptcData->end())
-#ifdef HAVE_EXIV2_ERROR_CODE
-    {
-        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
-    }
-#else
+    // Walk the segments up to the start of the scan, only reading the ones
+    // of interest and skipping over the others.
+    for (;;)
     {
-        throw Exiv2::Error(KEY_NOT_FOUND, key);
-    }
-#endif
+        if (io.getb() != 0xff)
+        {
+            break;
+        }
+        int marker = io.getb();
+        while (marker == 0xff)
+        {
+            // Fill bytes
+            marker = io.getb();
+        }
+        if ((marker == EOF) || (marker == 0xd9) || (marker == 0xda))
+        {
+            // End of image or start of scan
+            break;
+        }
+        if ((marker == 0x01) || ((marker >= 0xd0) && (marker <= 0xd7)))
+        {
+            // Standalone markers
+            continue;
+        }
 
-    while (dataIterator != _iptcData->end())
-    {
-        if (dataIterator->key() == key)
+        Exiv2::byte length[2];
+        if (io.read(length, 2) != 2)
         {
-            dataIterator = _iptcData->erase(dataIterator);
+            break;
         }
-        else
+        const long size = ((length[0] << 8) | length[1]) - 2;
+        if (size < 0)
         {
-            ++dataIterator;
+            break;
         }
-    }
-}
+
+        const bool sof = (marker >= 0xc0) && (marker <= 0xcf) &&
+                         (marker != 0xc4) && (marker != 0xc8) && (marker != 0xcc);
+        if (!sof && (marker != 0xe1) && (marker != 0xed) && (marker != 0xfe))
+        {
+            if (io.seek(size, Exiv2::BasicIo::cur) != 0)
+            {
+                break;
+            }
+            continue;
+        }
+
+        Exiv2::DataBuf segment(size);
+        if (io.read(segment.pData_, size) != size)
+        {
+            break;
+        }
+        const char* data = (const char*) segment.pData_;
+
+        if (sof)
+        {
+            if ((_pixelWidth == -1) && (size >= 5))
+            {
+                _pixelHeight = (segment.pData_[1] << 8) | segment.pData_[2];
+                _pixelWidth = (segment.pData_[3] << 8) | segment.pData_[4];
+            }
+        }
+        else if (marker == 0xe1)
+        {
+            if (exif && !exifFound && (size >= exifIdSize) &&
+                (memcmp(data, exifId, exifIdSize) == 0))
+            {
+                Exiv2::ByteOrder byteOrder = Exiv2::ExifParser::decode(
+                    _image->exifData(), segment.pData_ + exifIdSize,
+                    size - exifIdSize);
+                _image->setByteOrder(byteOrder);
+                if ((size > exifIdSize) && (byteOrder == Exiv2::invalidByteOrder))
+                {
+                    // Like Exiv2 does, drop what may have been decoded.
+                    _warn("Failed to decode Exif metadata.");
+                    _image->exifData().clear();
+                }
+                exifFound = true;
+            }
+            else if (xmp && !xmpFound && (size >= xmpIdSize) &&
+                     (memcmp(data, xmpId, xmpIdSize) == 0))
+            {
+                xmpPacket.assign(data + xmpIdSize, size - xmpIdSize);
+                xmpFound = true;
+            }
+        }
+        else if (marker == 0xed)
+        {
+            // The Photoshop data may span several segments.
+            if (iptc && (size >= psIdSize) && (memcmp(data, psId, psIdSize) == 0))
+            {
+                psData.insert(psData.end(), segment.pData_ + psIdSize,
+                              segment.pData_ + size);
+            }
+        }
+        else if (!commentFound)
+        {
+            // Only the first comment is read, like Exiv2 does.
+            _image->setComment(std::string(data, size));
+            commentFound = true;
+        }
+    }
+
+    if (!psData.empty())
+    {
+        // Gather the IPTC data of all the IPTC resource blocks.
+        std::vector<Exiv2::byte> iptcData;
+        const Exiv2::byte* current = &psData[0];
+        const Exiv2::byte* end = current + psData.size();
+        const Exiv2::byte* record = 0;
+        uint32_t sizeHeader = 0;
+        uint32_t sizeIptc = 0;
+        while ((current < end) &&
+               (Exiv2::Photoshop::locateIptcIrb(current, end - current, &record,
+                                                &sizeHeader, &sizeIptc) == 0))
+        {
+            iptcData.insert(iptcData.end(), record + sizeHeader,
+                            record + sizeHeader + sizeIptc);
+            current = record + sizeHeader + sizeIptc + (sizeIptc & 1);
+        }
+        if (!iptcData.empty())
+        {
+            if (Exiv2::IptcParser::decode(_image->iptcData(), &iptcData[0],
+                                          iptcData.size()) != 0)
+            {
+                _warn("Failed to decode IPTC metadata.");
+                _image->iptcData().clear();
+            }
+        }
+    }
+
+    if (!xmpPacket.empty())
+    {
+        // Keep the packet as read, like Exiv2 does.
+        _image->xmpPacket() = xmpPacket;
+        initialiseXmpToolkit();
+        if (Exiv2::XmpParser::decode(_image->xmpData(), xmpPacket) != 0)
+        {
+            // The packet is kept, only the XMP data is dropped.
+            _warn("Failed to decode XMP metadata.");
+            _image->xmpData().clear();
+        }
+    }
+
+    return true;
+}
+
+void Image::writeMetadata()
+{
+    CHECK_METADATA_READ
+
+    // If an exception is thrown, it has to be done outside of the
+    // Py_{BEGIN,END}_ALLOW_THREADS block.
+#ifdef HAVE_EXIV2_ERROR_CODE
+    Exiv2::Error error = Exiv2::Error(Exiv2::kerSuccess);
+#else
+    Exiv2::Error error(0);
+#endif
+
+    // Release the GIL to allow other python threads to run
+    // while writing metadata.
+    Py_BEGIN_ALLOW_THREADS
+
+    try
+    {
+        _image->writeMetadata();
+        _dropIndexes();
+    }
+
+    catch (Exiv2::Error& err) 
+    {
+        //std::cout << "Caught Exiv2 exception '" << err.code() << "'\n";
+        error = err;
+    }
+
+    // Re-acquire the GIL
+    Py_END_ALLOW_THREADS
+
+    if (error.code() != 0)
+    {
+        throw error;
+    }
+}
+
+static boost::python::object _bytes(const Exiv2::byte* data, long size)
+{
+    return boost::python::object(boost::python::handle<>(
+        PyBytes_FromStringAndSize(reinterpret_cast<const char*>(data), size)));
+}
+
+boost::python::object Image::encodeExif(const boost::python::object& original)
+{
+    CHECK_METADATA_READ
+
+    // When it can keep the layout of the original data (e.g. the offsets
+    // a MakerNote relies on), the encoder updates it in place rather than
+    // building a new structure: work on a copy.
+    Exiv2::DataBuf data;
+    if (!original.is_none())
+    {
+        Py_buffer view;
+        if (PyObject_GetBuffer(original.ptr(), &view, PyBUF_SIMPLE) != 0)
+        {
+            boost::python::throw_error_already_set();
+        }
+        if (view.len > 0)
+        {
+            data.alloc(view.len);
+            std::memcpy(data.pData_, view.buf, view.len);
+        }
+        PyBuffer_Release(&view);
+    }
+
+    // If an exception is thrown, it has to be done outside of the
+    // Py_{BEGIN,END}_ALLOW_THREADS block.
+#ifdef HAVE_EXIV2_ERROR_CODE
+    Exiv2::Error error = Exiv2::Error(Exiv2::kerSuccess);
+#else
+    Exiv2::Error error(0);
+#endif
+
+    Exiv2::Blob blob;
+    Exiv2::WriteMethod method = Exiv2::wmIntrusive;
+    if (!_image->exifData().empty())
+    {
+        Exiv2::ByteOrder byteOrder = _image->byteOrder();
+        if (byteOrder == Exiv2::invalidByteOrder)
+        {
+            // Like Exiv2 does when writing an image without EXIF data.
+            byteOrder = Exiv2::littleEndian;
+        }
+
+        // Release the GIL to allow other python threads to run
+        // while encoding the metadata.
+        Py_BEGIN_ALLOW_THREADS
+
+        try
+        {
+            // Like the JPEG writer does, with the original data.
+            method = Exiv2::ExifParser::encode(
+                blob, data.pData_, static_cast<uint32_t>(data.size_),
+                byteOrder, _image->exifData());
+        }
+
+        catch (Exiv2::Error& err)
+        {
+            error = err;
+        }
+
+        // Re-acquire the GIL
+        Py_END_ALLOW_THREADS
+    }
+
+    if (error.code() != 0)
+    {
+        throw error;
+    }
+
+    if (method == Exiv2::wmNonIntrusive)
+    {
+        return _bytes(data.pData_, data.size_);
+    }
+    return _bytes(blob.empty() ? 0 : &blob[0], blob.size());
+}
+
+boost::python::object Image::encodeXmp()
+{
+    CHECK_METADATA_READ
+
+    std::string packet;
+    int result = 0;
+    if (!_image->xmpData().empty())
+    {
+        // Release the GIL to allow other python threads to run
+        // while serializing the metadata.
+        Py_BEGIN_ALLOW_THREADS
+        result = Exiv2::XmpParser::encode(packet, _image->xmpData(),
+            Exiv2::XmpParser::useCompactFormat |
+            Exiv2::XmpParser::omitAllFormatting);
+        Py_END_ALLOW_THREADS
+    }
+
+    if (result > 1)
+#ifdef HAVE_EXIV2_ERROR_CODE
+    {
+        throw Exiv2::Error(Exiv2::kerErrorMessage,
+                           "Failed to encode XMP metadata");
+    }
+#else
+    {
+        throw Exiv2::Error(1, "Failed to encode XMP metadata");
+    }
+#endif
+
+    return _bytes(reinterpret_cast<const Exiv2::byte*>(packet.data()),
+                  packet.size());
+}
+
+boost::python::object Image::encodeIptc(const boost::python::object& photoshop)
+{
+    CHECK_METADATA_READ
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(photoshop.ptr(), &view, PyBUF_SIMPLE) != 0)
+    {
+        boost::python::throw_error_already_set();
+    }
+    Exiv2::DataBuf data = Exiv2::Photoshop::setIptcIrb(
+        static_cast<const Exiv2::byte*>(view.buf), view.len,
+        _image->iptcData());
+    PyBuffer_Release(&view);
+
+    return _bytes(data.pData_, data.size_);
+}
+
+boost::python::object Image::encodeImage()
+{
+    CHECK_METADATA_READ
+
+    // If an exception is thrown, it has to be done outside of the
+    // Py_{BEGIN,END}_ALLOW_THREADS block.
+#ifdef HAVE_EXIV2_ERROR_CODE
+    Exiv2::Error error = Exiv2::Error(Exiv2::kerSuccess);
+#else
+    Exiv2::Error error(0);
+#endif
+
+    Exiv2::Image::AutoPtr target;
+
+    // Release the GIL to allow other python threads to run
+    // while writing the image data.
+    Py_BEGIN_ALLOW_THREADS
+
+    try
+    {
+        Exiv2::BasicIo& io = _image->io();
+        Exiv2::BasicIo::AutoPtr copy(new Exiv2::MemIo);
+        copy->open();
+
+        long pos = -1;
+        if (io.isopen())
+        {
+            pos = io.tell();
+            io.seek(0, Exiv2::BasicIo::beg);
+        }
+        else
+        {
+            io.open();
+        }
+        copy->write(io);
+        if (pos == -1)
+        {
+            io.close();
+        }
+        else
+        {
+            io.seek(pos, Exiv2::BasicIo::beg);
+        }
+
+        // Read the copy first, so that what is not exposed (e.g. an ICC
+        // profile) is written back as it is.
+        target = Exiv2::ImageFactory::open(copy);
+        target->readMetadata();
+        target->setExifData(*_exifData);
+        target->setIptcData(*_iptcData);
+        target->setXmpData(*_xmpData);
+        target->setComment(_image->comment());
+        target->writeMetadata();
+    }
+
+    catch (Exiv2::Error& err)
+    {
+        error = err;
+    }
+
+    // Re-acquire the GIL
+    Py_END_ALLOW_THREADS
+
+    if (error.code() != 0)
+    {
+        throw error;
+    }
+
+    Exiv2::BasicIo& io = target->io();
+    return _bytes(io.mmap(), io.size());
+}
+
+unsigned int Image::pixelWidth() const
+{
+    CHECK_METADATA_READ
+    if (_pixelWidth != -1)
+    {
+        return _pixelWidth;
+    }
+    return _image->pixelWidth();
+}
+
+unsigned int Image::pixelHeight() const
+{
+    CHECK_METADATA_READ
+    if (_pixelHeight != -1)
+    {
+        return _pixelHeight;
+    }
+    return _image->pixelHeight();
+}
+
+std::string Image::mimeType() const
+{
+    CHECK_METADATA_READ
+    return _image->mimeType();
+}
+
+std::string Image::probeMimeType() const
+{
+    // The format is detected when the image is opened.
+    return _image->mimeType();
+}
+
+boost::python::list Image::exifKeys()
+{
+    CHECK_METADATA_READ
+
+    boost::python::list keys;
+    for(Exiv2::ExifMetadata::iterator i = _exifData->begin();
+        i != _exifData->end();
+        ++i)
+    {
+        keys.append(i->key());
+    }
+    return keys;
+}
+
+bool Image::hasExifKey(std::string key)
+{
+    CHECK_METADATA_READ
+
+    try
+    {
+        return findExifDatum(Exiv2::ExifKey(key).key()) != 0;
+    }
+    catch (Exiv2::Error&)
+    {
+        // Not a valid key, hence not set.
+        return false;
+    }
+}
+
+const ExifTag Image::getExifTag(std::string key)
+{
+    CHECK_METADATA_READ
+
+    Exiv2::Exifdatum* datum = findExifDatum(Exiv2::ExifKey(key).key());
+
+    if(datum == 0)
+#ifdef HAVE_EXIV2_ERROR_CODE
+    {
+        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
+    }
+#else
+    {
+        throw Exiv2::Error(KEY_NOT_FOUND, key);
+    }
+#endif
+
+    return ExifTag(key, datum, _exifData, _image->byteOrder());
+}
+
+void Image::deleteExifTag(std::string key)
+{
+    CHECK_METADATA_READ
+
+    const std::string exifKey = Exiv2::ExifKey(key).key();
+    _indexExifData();
+    std::unordered_map<std::string, ExifIndexEntry>::iterator entry =
+        _exifIndex.find(exifKey);
+    if(entry == _exifIndex.end())
+#ifdef HAVE_EXIV2_ERROR_CODE
+    {
+        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
+    }
+#else
+    {
+        throw Exiv2::Error(KEY_NOT_FOUND, key);
+    }
+#endif
+    Exiv2::ExifMetadata::iterator next = _exifData->erase(entry->second.first);
+    if (--entry->second.count == 0)
+    {
+        _exifIndex.erase(entry);
+    }
+    else
+    {
+        // Move on to the next datum with the same key.
+        while (next->key() != exifKey)
+        {
+            ++next;
+        }
+        entry->second.first = next;
+    }
+}
+
+boost::python::list Image::iptcKeys()
+{
+    CHECK_METADATA_READ
+
+    boost::python::list keys;
+    std::unordered_set<std::string> seen;
+    for(Exiv2::IptcMetadata::iterator i = _iptcData->begin();
+        i != _iptcData->end();
+        ++i)
+    {
+        // The key is appended to the list if and only if it is not already
+        // present.
+        const std::string key = i->key();
+        if (seen.insert(key).second)
+        {
+            keys.append(key);
+        }
+    }
+    return keys;
+}
+
+bool Image::hasIptcKey(std::string key)
+{
+    CHECK_METADATA_READ
+
+    try
+    {
+        return findIptcPositions(Exiv2::IptcKey(key).key()) != 0;
+    }
+    catch (Exiv2::Error&)
+    {
+        // Not a valid key, hence not set.
+        return false;
+    }
+}
+
+const IptcTag Image::getIptcTag(std::string key)
+{
+    CHECK_METADATA_READ
+
+    if(findIptcPositions(Exiv2::IptcKey(key).key()) == 0)
+#ifdef HAVE_EXIV2_ERROR_CODE
+    {
+        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
+    }
+#else
+    {
+        throw Exiv2::Error(KEY_NOT_FOUND, key);
+    }
+#endif
+    return IptcTag(key, this);
+}
+
+void Image::deleteIptcTag(std::string key)
+{
+    CHECK_METADATA_READ
+
+    const std::vector<long>* positions =
+        findIptcPositions(Exiv2::IptcKey(key).key());
+
+    if (positions == 0)
+#ifdef HAVE_EXIV2_ERROR_CODE
+    {
+        throw Exiv2::Error(Exiv2::kerInvalidKey, key);
+    }
+#else
+    {
+        throw Exiv2::Error(KEY_NOT_FOUND, key);
+    }
+#endif
+
+    // The index is updated below, keep a copy of the positions.
+    const std::vector<long> erased(*positions);
+    // Erase from the last one, so that the positions stay valid.
+    for (std::vector<long>::const_reverse_iterator i = erased.rbegin();
+         i != erased.rend(); ++i)
+    {
+        _iptcData->erase(_iptcData->begin() + *i);
+    }
+    iptcDataErased(erased);
+}
 
 boost::python::list Image::xmpKeys()
 {
@@ -370,13 +1131,28 @@ boost::python::list Image::xmpKeys()
     return keys;
 }
 
+bool Image::hasXmpKey(std::string key)
+{
+    CHECK_METADATA_READ
+
+    try
+    {
+        return findXmpDatum(Exiv2::XmpKey(key).key()) != 0;
+    }
+    catch (Exiv2::Error&)
+    {
+        // Not a valid key (or an unregistered namespace), hence not set.
+        return false;
+    }
+}
+
 const XmpTag Image::getXmpTag(std::string key)
 {
     CHECK_METADATA_READ
 
-    Exiv2::XmpKey xmpKey = Exiv2::XmpKey(key);
+    Exiv2::Xmpdatum* datum = findXmpDatum(Exiv2::XmpKey(key).key());
 
-    if(_xmpData->findKey(xmpKey) == _xmpData->end())
+    if(datum == 0)
 #ifdef HAVE_EXIV2_ERROR_CODE
     {
         throw Exiv2::Error(Exiv2::kerInvalidKey, key);
@@ -387,18 +1163,31 @@ const XmpTag Image::getXmpTag(std::string key)
     }
 #endif
 
-    return XmpTag(key, &(*_xmpData)[key]);
+    return XmpTag(key, datum);
 }
 
 void Image::deleteXmpTag(std::string key)
 {
     CHECK_METADATA_READ
 
-    Exiv2::XmpKey xmpKey = Exiv2::XmpKey(key);
-    Exiv2::XmpMetadata::iterator i = _xmpData->findKey(xmpKey);
-    if(i != _xmpData->end())
-    {
-        _xmpData->erase(i);
+    const std::string xmpKey = Exiv2::XmpKey(key).key();
+    _indexXmpData();
+    std::unordered_map<std::string, long>::const_iterator entry =
+        _xmpIndex.find(xmpKey);
+    if(entry != _xmpIndex.end())
+    {
+        const long position = entry->second;
+        _xmpData->erase(_xmpData->begin() + position);
+        _xmpIndex.erase(entry);
+        // The following datums moved back by one.
+        for (std::unordered_map<std::string, long>::iterator i =
+                 _xmpIndex.begin(); i != _xmpIndex.end(); ++i)
+        {
+            if (i->second > position)
+            {
+                --i->second;
+            }
+        }
     }
     else
 #ifdef HAVE_EXIV2_ERROR_CODE
@@ -431,18 +1220,26 @@ void Image::clearComment()
 }
 
 
-boost::python::list Image::previews()
+boost::python::list Image::previews(const boost::python::object& self)
 {
-    CHECK_METADATA_READ
+    const Image& image = boost::python::extract<const Image&>(self);
+    if (!image._dataRead)
+    {
+#ifdef HAVE_EXIV2_ERROR_CODE
+        throw Exiv2::Error(Exiv2::kerErrorMessage, "metadata not read");
+#else
+        throw Exiv2::Error(METADATA_NOT_READ);
+#endif
+    }
 
     boost::python::list previews;
-    Exiv2::PreviewManager pm(*_image);
+    Exiv2::PreviewManager pm(*image._image);
     Exiv2::PreviewPropertiesList props = pm.getPreviewProperties();
     for (Exiv2::PreviewPropertiesList::const_iterator i = props.begin();
          i != props.end();
          ++i)
     {
-        previews.append(Preview(pm.getPreviewImage(*i)));
+        previews.append(Preview(self, *i));
     }
 
     return previews;
@@ -465,23 +1262,41 @@ void Image::copyMetadata(Image& other, bool exif, bool iptc, bool xmp) const
     }
 
     if (exif)
+    {
         other._image->setExifData(*_exifData);
+        other._exifIndexed = false;
+    }
     if (iptc)
+    {
         other._image->setIptcData(*_iptcData);
+        other._iptcIndexed = false;
+    }
     if (xmp)
+    {
         other._image->setXmpData(*_xmpData);
+        other._xmpIndexed = false;
+    }
 }
 
 boost::python::object Image::getDataBuffer() const
 {
-    std::string buffer;
+    Exiv2::BasicIo& io = _image->io();
+    const long size = io.size();
+
+    // Allocate the python object first and read the data straight into it,
+    // to avoid an intermediate copy.
+    PyObject* buffer = PyBytes_FromStringAndSize(NULL, size);
+    if (buffer == NULL)
+    {
+        boost::python::throw_error_already_set();
+    }
+    Exiv2::byte* data = (Exiv2::byte*) PyBytes_AS_STRING(buffer);
+    long total = 0;
 
     // Release the GIL to allow other python threads to run
     // while reading the image data.
     Py_BEGIN_ALLOW_THREADS
 
-    Exiv2::BasicIo& io = _image->io();
-    unsigned long size = io.size();
     long pos = -1;
 
     if (io.isopen())
@@ -496,17 +1311,15 @@ boost::python::object Image::getDataBuffer() const
         io.open();
     }
 
-    // Copy the data buffer in a string. Since the data buffer can contain null
-    // characters ('\x00'), the string cannot be simply constructed like that:
-    //     buffer = std::string((char*) previewImage.pData());
-    // because it would be truncated after the first occurence of a null
-    // character. Therefore, it has to be copied character by character.
-    // First allocate the memory for the whole string...
-    buffer.resize(size, ' ');
-    // ... then fill it with the raw data.
-    for (unsigned long i = 0; i < size; ++i)
+    // Read the data in as few calls as possible.
+    while (total < size)
     {
-        io.read((Exiv2::byte*) &buffer[i], 1);
+        const long count = io.read(data + total, size - total);
+        if (count <= 0)
+        {
+            break;
+        }
+        total += count;
     }
 
     if (pos == -1)
@@ -523,9 +1336,17 @@ boost::python::object Image::getDataBuffer() const
     // Re-acquire the GIL
     Py_END_ALLOW_THREADS
 
-    return boost::python::object(boost::python::handle<>(
-        PyBytes_FromStringAndSize(buffer.c_str(), buffer.size())
-        ));
+    if (total < size)
+    {
+        // The stream was shorter than announced, shrink the object
+        // accordingly.
+        if (_PyBytes_Resize(&buffer, total) != 0)
+        {
+            boost::python::throw_error_already_set();
+        }
+    }
+
+    return boost::python::object(boost::python::handle<>(buffer));
 }
 
 Exiv2::ByteOrder Image::getByteOrder() const
@@ -554,52 +1375,555 @@ const std::string Image::getExifThumbnailExtension()
     return std::string(_getExifThumbnail()->extension());
 }
 
-void Image::writeExifThumbnailToFile(const std::string& path)
+void Image::writeExifThumbnailToFile(const std::string& path)
+{
+    _getExifThumbnail()->writeFile(path);
+}
+
+boost::python::object Image::getExifThumbnailData()
+{
+    Exiv2::DataBuf buffer = _getExifThumbnail()->copy();
+    PyObject* data = PyBytes_FromStringAndSize((const char*) buffer.pData_,
+                                              buffer.size_);
+    if (data == NULL)
+    {
+        boost::python::throw_error_already_set();
+    }
+    return boost::python::object(boost::python::handle<>(data));
+}
+
+long Image::getExifThumbnailDataInto(const boost::python::object& buffer)
+{
+    Exiv2::DataBuf data = _getExifThumbnail()->copy();
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(buffer.ptr(), &view, PyBUF_WRITABLE) != 0)
+    {
+        boost::python::throw_error_already_set();
+    }
+    if (view.len < data.size_)
+    {
+        PyBuffer_Release(&view);
+        PyErr_SetString(PyExc_ValueError,
+                        "Buffer too small for the thumbnail data");
+        boost::python::throw_error_already_set();
+    }
+    if (data.size_ > 0)
+    {
+        memcpy(view.buf, data.pData_, data.size_);
+    }
+    PyBuffer_Release(&view);
+    return data.size_;
+}
+
+void Image::eraseExifThumbnail()
+{
+    _getExifThumbnail()->erase();
+    _exifIndexed = false;
+}
+
+void Image::setExifThumbnailFromFile(const std::string& path)
+{
+    _getExifThumbnail()->setJpegThumbnail(path);
+    _exifIndexed = false;
+}
+
+void Image::setExifThumbnailFromData(const std::string& data)
+{
+    const Exiv2::byte* buffer = (const Exiv2::byte*) data.c_str();
+    _getExifThumbnail()->setJpegThumbnail(buffer, data.size());
+    _exifIndexed = false;
+}
+
+void Image::_indexExifData()
+{
+    if (_exifIndexed)
+    {
+        return;
+    }
+    _exifIndex.clear();
+    for (Exiv2::ExifMetadata::iterator i = _exifData->begin();
+         i != _exifData->end(); ++i)
+    {
+        ExifIndexEntry& entry = _exifIndex[i->key()];
+        if (entry.count++ == 0)
+        {
+            entry.first = i;
+        }
+    }
+    _exifIndexed = true;
+}
+
+void Image::_indexIptcData()
+{
+    if (_iptcIndexed)
+    {
+        return;
+    }
+    _iptcIndex.clear();
+    long position = 0;
+    for (Exiv2::IptcMetadata::iterator i = _iptcData->begin();
+         i != _iptcData->end(); ++i, ++position)
+    {
+        _iptcIndex[i->key()].push_back(position);
+    }
+    _iptcIndexed = true;
+}
+
+void Image::_indexXmpData()
+{
+    if (_xmpIndexed)
+    {
+        return;
+    }
+    _xmpIndex.clear();
+    long position = 0;
+    for (Exiv2::XmpMetadata::iterator i = _xmpData->begin();
+         i != _xmpData->end(); ++i, ++position)
+    {
+        // Only the first datum for a key is reachable.
+        _xmpIndex.insert(std::make_pair(i->key(), position));
+    }
+    _xmpIndexed = true;
+}
+
+void Image::_dropIndexes()
+{
+    _exifIndexed = false;
+    _iptcIndexed = false;
+    _xmpIndexed = false;
+    _exifIndex.clear();
+    _iptcIndex.clear();
+    _xmpIndex.clear();
+}
+
+Exiv2::Exifdatum* Image::findExifDatum(const std::string& key)
+{
+    _indexExifData();
+    std::unordered_map<std::string, ExifIndexEntry>::const_iterator entry =
+        _exifIndex.find(key);
+    if (entry == _exifIndex.end())
+    {
+        return 0;
+    }
+    return &(*entry->second.first);
+}
+
+Exiv2::Exifdatum& Image::exifDatum(const std::string& key)
+{
+    Exiv2::Exifdatum* datum = findExifDatum(key);
+    if (datum != 0)
+    {
+        return *datum;
+    }
+    // The datum is appended to the list.
+    _exifData->add(Exiv2::Exifdatum(Exiv2::ExifKey(key)));
+    ExifIndexEntry& entry = _exifIndex[key];
+    entry.first = --_exifData->end();
+    entry.count = 1;
+    return *entry.first;
+}
+
+const std::vector<long>* Image::findIptcPositions(const std::string& key)
+{
+    _indexIptcData();
+    std::unordered_map<std::string, std::vector<long> >::const_iterator entry =
+        _iptcIndex.find(key);
+    if (entry == _iptcIndex.end())
+    {
+        return 0;
+    }
+    return &entry->second;
+}
+
+void Image::iptcDatumAdded(const std::string& key)
+{
+    if (_iptcIndexed)
+    {
+        // Datums are appended to the vector.
+        _iptcIndex[key].push_back((_iptcData->end() - _iptcData->begin()) - 1);
+    }
+}
+
+void Image::iptcDataErased(const std::vector<long>& erased)
+{
+    if (!_iptcIndexed || erased.empty())
+    {
+        return;
+    }
+    // Drop the positions erased and move the other ones back by the number
+    // of datums erased before them.
+    std::unordered_map<std::string, std::vector<long> >::iterator entry =
+        _iptcIndex.begin();
+    while (entry != _iptcIndex.end())
+    {
+        std::vector<long>& positions = entry->second;
+        size_t kept = 0;
+        for (size_t i = 0; i < positions.size(); ++i)
+        {
+            const long position = positions[i];
+            const std::vector<long>::const_iterator bound =
+                std::lower_bound(erased.begin(), erased.end(), position);
+            if (bound != erased.end() && *bound == position)
+            {
+                continue;
+            }
+            positions[kept++] = position - (bound - erased.begin());
+        }
+        positions.resize(kept);
+        if (kept == 0)
+        {
+            entry = _iptcIndex.erase(entry);
+        }
+        else
+        {
+            ++entry;
+        }
+    }
+}
+
+Exiv2::Xmpdatum* Image::findXmpDatum(const std::string& key)
+{
+    _indexXmpData();
+    std::unordered_map<std::string, long>::const_iterator entry =
+        _xmpIndex.find(key);
+    if (entry == _xmpIndex.end())
+    {
+        return 0;
+    }
+    return &(*(_xmpData->begin() + entry->second));
+}
+
+Exiv2::Xmpdatum& Image::xmpDatum(const std::string& key)
+{
+    Exiv2::Xmpdatum* datum = findXmpDatum(key);
+    if (datum != 0)
+    {
+        return *datum;
+    }
+    // The datum is appended to the vector.
+    _xmpData->add(Exiv2::Xmpdatum(Exiv2::XmpKey(key)));
+    const long position = (_xmpData->end() - _xmpData->begin()) - 1;
+    _xmpIndex[key] = position;
+    return *(_xmpData->begin() + position);
+}
+
+const std::string Image::getIptcCharset() const
+{
+    CHECK_METADATA_READ
+    const char* charset = _iptcData->detectCharset();
+    if (charset != 0)
+    {
+        return std::string(charset);
+    }
+    else
+    {
+        return std::string();
+    }
+}
+
+boost::python::list Image::getMany(const KeyProjection& projection, bool raw)
+{
+    CHECK_METADATA_READ
+
+    boost::python::list result;
+    for (size_t k = 0; k < projection._keys.size(); ++k)
+    {
+        const std::string& key = projection._keys[k].second;
+        switch (projection._keys[k].first)
+        {
+            case KeyProjection::EXIF:
+            {
+                Exiv2::Exifdatum* datum = findExifDatum(key);
+                if (datum == 0)
+                {
+                    result.append(boost::python::object());
+                }
+                else if (raw)
+                {
+                    result.append(datum->toString());
+                }
+                else
+                {
+                    result.append(ExifTag(key, datum, _exifData,
+                                          _image->byteOrder()));
+                }
+                break;
+            }
+            case KeyProjection::IPTC:
+            {
+                const std::vector<long>* positions = findIptcPositions(key);
+                if (positions == 0)
+                {
+                    result.append(boost::python::object());
+                }
+                else if (raw)
+                {
+                    boost::python::list values;
+                    for (std::vector<long>::const_iterator i = positions->begin();
+                         i != positions->end(); ++i)
+                    {
+                        values.append((_iptcData->begin() + *i)->toString());
+                    }
+                    result.append(values);
+                }
+                else
+                {
+                    result.append(IptcTag(key, this));
+                }
+                break;
+            }
+            case KeyProjection::XMP:
+            {
+                Exiv2::Xmpdatum* datum = findXmpDatum(key);
+                if (datum == 0)
+                {
+                    result.append(boost::python::object());
+                }
+                else if (raw)
+                {
+                    result.append(_xmpRawValue(*datum));
+                }
+                else
+                {
+                    result.append(XmpTag(key, datum));
+                }
+                break;
+            }
+        }
+    }
+    return result;
+}
+
+boost::python::dict Image::snapshot(const boost::python::list& families)
+{
+    CHECK_METADATA_READ
+
+    bool exif = false;
+    bool iptc = false;
+    bool xmp = false;
+    for(boost::python::stl_input_iterator<std::string> iterator(families);
+        iterator != boost::python::stl_input_iterator<std::string>();
+        ++iterator)
+    {
+        if (*iterator == "exif")
+            exif = true;
+        else if (*iterator == "iptc")
+            iptc = true;
+        else if (*iterator == "xmp")
+            xmp = true;
+    }
+
+    boost::python::dict snapshot;
+
+    if (exif)
+    {
+        for(Exiv2::ExifMetadata::const_iterator i = _exifData->begin();
+            i != _exifData->end(); ++i)
+        {
+            snapshot[i->key()] = boost::python::make_tuple(_exifTypeName(*i),
+                                                           i->toString());
+        }
+    }
+
+    if (iptc)
+    {
+        // Repeatable IPTC tags are stored as several data, gather all their
+        // values in one list per key.
+        std::map<std::string, boost::python::list> values;
+        for(Exiv2::IptcMetadata::const_iterator i = _iptcData->begin();
+            i != _iptcData->end(); ++i)
+        {
+            const std::string key = i->key();
+            std::map<std::string, boost::python::list>::iterator found =
+                values.find(key);
+            if (found == values.end())
+            {
+                const char* typeName = Exiv2::TypeInfo::typeName(
+                    Exiv2::IptcDataSets::dataSetType(i->tag(), i->record()));
+                found = values.insert(std::make_pair(key,
+                                                     boost::python::list())).first;
+                snapshot[key] = boost::python::make_tuple(
+                    std::string(typeName != 0 ? typeName : ""), found->second);
+            }
+            found->second.append(i->toString());
+        }
+    }
+
+    if (xmp)
+    {
+        for(Exiv2::XmpMetadata::const_iterator i = _xmpData->begin();
+            i != _xmpData->end(); ++i)
+        {
+            std::string type;
+            const Exiv2::XmpPropertyInfo* info =
+                Exiv2::XmpProperties::propertyInfo(Exiv2::XmpKey(i->key()));
+            if (info != 0)
+            {
+                type = info->xmpValueType_;
+            }
+            snapshot[i->key()] = boost::python::make_tuple(type,
+                                                           _xmpRawValue(*i));
+        }
+    }
+
+    return snapshot;
+}
+
+
+// The descriptive information of an EXIF tag.
+struct ExifTagInfo
+{
+    explicit ExifTagInfo(const Exiv2::ExifKey& key);
+
+    std::string name;
+    std::string label;
+    std::string description;
+    std::string sectionName;
+    std::string sectionDescription;
+};
+
+ExifTagInfo::ExifTagInfo(const Exiv2::ExifKey& key)
+{
+// Conditional code, exiv2 0.21 changed APIs we need
+// (see https://bugs.launchpad.net/pyexiv2/+bug/684177).
+#if EXIV2_MAJOR_VERSION >= 1 || (EXIV2_MAJOR_VERSION == 0 && EXIV2_MINOR_VERSION >= 21)
+    name = key.tagName();
+    label = key.tagLabel();
+    description = key.tagDesc();
+    sectionName = Exiv2::ExifTags::sectionName(key);
+    // The section description is not exposed in the API any longer
+    // (see http://dev.exiv2.org/issues/744). For want of anything better,
+    // fall back on the section’s name.
+    sectionDescription = sectionName;
+#else
+    const uint16_t tag = key.tag();
+    const Exiv2::IfdId ifd = key.ifdId();
+    name = Exiv2::ExifTags::tagName(tag, ifd);
+    label = Exiv2::ExifTags::tagLabel(tag, ifd);
+    description = Exiv2::ExifTags::tagDesc(tag, ifd);
+    sectionName = Exiv2::ExifTags::sectionName(tag, ifd);
+    sectionDescription = Exiv2::ExifTags::sectionDesc(tag, ifd);
+#endif
+}
+
+// The descriptive information of an IPTC tag.
+struct IptcTagInfo
+{
+    explicit IptcTagInfo(const Exiv2::IptcKey& key);
+
+    std::string type;
+    std::string name;
+    std::string title;
+    std::string description;
+    std::string photoshopName;
+    bool repeatable;
+    std::string recordName;
+    std::string recordDescription;
+};
+
+IptcTagInfo::IptcTagInfo(const Exiv2::IptcKey& key)
+{
+    const uint16_t tag = key.tag();
+    const uint16_t record = key.record();
+    type = Exiv2::TypeInfo::typeName(Exiv2::IptcDataSets::dataSetType(tag, record));
+    name = Exiv2::IptcDataSets::dataSetName(tag, record);
+    title = Exiv2::IptcDataSets::dataSetTitle(tag, record);
+    description = Exiv2::IptcDataSets::dataSetDesc(tag, record);
+    // What is the photoshop name anyway? Where is it used?
+    photoshopName = Exiv2::IptcDataSets::dataSetPsName(tag, record);
+    repeatable = Exiv2::IptcDataSets::dataSetRepeatable(tag, record);
+    recordName = Exiv2::IptcDataSets::recordName(record);
+    recordDescription = Exiv2::IptcDataSets::recordDesc(record);
+}
+
+// The descriptive information of an XMP tag.
+struct XmpTagInfo
+{
+    explicit XmpTagInfo(const Exiv2::XmpKey& key);
+
+    std::string type;
+    std::string name;
+    std::string title;
+    std::string description;
+};
+
+XmpTagInfo::XmpTagInfo(const Exiv2::XmpKey& key)
+{
+    const char* propertyTitle = Exiv2::XmpProperties::propertyTitle(key);
+    if (propertyTitle != 0)
+    {
+        title = propertyTitle;
+    }
+
+    const char* propertyDescription = Exiv2::XmpProperties::propertyDesc(key);
+    if (propertyDescription != 0)
+    {
+        description = propertyDescription;
+    }
+
+    const Exiv2::XmpPropertyInfo* info = Exiv2::XmpProperties::propertyInfo(key);
+    if (info != 0)
+    {
+        name = info->name_;
+        type = info->xmpValueType_;
+    }
+}
+
+// A process-wide catalog of the descriptive information of the tags of a
+// family, computed once per key and shared by all the tags with that key.
+template <typename Info>
+class TagInfoCatalog
 {
-    _getExifThumbnail()->writeFile(path);
-}
+public:
+    typedef std::shared_ptr<const Info> InfoPtr;
 
-boost::python::list Image::getExifThumbnailData()
-{
-    Exiv2::DataBuf buffer = _getExifThumbnail()->copy();
-    // Copy the data buffer in a list.
-    boost::python::list data;
-    for(unsigned int i = 0; i < buffer.size_; ++i)
+    template <typename Key>
+    InfoPtr get(const Key& key)
     {
-        unsigned int datum = buffer.pData_[i];
-        data.append(datum);
+        const std::string name = key.key();
+        std::lock_guard<std::mutex> lock(_mutex);
+        typename std::unordered_map<std::string, InfoPtr>::const_iterator i =
+            _infos.find(name);
+        if (i != _infos.end())
+        {
+            return i->second;
+        }
+        InfoPtr info(new Info(key));
+        _infos[name] = info;
+        return info;
     }
-    return data;
-}
 
-void Image::eraseExifThumbnail()
-{
-    _getExifThumbnail()->erase();
-}
+    // Forget all the information, the tags already holding some keep it.
+    void clear()
+    {
+        std::lock_guard<std::mutex> lock(_mutex);
+        _infos.clear();
+    }
 
-void Image::setExifThumbnailFromFile(const std::string& path)
+private:
+    std::mutex _mutex;
+    std::unordered_map<std::string, InfoPtr> _infos;
+};
+
+static TagInfoCatalog<ExifTagInfo>& _exifTagInfos()
 {
-    _getExifThumbnail()->setJpegThumbnail(path);
+    static TagInfoCatalog<ExifTagInfo> catalog;
+    return catalog;
 }
 
-void Image::setExifThumbnailFromData(const std::string& data)
+static TagInfoCatalog<IptcTagInfo>& _iptcTagInfos()
 {
-    const Exiv2::byte* buffer = (const Exiv2::byte*) data.c_str();
-    _getExifThumbnail()->setJpegThumbnail(buffer, data.size());
+    static TagInfoCatalog<IptcTagInfo> catalog;
+    return catalog;
 }
 
-const std::string Image::getIptcCharset() const
+// Custom namespaces change the information of the XMP tags, the catalog is
+// cleared whenever one is registered or unregistered.
+static TagInfoCatalog<XmpTagInfo>& _xmpTagInfos()
 {
-    CHECK_METADATA_READ
-    const char* charset = _iptcData->detectCharset();
-    if (charset != 0)
-    {
-        return std::string(charset);
-    }
-    else
-    {
-        return std::string();
-    }
+    static TagInfoCatalog<XmpTagInfo> catalog;
+    return catalog;
 }
 
 
@@ -622,8 +1946,10 @@ ExifTag::ExifTag(const std::string& key,
 // Conditional code, exiv2 0.21 changed APIs we need
 // (see https://bugs.launchpad.net/pyexiv2/+bug/684177).
 #if EXIV2_MAJOR_VERSION >= 1 || (EXIV2_MAJOR_VERSION == 0 && EXIV2_MINOR_VERSION >= 21)
-    Exiv2::ExifKey exifKey(key);
-    _type = Exiv2::TypeInfo::typeName(exifKey.defaultTypeId());
+    _type = Exiv2::TypeInfo::typeName(_key.defaultTypeId());
+#else
+    _type = Exiv2::TypeInfo::typeName(Exiv2::ExifTags::tagType(_key.tag(), _key.ifdId()));
+#endif
     // Where available, extract the type from the metadata, it is more reliable
     // than static type information. The exception is for user comments, for
     // which we’d rather keep the 'Comment' type instead of 'Undefined'.
@@ -635,35 +1961,16 @@ ExifTag::ExifTag(const std::string& key,
             _type = typeName;
         }
     }
-    _name = exifKey.tagName();
-    _label = exifKey.tagLabel();
-    _description = exifKey.tagDesc();
-    _sectionName = Exiv2::ExifTags::sectionName(exifKey);
-    // The section description is not exposed in the API any longer
-    // (see http://dev.exiv2.org/issues/744). For want of anything better,
-    // fall back on the section’s name.
-    _sectionDescription = _sectionName;
-#else
-    const uint16_t tag = _datum->tag();
-    const Exiv2::IfdId ifd = _datum->ifdId();
-    _type = Exiv2::TypeInfo::typeName(Exiv2::ExifTags::tagType(tag, ifd));
-    // Where available, extract the type from the metadata, it is more reliable
-    // than static type information. The exception is for user comments, for
-    // which we’d rather keep the 'Comment' type instead of 'Undefined'.
-    if ((_data != 0) && (_type != "Comment"))
+    // The descriptive information is only looked up when needed.
+}
+
+const ExifTagInfo& ExifTag::_getInfo()
+{
+    if (!_info)
     {
-        const char* typeName = _datum->typeName();
-        if (typeName != 0)
-        {
-            _type = typeName;
-        }
+        _info = _exifTagInfos().get(_key);
     }
-    _name = Exiv2::ExifTags::tagName(tag, ifd);
-    _label = Exiv2::ExifTags::tagLabel(tag, ifd);
-    _description = Exiv2::ExifTags::tagDesc(tag, ifd);
-    _sectionName = Exiv2::ExifTags::sectionName(tag, ifd);
-    _sectionDescription = Exiv2::ExifTags::sectionDesc(tag, ifd);
-#endif
+    return *_info;
 }
 
 ExifTag::~ExifTag()
@@ -701,10 +2008,14 @@ void ExifTag::setParentImage(Image& image)
         // anything (see https://bugs.launchpad.net/pyexiv2/+bug/622739).
         return;
     }
-    _data = data;
     Exiv2::Value::AutoPtr value = _datum->getValue();
-    delete _datum;
-    _datum = &(*_data)[_key.key()];
+    if (_data == 0)
+    {
+        // Only a tag that doesn't belong to an image owns its datum.
+        delete _datum;
+    }
+    _data = data;
+    _datum = &image.exifDatum(_key.key());
     _datum->setValue(value.get());
 
     _byteOrder = image.getByteOrder();
@@ -722,27 +2033,27 @@ const std::string ExifTag::getType()
 
 const std::string ExifTag::getName()
 {
-    return _name;
+    return _getInfo().name;
 }
 
 const std::string ExifTag::getLabel()
 {
-    return _label;
+    return _getInfo().label;
 }
 
 const std::string ExifTag::getDescription()
 {
-    return _description;
+    return _getInfo().description;
 }
 
 const std::string ExifTag::getSectionName()
 {
-    return _sectionName;
+    return _getInfo().sectionName;
 }
 
 const std::string ExifTag::getSectionDescription()
 {
-    return _sectionDescription;
+    return _getInfo().sectionDescription;
 }
 
 const std::string ExifTag::getRawValue()
@@ -760,14 +2071,249 @@ int ExifTag::getByteOrder()
     return _byteOrder;
 }
 
+// Pack the values of a value of type ValueType<T> in a bytes object, return 0
+// if the value is of another type.
+template <typename T>
+static PyObject* _packValues(const Exiv2::Value& value)
+{
+    const Exiv2::ValueType<T>* typed =
+        dynamic_cast<const Exiv2::ValueType<T>*>(&value);
+    if (typed == 0)
+    {
+        return 0;
+    }
+    const std::vector<T>& values = typed->value_;
+    return PyBytes_FromStringAndSize(
+        values.empty() ? 0 : reinterpret_cast<const char*>(&values[0]),
+        values.size() * sizeof(T));
+}
+
+// Pack the numerators and denominators of a value of type ValueType<R> in a
+// bytes object, return 0 if the value is of another type.
+template <typename R, typename T>
+static PyObject* _packRationals(const Exiv2::Value& value)
+{
+    const Exiv2::ValueType<R>* typed =
+        dynamic_cast<const Exiv2::ValueType<R>*>(&value);
+    if (typed == 0)
+    {
+        return 0;
+    }
+    std::vector<T> values;
+    values.reserve(2 * typed->value_.size());
+    for (typename std::vector<R>::const_iterator i = typed->value_.begin();
+         i != typed->value_.end(); ++i)
+    {
+        values.push_back(i->first);
+        values.push_back(i->second);
+    }
+    return PyBytes_FromStringAndSize(
+        values.empty() ? 0 : reinterpret_cast<const char*>(&values[0]),
+        values.size() * sizeof(T));
+}
+
+// Build a value of type ValueType<T> from packed values.
+template <typename T>
+static Exiv2::Value::AutoPtr _unpackValues(const char* data, size_t size)
+{
+    Exiv2::ValueType<T>* typed = new Exiv2::ValueType<T>();
+    Exiv2::Value::AutoPtr value(typed);
+    typed->value_.resize(size / sizeof(T));
+    if (!typed->value_.empty())
+    {
+        std::memcpy(&typed->value_[0], data, typed->value_.size() * sizeof(T));
+    }
+    return value;
+}
+
+// Build a value of type ValueType<R> from packed numerators and denominators.
+template <typename R, typename T>
+static Exiv2::Value::AutoPtr _unpackRationals(const char* data, size_t size)
+{
+    std::vector<T> values(size / sizeof(T));
+    if (!values.empty())
+    {
+        std::memcpy(&values[0], data, values.size() * sizeof(T));
+    }
+    Exiv2::ValueType<R>* typed = new Exiv2::ValueType<R>();
+    Exiv2::Value::AutoPtr value(typed);
+    typed->value_.reserve(values.size() / 2);
+    for (size_t i = 0; i + 1 < values.size(); i += 2)
+    {
+        typed->value_.push_back(R(values[i], values[i + 1]));
+    }
+    return value;
+}
+
+boost::python::object ExifTag::getArrayValue()
+{
+    if (_datum->count() == 0)
+    {
+        // No value set yet.
+        return boost::python::make_tuple(_type, boost::python::handle<>(
+            PyBytes_FromStringAndSize(0, 0)));
+    }
+
+    const Exiv2::Value& value = _datum->value();
+    PyObject* packed = 0;
+    switch (value.typeId())
+    {
+        case Exiv2::unsignedShort:
+            packed = _packValues<uint16_t>(value);
+            break;
+        case Exiv2::signedShort:
+            packed = _packValues<int16_t>(value);
+            break;
+        case Exiv2::unsignedLong:
+            packed = _packValues<uint32_t>(value);
+            break;
+        case Exiv2::signedLong:
+            packed = _packValues<int32_t>(value);
+            break;
+        case Exiv2::unsignedRational:
+            packed = _packRationals<Exiv2::URational, uint32_t>(value);
+            break;
+        case Exiv2::signedRational:
+            packed = _packRationals<Exiv2::Rational, int32_t>(value);
+            break;
+        default:
+            break;
+    }
+    if (packed == 0)
+    {
+        return boost::python::object();
+    }
+    return boost::python::make_tuple(
+        std::string(Exiv2::TypeInfo::typeName(value.typeId())),
+        boost::python::handle<>(packed));
+}
+
+void ExifTag::setArrayValue(const boost::python::object& buffer)
+{
+    Py_buffer view;
+    if (PyObject_GetBuffer(buffer.ptr(), &view, PyBUF_SIMPLE) != 0)
+    {
+        boost::python::throw_error_already_set();
+    }
+    const char* data = static_cast<const char*>(view.buf);
+    const size_t size = view.len;
+
+    Exiv2::Value::AutoPtr value;
+    size_t itemSize = 0;
+    switch (Exiv2::TypeInfo::typeId(_type))
+    {
+        case Exiv2::unsignedShort:
+            value = _unpackValues<uint16_t>(data, size);
+            itemSize = sizeof(uint16_t);
+            break;
+        case Exiv2::signedShort:
+            value = _unpackValues<int16_t>(data, size);
+            itemSize = sizeof(int16_t);
+            break;
+        case Exiv2::unsignedLong:
+            value = _unpackValues<uint32_t>(data, size);
+            itemSize = sizeof(uint32_t);
+            break;
+        case Exiv2::signedLong:
+            value = _unpackValues<int32_t>(data, size);
+            itemSize = sizeof(int32_t);
+            break;
+        case Exiv2::unsignedRational:
+            value = _unpackRationals<Exiv2::URational, uint32_t>(data, size);
+            itemSize = 2 * sizeof(uint32_t);
+            break;
+        case Exiv2::signedRational:
+            value = _unpackRationals<Exiv2::Rational, int32_t>(data, size);
+            itemSize = 2 * sizeof(int32_t);
+            break;
+        default:
+            break;
+    }
+    PyBuffer_Release(&view);
+
+    if (value.get() == 0 || size % itemSize != 0)
+#ifdef HAVE_EXIV2_ERROR_CODE
+    {
+        std::string message("Invalid array value for type: ");
+        message += _type;
+        throw Exiv2::Error(Exiv2::kerInvalidDataset, message);
+    }
+#else
+    {
+        throw Exiv2::Error(INVALID_VALUE);
+    }
+#endif
+    _datum->setValue(value.get());
+}
+
+// Whether the values of type typeId are a plain sequence of bytes.
+static bool _isBytesType(Exiv2::TypeId typeId)
+{
+    return typeId == Exiv2::undefined || typeId == Exiv2::unsignedByte ||
+           typeId == Exiv2::signedByte;
+}
+
+boost::python::object ExifTag::getBytesValue()
+{
+    if (_datum->count() == 0)
+    {
+        // No value set yet.
+        return boost::python::object(boost::python::handle<>(
+            PyBytes_FromStringAndSize(0, 0)));
+    }
+
+    const Exiv2::Value& value = _datum->value();
+    if (!_isBytesType(value.typeId()))
+    {
+        return boost::python::object();
+    }
+    // Copy the value straight into the memory of the bytes object.
+    const long size = value.size();
+    boost::python::handle<> bytes(PyBytes_FromStringAndSize(0, size));
+    if (size > 0)
+    {
+        value.copy(reinterpret_cast<Exiv2::byte*>(
+            PyBytes_AS_STRING(bytes.get())), Exiv2::invalidByteOrder);
+    }
+    return boost::python::object(bytes);
+}
+
+void ExifTag::setBytesValue(const boost::python::object& buffer)
+{
+    const Exiv2::TypeId typeId = Exiv2::TypeInfo::typeId(_type);
+    if (!_isBytesType(typeId))
+#ifdef HAVE_EXIV2_ERROR_CODE
+    {
+        std::string message("Invalid bytes value for type: ");
+        message += _type;
+        throw Exiv2::Error(Exiv2::kerInvalidDataset, message);
+    }
+#else
+    {
+        throw Exiv2::Error(INVALID_VALUE);
+    }
+#endif
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(buffer.ptr(), &view, PyBUF_SIMPLE) != 0)
+    {
+        boost::python::throw_error_already_set();
+    }
+    Exiv2::Value::AutoPtr value = Exiv2::Value::create(typeId);
+    value->read(static_cast<const Exiv2::byte*>(view.buf), view.len,
+                Exiv2::invalidByteOrder);
+    PyBuffer_Release(&view);
+    _datum->setValue(value.get());
+}
+
 
-IptcTag::IptcTag(const std::string& key, Exiv2::IptcData* data): _key(key)
+IptcTag::IptcTag(const std::string& key, Image* image): _key(key), _image(image)
 {
-    _from_data = (data != 0);
+    _from_data = (image != 0);
 
     if (_from_data)
     {
-        _data = data;
+        _data = image->getIptcData();
     }
     else
     {
@@ -775,45 +2321,52 @@ IptcTag::IptcTag(const std::string& key, Exiv2::IptcData* data): _key(key)
         _data->add(Exiv2::Iptcdatum(_key));
     }
 
-    Exiv2::IptcMetadata::iterator iterator = _data->findKey(_key);
-    const uint16_t tag = iterator->tag();
-    const uint16_t record = iterator->record();
-    _type = Exiv2::TypeInfo::typeName(Exiv2::IptcDataSets::dataSetType(tag, record));
-    _name = Exiv2::IptcDataSets::dataSetName(tag, record);
-    _title = Exiv2::IptcDataSets::dataSetTitle(tag, record);
-    _description = Exiv2::IptcDataSets::dataSetDesc(tag, record);
-    // What is the photoshop name anyway? Where is it used?
-    _photoshopName = Exiv2::IptcDataSets::dataSetPsName(tag, record);
-    _repeatable = Exiv2::IptcDataSets::dataSetRepeatable(tag, record);
-    _recordName = Exiv2::IptcDataSets::recordName(record);
-    _recordDescription = Exiv2::IptcDataSets::recordDesc(record);
+    // The type and repeatability are needed right away.
+    _info = _iptcTagInfos().get(_key);
 
     if (_from_data)
     {
         // Check that we are not trying to assign multiple values to a tag that
         // is not repeatable.
-        unsigned int nb_values = 0;
-        for(Exiv2::IptcMetadata::iterator iterator = _data->begin();
-            iterator != _data->end(); ++iterator)
-        {
-            if (iterator->key() == key)
-            {
-                ++nb_values;
-                if (!_repeatable && (nb_values > 1))
+        if (!_info->repeatable && (_positions().size() > 1))
 #ifdef HAVE_EXIV2_ERROR_CODE
-                {
-                    std::string mssg("Tag not repeatable: ");
-                    mssg += key;
-                    throw Exiv2::Error(Exiv2::kerErrorMessage, mssg);
-                }
+        {
+            std::string mssg("Tag not repeatable: ");
+            mssg += key;
+            throw Exiv2::Error(Exiv2::kerErrorMessage, mssg);
+        }
 #else
-                {
-                    throw Exiv2::Error(NON_REPEATABLE);
-                }
+        {
+            throw Exiv2::Error(NON_REPEATABLE);
+        }
 #endif
-            }
+    }
+}
+
+std::vector<long> IptcTag::_positions()
+{
+    if (_image != 0)
+    {
+        const std::vector<long>* positions = _image->findIptcPositions(_key.key());
+        if (positions != 0)
+        {
+            return *positions;
+        }
+        return std::vector<long>();
+    }
+
+    // A tag that doesn't belong to an image only holds its own values.
+    std::vector<long> positions;
+    long position = 0;
+    for(Exiv2::IptcMetadata::iterator iterator = _data->begin();
+        iterator != _data->end(); ++iterator, ++position)
+    {
+        if (iterator->key() == _key.key())
+        {
+            positions.push_back(position);
         }
     }
+    return positions;
 }
 
 IptcTag::~IptcTag()
@@ -826,7 +2379,91 @@ IptcTag::~IptcTag()
 
 void IptcTag::setRawValues(const boost::python::list& values)
 {
-    if (!_repeatable && (boost::python::len(values) > 1))
+    const Exiv2::TypeId type =
+        Exiv2::IptcDataSets::dataSetType(_key.tag(), _key.record());
+    std::vector<std::shared_ptr<Exiv2::Value> > parsed;
+    for (unsigned int index = 0; index < boost::python::len(values); ++index)
+    {
+        std::string value = boost::python::extract<std::string>(values[index]);
+        std::shared_ptr<Exiv2::Value> parsedValue(
+            Exiv2::Value::create(type).release());
+        if (parsedValue->read(value) != 0)
+#ifdef HAVE_EXIV2_ERROR_CODE
+        {
+            std::string mssg("Invalid value: ");
+            mssg += value;
+            // there's no invalid value error in libexiv2, so we use 
+            // kerInvalidDataset wich raise a Python ValueError
+            throw Exiv2::Error(Exiv2::kerInvalidDataset, mssg);
+        }
+#else
+        {
+            throw Exiv2::Error(INVALID_VALUE);
+        }
+#endif
+        parsed.push_back(parsedValue);
+    }
+    _setValues(parsed);
+}
+
+void IptcTag::setTypedValues(const boost::python::list& values)
+{
+    const Exiv2::TypeId type =
+        Exiv2::IptcDataSets::dataSetType(_key.tag(), _key.record());
+    std::vector<std::shared_ptr<Exiv2::Value> > typed;
+    for (unsigned int index = 0; index < boost::python::len(values); ++index)
+    {
+        boost::python::object value = values[index];
+        std::shared_ptr<Exiv2::Value> typedValue;
+        if (type == Exiv2::unsignedShort)
+        {
+            const long number = boost::python::extract<long>(value);
+            if (number >= 0 && number <= 0xffff)
+            {
+                Exiv2::ValueType<uint16_t>* shortValue =
+                    new Exiv2::ValueType<uint16_t>();
+                shortValue->value_.push_back((uint16_t) number);
+                typedValue.reset(shortValue);
+            }
+        }
+        else if (type == Exiv2::date)
+        {
+            // A (year, month, day) tuple
+            typedValue.reset(new Exiv2::DateValue(
+                boost::python::extract<int>(value[0]),
+                boost::python::extract<int>(value[1]),
+                boost::python::extract<int>(value[2])));
+        }
+        else if (type == Exiv2::time)
+        {
+            // A (hour, minute, second, tzHour, tzMinute) tuple
+            typedValue.reset(new Exiv2::TimeValue(
+                boost::python::extract<int>(value[0]),
+                boost::python::extract<int>(value[1]),
+                boost::python::extract<int>(value[2]),
+                boost::python::extract<int>(value[3]),
+                boost::python::extract<int>(value[4])));
+        }
+        if (!typedValue)
+#ifdef HAVE_EXIV2_ERROR_CODE
+        {
+            std::string mssg("Invalid typed value for ");
+            mssg += _key.key();
+            throw Exiv2::Error(Exiv2::kerInvalidDataset, mssg);
+        }
+#else
+        {
+            throw Exiv2::Error(INVALID_VALUE);
+        }
+#endif
+        typed.push_back(typedValue);
+    }
+    _setValues(typed);
+}
+
+void IptcTag::_setValues(const std::vector<std::shared_ptr<Exiv2::Value> >& values)
+{
+    if (!_info->repeatable && (values.size() > 1))
     {
         // The tag is not repeatable but we are trying to assign it more than
         // one value.
@@ -841,54 +2478,19 @@ void IptcTag::setRawValues(const boost::python::list& values)
 #endif
     }
 
-    unsigned int index = 0;
-    unsigned int max = boost::python::len(values);
-    Exiv2::IptcMetadata::iterator iterator = _data->findKey(_key);
-    while (index < max)
+    const size_t max = values.size();
+    const std::vector<long> positions = _positions();
+    for (size_t index = 0; index < max; ++index)
     {
-        std::string value = boost::python::extract<std::string>(values[index++]);
-        if (iterator != _data->end())
+        if (index < positions.size())
         {
             // Override an existing value
-            int result = iterator->setValue(value);
-            if (result != 0)
-#ifdef HAVE_EXIV2_ERROR_CODE
-            {
-                std::string mssg("Invalid value: ");
-                mssg += value;
-                // there's no invalid value error in libexiv2, so we use 
-                // kerInvalidDataset wich raise a Python ValueError
-                throw Exiv2::Error(Exiv2::kerInvalidDataset, mssg);
-            }
-#else
-            {
-                throw Exiv2::Error(INVALID_VALUE);
-            }
-#endif
-            // Jump to the next datum matching the key
-            ++iterator;
-            while ((iterator != _data->end()) && (iterator->key() != _key.key()))
-            {
-                ++iterator;
-            }
+            (_data->begin() + positions[index])->setValue(values[index].get());
         }
         else
         {
             // Append a new value
-            Exiv2::Iptcdatum datum(_key);
-            int result = datum.setValue(value);
-            if (result != 0)
-#ifdef HAVE_EXIV2_ERROR_CODE
-            {
-                std::string mssg("Invalid value: ");
-                mssg += value;
-                throw Exiv2::Error(Exiv2::kerErrorMessage, mssg);
-            }
-#else
-            {
-                throw Exiv2::Error(INVALID_VALUE);
-            }
-#endif
+            Exiv2::Iptcdatum datum(_key, values[index].get());
             int state = _data->add(datum);
             if (state == 6)
 #ifdef HAVE_EXIV2_ERROR_CODE
@@ -902,21 +2504,22 @@ void IptcTag::setRawValues(const boost::python::list& values)
                 throw Exiv2::Error(NON_REPEATABLE);
             }
 #endif
-            // Reset iterator that has been invalidated by appending a datum
-            iterator = _data->end();
+            if (_image != 0)
+            {
+                _image->iptcDatumAdded(_key.key());
+            }
         }
     }
-    // Erase the remaining values if any
-    while (iterator != _data->end())
+    // Erase the remaining values if any, from the last one so that the
+    // positions stay valid
+    for (size_t i = positions.size(); i > max; --i)
     {
-        if (iterator->key() == _key.key())
-        {
-            iterator = _data->erase(iterator);
-        }
-        else
-        {
-            ++iterator;
-        }
+        _data->erase(_data->begin() + positions[i - 1]);
+    }
+    if ((_image != 0) && (positions.size() > max))
+    {
+        _image->iptcDataErased(
+            std::vector<long>(positions.begin() + max, positions.end()));
     }
 }
 
@@ -931,9 +2534,14 @@ void IptcTag::setParentImage(Image& image)
         return;
     }
     const boost::python::list values = getRawValues();
-    delete _data;
+    if (!_from_data)
+    {
+        // Only a tag that doesn't belong to an image owns its data.
+        delete _data;
+    }
     _from_data = true;
     _data = data;
+    _image = &image;
     setRawValues(values);
 }
 
@@ -944,53 +2552,103 @@ const std::string IptcTag::getKey()
 
 const std::string IptcTag::getType()
 {
-    return _type;
+    return _info->type;
 }
 
 const std::string IptcTag::getName()
 {
-    return _name;
+    return _info->name;
 }
 
 const std::string IptcTag::getTitle()
 {
-    return _title;
+    return _info->title;
 }
 
 const std::string IptcTag::getDescription()
 {
-    return _description;
+    return _info->description;
 }
 
 const std::string IptcTag::getPhotoshopName()
 {
-    return _photoshopName;
+    return _info->photoshopName;
 }
 
 const bool IptcTag::isRepeatable()
 {
-    return _repeatable;
+    return _info->repeatable;
 }
 
 const std::string IptcTag::getRecordName()
 {
-    return _recordName;
+    return _info->recordName;
 }
 
 const std::string IptcTag::getRecordDescription()
 {
-    return _recordDescription;
+    return _info->recordDescription;
 }
 
 const boost::python::list IptcTag::getRawValues()
 {
     boost::python::list values;
-    for(Exiv2::IptcMetadata::iterator iterator = _data->begin();
-        iterator != _data->end(); ++iterator)
+    const std::vector<long> positions = _positions();
+    for (std::vector<long>::const_iterator i = positions.begin();
+         i != positions.end(); ++i)
+    {
+        values.append((_data->begin() + *i)->toString());
+    }
+    return values;
+}
+
+boost::python::object IptcTag::getTypedValues()
+{
+    const Exiv2::TypeId type =
+        Exiv2::IptcDataSets::dataSetType(_key.tag(), _key.record());
+    if (type != Exiv2::unsignedShort && type != Exiv2::date &&
+        type != Exiv2::time)
+    {
+        return boost::python::object();
+    }
+
+    boost::python::list values;
+    const std::vector<long> positions = _positions();
+    for (std::vector<long>::const_iterator i = positions.begin();
+         i != positions.end(); ++i)
     {
-        if (iterator->key() == _key.key())
+        const Exiv2::Iptcdatum& datum = *(_data->begin() + *i);
+        if (datum.count() == 0)
+        {
+            // No value, fall back to the raw values.
+            return boost::python::object();
+        }
+        const Exiv2::Value& value = datum.value();
+        const Exiv2::DateValue* dateValue =
+            dynamic_cast<const Exiv2::DateValue*>(&value);
+        const Exiv2::TimeValue* timeValue =
+            dynamic_cast<const Exiv2::TimeValue*>(&value);
+        if (type == Exiv2::unsignedShort && value.typeId() == type)
+        {
+            values.append(value.toLong(0));
+        }
+        else if (type == Exiv2::date && dateValue != 0)
+        {
+            const Exiv2::DateValue::Date& date = dateValue->getDate();
+            values.append(boost::python::make_tuple(date.year, date.month,
+                                                    date.day));
+        }
+        else if (type == Exiv2::time && timeValue != 0)
         {
-            values.append(iterator->toString());
+            const Exiv2::TimeValue::Time& time = timeValue->getTime();
+            values.append(boost::python::make_tuple(time.hour, time.minute,
+                                                    time.second, time.tzHour,
+                                                    time.tzMinute));
+        }
+        else
+        {
+            // Not the expected type, fall back to the raw values.
+            return boost::python::object();
         }
     }
     return values;
@@ -1011,25 +2669,16 @@ XmpTag::XmpTag(const std::string& key, Exiv2::Xmpdatum* datum): _key(key)
         _datum = new Exiv2::Xmpdatum(_key);
         _exiv2_type = Exiv2::TypeInfo::typeName(Exiv2::XmpProperties::propertyType(_key));
     }
+    // The descriptive information is only looked up when needed.
+}
 
-    const char* title = Exiv2::XmpProperties::propertyTitle(_key);
-    if (title != 0)
-    {
-        _title = title;
-    }
-
-    const char* description = Exiv2::XmpProperties::propertyDesc(_key);
-    if (description != 0)
-    {
-        _description = description;
-    }
-
-    const Exiv2::XmpPropertyInfo* info = Exiv2::XmpProperties::propertyInfo(_key);
-    if (info != 0)
+const XmpTagInfo& XmpTag::_getInfo()
+{
+    if (!_info)
     {
-        _name = info->name_;
-        _type = info->xmpValueType_;
+        _info = _xmpTagInfos().get(_key);
     }
+    return *_info;
 }
 
 XmpTag::~XmpTag()
@@ -1075,7 +2724,7 @@ void XmpTag::setLangAltValue(const boost::python::dict& values)
 
 void XmpTag::setParentImage(Image& image)
 {
-    Exiv2::Xmpdatum* datum = &(*image.getXmpData())[_key.key()];
+    Exiv2::Xmpdatum* datum = &image.xmpDatum(_key.key());
     if (datum == _datum)
     {
         // The parent image is already the one passed as a parameter.
@@ -1084,9 +2733,13 @@ void XmpTag::setParentImage(Image& image)
         return;
     }
     Exiv2::Value::AutoPtr value = _datum->getValue();
-    delete _datum;
+    if (!_from_datum)
+    {
+        // Only a tag that doesn't belong to an image owns its datum.
+        delete _datum;
+    }
     _from_datum = true;
-    _datum = &(*image.getXmpData())[_key.key()];
+    _datum = datum;
     _datum->setValue(value.get());
 }
 
@@ -1102,106 +2755,176 @@ const std::string XmpTag::getExiv2Type()
 
 const std::string XmpTag::getType()
 {
-    return _type;
+    return _getInfo().type;
 }
 
 const std::string XmpTag::getName()
 {
-    return _name;
+    return _getInfo().name;
 }
 
 const std::string XmpTag::getTitle()
 {
-    return _title;
+    return _getInfo().title;
 }
 
 const std::string XmpTag::getDescription()
 {
-    return _description;
+    return _getInfo().description;
 }
 
 const std::string XmpTag::getTextValue()
 {
-    return dynamic_cast<const Exiv2::XmpTextValue*>(&_datum->value())->value_;
+    return _xmpTextValue(*_datum);
 }
 
 const boost::python::list XmpTag::getArrayValue()
 {
-#ifdef HAVE_EXIV2_ERROR_CODE
-    // We can't use &_datum->value())->value_ because value_ is private in
-    // this context (change in libexiv2 0.27)
-    const Exiv2::XmpArrayValue* xav = 
-            dynamic_cast<const Exiv2::XmpArrayValue*>(&_datum->value());
-    boost::python::list rvalue;
-    for(int i = 0; i < xav->count(); ++i)
+    return _xmpArrayValue(*_datum);
+}
+
+const boost::python::dict XmpTag::getLangAltValue()
+{
+    return _xmpLangAltValue(*_datum);
+}
+
+
+Preview::Preview(const boost::python::object& image,
+                 const Exiv2::PreviewProperties& properties):
+    _image(image), _properties(properties)
+{
+    _mimeType = properties.mimeType_;
+    _extension = properties.extension_;
+    _size = properties.size_;
+    _dimensions = boost::python::make_tuple(properties.width_,
+                                            properties.height_);
+}
+
+// Return whether two preview properties describe the same preview.
+static bool _samePreview(const Exiv2::PreviewProperties& a,
+                         const Exiv2::PreviewProperties& b)
+{
+    return a.id_ == b.id_ && a.size_ == b.size_ && a.width_ == b.width_ &&
+           a.height_ == b.height_ && a.mimeType_ == b.mimeType_ &&
+           a.extension_ == b.extension_;
+}
+
+Exiv2::PreviewImage* Preview::_extract() const
+{
+    const Image& image = boost::python::extract<const Image&>(_image);
+    if (!image._dataRead)
     {
-        std::string value = xav->toString(i);
-        rvalue.append(value);
-    }
-    return rvalue;
+#ifdef HAVE_EXIV2_ERROR_CODE
+        throw Exiv2::Error(Exiv2::kerErrorMessage, "metadata not read");
 #else
-    std::vector<std::string> value =
-        dynamic_cast<const Exiv2::XmpArrayValue*>(&_datum->value())->value_;
-    boost::python::list rvalue;
-    for(std::vector<std::string>::const_iterator i = value.begin();
-        i != value.end(); ++i)
-    {
-        rvalue.append(*i);
+        throw Exiv2::Error(METADATA_NOT_READ);
+#endif
     }
-    return rvalue;
+    const Exiv2::Image* exiv2Image = image._image.get();
+    Exiv2::PreviewImage* previewImage = 0;
+    bool found = false;
+
+    // If an exception is thrown, it has to be done outside of the
+    // Py_{BEGIN,END}_ALLOW_THREADS block.
+#ifdef HAVE_EXIV2_ERROR_CODE
+    Exiv2::Error error = Exiv2::Error(Exiv2::kerSuccess);
+#else
+    Exiv2::Error error(0);
 #endif
-}
 
-const boost::python::dict XmpTag::getLangAltValue()
-{
-    Exiv2::LangAltValue::ValueType value =
-        dynamic_cast<const Exiv2::LangAltValue*>(&_datum->value())->value_;
-    boost::python::dict rvalue;
-    for (Exiv2::LangAltValue::ValueType::const_iterator i = value.begin();
-         i != value.end(); ++i)
+    // Release the GIL to allow other python threads to run
+    // while extracting the preview.
+    Py_BEGIN_ALLOW_THREADS
+
+    try
     {
-        rvalue[i->first] = i->second;
+        // The metadata may have changed since the preview was listed, in
+        // which case the preview must be listed again rather than
+        // extracted according to stale properties.
+        Exiv2::PreviewManager pm(*exiv2Image);
+        Exiv2::PreviewPropertiesList props = pm.getPreviewProperties();
+        for (Exiv2::PreviewPropertiesList::const_iterator i = props.begin();
+             i != props.end();
+             ++i)
+        {
+            if (_samePreview(*i, _properties))
+            {
+                found = true;
+                previewImage = new Exiv2::PreviewImage(pm.getPreviewImage(*i));
+                break;
+            }
+        }
     }
-    return rvalue;
-}
 
+    catch (Exiv2::Error& err)
+    {
+        error = err;
+    }
 
-Preview::Preview(const Exiv2::PreviewImage& previewImage)
-{
-    _mimeType = previewImage.mimeType();
-    _extension = previewImage.extension();
-    _size = previewImage.size();
-    _dimensions = boost::python::make_tuple(previewImage.width(),
-                                            previewImage.height());
+    // Re-acquire the GIL
+    Py_END_ALLOW_THREADS
 
-    // Copy the data buffer in a string. Since the data buffer can contain null
-    // characters ('\x00'), the string cannot be simply constructed like that:
-    //     _data = std::string((char*) previewImage.pData());
-    // because it would be truncated after the first occurence of a null
-    // character. Therefore, it has to be copied character by character.
-    const Exiv2::byte* pData = previewImage.pData();
-    // First allocate the memory for the whole string...
-    _data = std::string(_size, ' ');
-    // ... then fill it with the raw data.
-    for(unsigned int i = 0; i < _size; ++i)
+    if (error.code() != 0)
+    {
+        throw error;
+    }
+    if (!found)
     {
-        _data[i] = pData[i];
+#ifdef HAVE_EXIV2_ERROR_CODE
+        throw Exiv2::Error(Exiv2::kerErrorMessage,
+                           "preview no longer available");
+#else
+        throw Exiv2::Error(PREVIEW_NOT_AVAILABLE);
+#endif
     }
+
+    return previewImage;
 }
 
 boost::python::object Preview::getData() const
 {
-    return boost::python::object(boost::python::handle<>(
-        PyBytes_FromStringAndSize(_data.c_str(), _size)
-        ));
+    Exiv2::PreviewImage* previewImage = _extract();
+    PyObject* data = PyBytes_FromStringAndSize(
+        (const char*) previewImage->pData(), previewImage->size());
+    delete previewImage;
+    if (data == NULL)
+    {
+        boost::python::throw_error_already_set();
+    }
+    return boost::python::object(boost::python::handle<>(data));
 }
 
 void Preview::writeToFile(const std::string& path) const
 {
-    std::string filename = path + _extension;
-    std::ofstream fd(filename.c_str(), std::ios::out | std::ios::binary);
-    fd << _data;
-    fd.close();
+    Exiv2::PreviewImage* previewImage = _extract();
+
+#ifdef HAVE_EXIV2_ERROR_CODE
+    Exiv2::Error error = Exiv2::Error(Exiv2::kerSuccess);
+#else
+    Exiv2::Error error(0);
+#endif
+
+    Py_BEGIN_ALLOW_THREADS
+
+    try
+    {
+        // The file extension is appended to the path.
+        previewImage->writeFile(path);
+    }
+
+    catch (Exiv2::Error& err)
+    {
+        error = err;
+    }
+
+    Py_END_ALLOW_THREADS
+
+    delete previewImage;
+
+    if (error.code() != 0)
+    {
+        throw error;
+    }
 }
 
 #ifdef HAVE_EXIV2_ERROR_CODE
@@ -1827,6 +3550,9 @@ void translateExiv2Error(Exiv2::Error const& error)
         case NOT_REGISTERED:
             PyErr_SetString(PyExc_KeyError, "No namespace registered under this name");
             break;
+        case PREVIEW_NOT_AVAILABLE:
+            PyErr_SetString(PyExc_RuntimeError, "Preview no longer available");
+            break;
 
         // Default handler
         default:
@@ -1835,9 +3561,336 @@ void translateExiv2Error(Exiv2::Error const& error)
 }
 #endif
 
+// A value read by readMany, kept as plain C++ data until the GIL is
+// re-acquired to convert it to python objects.
+struct ReadManyValue
+{
+    ReadManyValue(): found(false), kind(0) {}
+
+    bool found;
+    std::string type;
+    // The raw value is a string (0), a list of strings (1) or a dict of
+    // strings (2), like the raw values returned by Image::snapshot.
+    int kind;
+    std::vector<std::string> strings;
+    std::vector<std::pair<std::string, std::string> > pairs;
+};
+
+// The values read by readMany from one file, or the error that occurred.
+struct ReadManyRow
+{
+    std::vector<ReadManyValue> values;
+    std::shared_ptr<Exiv2::Error> error;
+    std::string failure;
+};
+
+// The keys requested from readMany, parsed once for all the files, along
+// with their position in the rows.
+struct ReadManyKeys
+{
+    std::vector<std::pair<size_t, Exiv2::ExifKey> > exif;
+    std::vector<std::pair<size_t, Exiv2::IptcKey> > iptc;
+    std::vector<std::pair<size_t, Exiv2::XmpKey> > xmp;
+    size_t count;
+};
+
+// Open a file, read its metadata and extract the requested keys.
+// Called without the GIL, it must not touch any python object.
+static void _readManyRow(const std::string& path, const ReadManyKeys& keys,
+                         ReadManyRow& row)
+{
+    try
+    {
+        Exiv2::Image::AutoPtr image = Exiv2::ImageFactory::open(path);
+        image->readMetadata();
+        row.values.resize(keys.count);
+
+        Exiv2::ExifData& exifData = image->exifData();
+        for (size_t k = 0; k < keys.exif.size(); ++k)
+        {
+            Exiv2::ExifData::const_iterator i =
+                exifData.findKey(keys.exif[k].second);
+            if (i != exifData.end())
+            {
+                ReadManyValue& value = row.values[keys.exif[k].first];
+                value.found = true;
+                value.type = _exifTypeName(*i);
+                value.strings.push_back(i->toString());
+            }
+        }
+
+        Exiv2::IptcData& iptcData = image->iptcData();
+        for (size_t k = 0; k < keys.iptc.size(); ++k)
+        {
+            const Exiv2::IptcKey& key = keys.iptc[k].second;
+            Exiv2::IptcData::iterator i = iptcData.findKey(key);
+            if (i != iptcData.end())
+            {
+                ReadManyValue& value = row.values[keys.iptc[k].first];
+                value.found = true;
+                const char* typeName = Exiv2::TypeInfo::typeName(
+                    Exiv2::IptcDataSets::dataSetType(key.tag(), key.record()));
+                value.type = (typeName != 0) ? typeName : "";
+                value.kind = 1;
+                for (; i != iptcData.end(); ++i)
+                {
+                    if ((i->tag() == key.tag()) && (i->record() == key.record()))
+                    {
+                        value.strings.push_back(i->toString());
+                    }
+                }
+            }
+        }
+
+        Exiv2::XmpData& xmpData = image->xmpData();
+        for (size_t k = 0; k < keys.xmp.size(); ++k)
+        {
+            const Exiv2::XmpKey& key = keys.xmp[k].second;
+            Exiv2::XmpData::const_iterator i = xmpData.findKey(key);
+            if (i != xmpData.end())
+            {
+                ReadManyValue& value = row.values[keys.xmp[k].first];
+                value.found = true;
+                const Exiv2::XmpPropertyInfo* info =
+                    Exiv2::XmpProperties::propertyInfo(key);
+                if (info != 0)
+                {
+                    value.type = info->xmpValueType_;
+                }
+                switch (i->typeId())
+                {
+                    case Exiv2::xmpAlt:
+                    case Exiv2::xmpBag:
+                    case Exiv2::xmpSeq:
+                        value.kind = 1;
+                        for (long n = 0; n < i->count(); ++n)
+                        {
+                            value.strings.push_back(i->toString(n));
+                        }
+                        break;
+                    case Exiv2::langAlt:
+                    {
+                        value.kind = 2;
+                        Exiv2::LangAltValue::ValueType langAlt =
+                            dynamic_cast<const Exiv2::LangAltValue*>(&i->value())->value_;
+                        value.pairs.assign(langAlt.begin(), langAlt.end());
+                        break;
+                    }
+                    default:
+                        value.strings.push_back(i->toString());
+                }
+            }
+        }
+    }
+
+    catch (Exiv2::Error& error)
+    {
+        row.error.reset(new Exiv2::Error(error));
+    }
+
+    catch (std::exception& error)
+    {
+        row.failure = error.what();
+        if (row.failure.empty())
+        {
+            row.failure = "Failed to read the metadata";
+        }
+    }
+}
+
+// Return the python exception currently set as an object, and clear it.
+static boost::python::object _fetchPythonError()
+{
+    PyObject* type;
+    PyObject* value;
+    PyObject* traceback;
+    PyErr_Fetch(&type, &value, &traceback);
+    PyErr_NormalizeException(&type, &value, &traceback);
+    Py_XDECREF(type);
+    Py_XDECREF(traceback);
+    return boost::python::object(boost::python::handle<>(value));
+}
+
+boost::python::list readMany(const boost::python::list& paths,
+                             const boost::python::list& keys, int nThreads)
+{
+    std::vector<std::string> filenames(
+        (boost::python::stl_input_iterator<std::string>(paths)),
+        boost::python::stl_input_iterator<std::string>());
+
+    // Parse the keys once, an invalid key raises an exception right away.
+    ReadManyKeys parsedKeys;
+    parsedKeys.count = 0;
+    for(boost::python::stl_input_iterator<std::string> iterator(keys);
+        iterator != boost::python::stl_input_iterator<std::string>();
+        ++iterator, ++parsedKeys.count)
+    {
+        const std::string key = *iterator;
+        const std::string family = key.substr(0, key.find('.'));
+        if (family == "Exif")
+        {
+            parsedKeys.exif.push_back(std::make_pair(parsedKeys.count,
+                                                     Exiv2::ExifKey(key)));
+        }
+        else if (family == "Iptc")
+        {
+            parsedKeys.iptc.push_back(std::make_pair(parsedKeys.count,
+                                                     Exiv2::IptcKey(key)));
+        }
+        else if (family == "Xmp")
+        {
+            parsedKeys.xmp.push_back(std::make_pair(parsedKeys.count,
+                                                    Exiv2::XmpKey(key)));
+        }
+        else
+#ifdef HAVE_EXIV2_ERROR_CODE
+        {
+            throw Exiv2::Error(Exiv2::kerInvalidKey, key);
+        }
+#else
+        {
+            throw Exiv2::Error(KEY_NOT_FOUND, key);
+        }
+#endif
+    }
+
+    const size_t count = filenames.size();
+    if (nThreads <= 0)
+    {
+        nThreads = std::thread::hardware_concurrency();
+    }
+    if ((size_t) nThreads > count)
+    {
+        nThreads = count;
+    }
+
+    // The XMP toolkit has to be initialised, with its lock, before being
+    // used by several threads at once.
+    initialiseXmpToolkit();
+
+    std::vector<ReadManyRow> rows(count);
+    std::atomic<size_t> next(0);
+
+    // Release the GIL while the workers read the files, it is only
+    // re-acquired to convert the rows to python objects.
+    Py_BEGIN_ALLOW_THREADS
+
+    std::vector<std::thread> workers;
+    std::function<void()> work = [&]()
+    {
+        for (size_t i = next++; i < count; i = next++)
+        {
+            _readManyRow(filenames[i], parsedKeys, rows[i]);
+        }
+    };
+    for (int t = 0; t < nThreads; ++t)
+    {
+        try
+        {
+            workers.push_back(std::thread(work));
+        }
+        catch (std::system_error&)
+        {
+            // Make do with the threads already running.
+            break;
+        }
+    }
+    if (workers.empty())
+    {
+        work();
+    }
+    for (size_t t = 0; t < workers.size(); ++t)
+    {
+        workers[t].join();
+    }
+
+    // Re-acquire the GIL
+    Py_END_ALLOW_THREADS
+
+    boost::python::list result;
+    for (size_t r = 0; r < count; ++r)
+    {
+        const ReadManyRow& row = rows[r];
+        if (row.error)
+        {
+            translateExiv2Error(*row.error);
+            result.append(boost::python::make_tuple(boost::python::object(),
+                                                    _fetchPythonError()));
+            continue;
+        }
+        if (!row.failure.empty())
+        {
+            PyErr_SetString(PyExc_RuntimeError, row.failure.c_str());
+            result.append(boost::python::make_tuple(boost::python::object(),
+                                                    _fetchPythonError()));
+            continue;
+        }
+
+        boost::python::list values;
+        for (size_t v = 0; v < row.values.size(); ++v)
+        {
+            const ReadManyValue& value = row.values[v];
+            if (!value.found)
+            {
+                values.append(boost::python::object());
+                continue;
+            }
+            boost::python::object raw;
+            if (value.kind == 0)
+            {
+                raw = boost::python::object(value.strings[0]);
+            }
+            else if (value.kind == 1)
+            {
+                boost::python::list strings;
+                for (size_t i = 0; i < value.strings.size(); ++i)
+                {
+                    strings.append(value.strings[i]);
+                }
+                raw = strings;
+            }
+            else
+            {
+                boost::python::dict pairs;
+                for (size_t i = 0; i < value.pairs.size(); ++i)
+                {
+                    pairs[value.pairs[i].first] = value.pairs[i].second;
+                }
+                raw = pairs;
+            }
+            values.append(boost::python::make_tuple(value.type, raw));
+        }
+        result.append(boost::python::make_tuple(values, boost::python::object()));
+    }
+    return result;
+}
+
+
+// The lock given to the XMP toolkit.
+static std::mutex _xmpMutex;
+
+static void _xmpLock(void* data, bool lock)
+{
+    std::mutex* mutex = static_cast<std::mutex*>(data);
+    if (lock)
+    {
+        mutex->lock();
+    }
+    else
+    {
+        mutex->unlock();
+    }
+}
+
+bool initialiseXmpToolkit()
+{
+    // The lock is only taken into account by the first initialisation.
+    return Exiv2::XmpParser::initialize(&_xmpLock, &_xmpMutex);
+}
+
 bool initialiseXmpParser()
 {
-    if (!Exiv2::XmpParser::initialize())
+    if (!initialiseXmpToolkit())
         return false;
 
     std::string prefix("py3exiv2");
@@ -1884,6 +3937,7 @@ void registerXmpNs(const std::string& name, const std::string& prefix)
         // No namespace exists with the requested prefix, it is safe to
         // register a new one.
         Exiv2::XmpProperties::registerNs(name, prefix);
+        _xmpTagInfos().clear();
         return;
     }
 #ifdef HAVE_EXIV2_ERROR_CODE
@@ -1905,6 +3959,7 @@ void unregisterXmpNs(const std::string& name)
     if (prefix != "")
     {
         Exiv2::XmpProperties::unregisterNs(name);
+        _xmpTagInfos().clear();
         try
         {
             const Exiv2::XmpNsInfo* info = Exiv2::XmpProperties::nsInfo(prefix);
@@ -1945,6 +4000,7 @@ void unregisterAllXmpNs()
 {
     // Unregister all custom namespaces.
     Exiv2::XmpProperties::unregisterNs();
+    _xmpTagInfos().clear();
 }
 
 } // End of namespace exiv2wrapper
@@ -27,7 +27,10 @@
 #ifndef __exiv2wrapper__
 #define __exiv2wrapper__
 
+#include <memory>
 #include <string>
+#include <unordered_map>
+#include <vector>
 
 #include "exiv2/exiv2.hpp"
 
@@ -38,6 +41,12 @@ namespace exiv2wrapper
 
 class Image;
 
+// The descriptive information of the tags, shared by all the tags with the
+// same key (see the catalogs in exiv2wrapper.cpp).
+struct ExifTagInfo;
+struct IptcTagInfo;
+struct XmpTagInfo;
+
 class ExifTag
 {
 public:
@@ -62,17 +71,33 @@ public:
     const std::string getHumanValue();
     int getByteOrder();
 
+    // Return the values of a numeric tag (Short, SShort, Long, SLong,
+    // Rational, SRational) as a tuple (type name, bytes) where the bytes are
+    // the values packed in the native byte order, the numerator and the
+    // denominator of each rational one after the other. Return None if the
+    // value is not numeric.
+    boost::python::object getArrayValue();
+    // Set the values of a numeric tag from an object supporting the buffer
+    // protocol, packed as returned by getArrayValue for the type of the tag.
+    void setArrayValue(const boost::python::object& buffer);
+
+    // Return the value of an Undefined, Byte or SByte tag as bytes, copied
+    // straight from the underlying value. Return None if the value is of
+    // another type.
+    boost::python::object getBytesValue();
+    // Set the value of an Undefined, Byte or SByte tag from an object
+    // supporting the buffer protocol.
+    void setBytesValue(const boost::python::object& buffer);
+
 private:
     Exiv2::ExifKey _key;
     Exiv2::Exifdatum* _datum;
     Exiv2::ExifData* _data;
     std::string _type;
-    std::string _name;
-    std::string _label;
-    std::string _description;
-    std::string _sectionName;
-    std::string _sectionDescription;
     int _byteOrder;
+    // Looked up in the catalog the first time it is needed.
+    std::shared_ptr<const ExifTagInfo> _info;
+    const ExifTagInfo& _getInfo();
 };
 
 
@@ -80,11 +105,16 @@ class IptcTag
 {
 public:
     // Constructor
-    IptcTag(const std::string& key, Exiv2::IptcData* data=0);
+    // The tag is built from the IPTC data of image if given.
+    IptcTag(const std::string& key, Image* image=0);
 
     ~IptcTag();
 
     void setRawValues(const boost::python::list& values);
+    // Set the values of a Short, Date or Time tag from python objects without
+    // going through their string representation: ints, (year, month, day)
+    // tuples or (hour, minute, second, tzHour, tzMinute) tuples.
+    void setTypedValues(const boost::python::list& values);
     void setParentImage(Image& image);
 
     const std::string getKey();
@@ -97,19 +127,23 @@ public:
     const std::string getRecordName();
     const std::string getRecordDescription();
     const boost::python::list getRawValues();
+    // Return the values of a Short, Date or Time tag as python objects, as
+    // accepted by setTypedValues, None for a tag of another type.
+    boost::python::object getTypedValues();
 
 private:
     Exiv2::IptcKey _key;
     bool _from_data; // whether the tag is built from an existing IptcData
     Exiv2::IptcData* _data;
-    std::string _type;
-    std::string _name;
-    std::string _title;
-    std::string _description;
-    std::string _photoshopName;
-    bool _repeatable;
-    std::string _recordName;
-    std::string _recordDescription;
+    // The image the IPTC data belongs to, if any, whose index is used to
+    // locate the values of the tag.
+    Image* _image;
+    std::shared_ptr<const IptcTagInfo> _info;
+
+    // Return the positions of the values of the tag in the IPTC data.
+    std::vector<long> _positions();
+    // Replace the values of the tag, adding or erasing datums as needed.
+    void _setValues(const std::vector<std::shared_ptr<Exiv2::Value> >& values);
 };
 
 
@@ -141,17 +175,22 @@ private:
     bool _from_datum; // whether the tag is built from an existing Xmpdatum
     Exiv2::Xmpdatum* _datum;
     std::string _exiv2_type;
-    std::string _type;
-    std::string _name;
-    std::string _title;
-    std::string _description;
+    // Looked up in the catalog the first time it is needed.
+    std::shared_ptr<const XmpTagInfo> _info;
+    const XmpTagInfo& _getInfo();
 };
 
 
+// A preview image embedded in an image, described by its properties. The
+// data of the preview is only extracted when it is requested, from the
+// current metadata of the Image it has been listed from, which the Preview
+// keeps alive. The extraction fails if the preview is no longer the one
+// listed (e.g. the metadata has been read again or modified since).
 class Preview
 {
 public:
-    Preview(const Exiv2::PreviewImage& previewImage);
+    Preview(const boost::python::object& image,
+            const Exiv2::PreviewProperties& properties);
 
     boost::python::object getData() const;
     void writeToFile(const std::string& path) const;
@@ -160,8 +199,29 @@ public:
     std::string _extension;
     unsigned int _size;
     boost::python::tuple _dimensions;
-    std::string _data;
-    const Exiv2::byte* pData;
+
+private:
+    // The python object wrapping the Image the preview belongs to.
+    boost::python::object _image;
+    Exiv2::PreviewProperties _properties;
+
+    // Extract the preview image, the caller owns the returned object.
+    Exiv2::PreviewImage* _extract() const;
+};
+
+
+// A list of keys parsed once, to be looked up in many images with
+// Image::getMany.
+class KeyProjection
+{
+public:
+    // Throw an exception if one of the keys is invalid.
+    KeyProjection(const boost::python::list& keys);
+
+    enum Family { EXIF, IPTC, XMP };
+
+    // The family and the canonical form of each key, in the order given.
+    std::vector<std::pair<Family, std::string> > _keys;
 };
 
 
@@ -170,20 +230,51 @@ class Image
 public:
     // Constructors
     Image(const std::string& filename);
-    Image(const std::string& buffer, unsigned long size);
+    // The image is read from the memory of an object supporting the buffer
+    // protocol (bytes, bytearray, memoryview, mmap...), without copying it.
+    Image(const boost::python::object& buffer, long size);
     Image(const Image& image);
 
     ~Image();
 
-    void readMetadata();
+    // Read the metadata of the requested families only. The EXIF, IPTC and
+    // XMP data of a JPEG image are decoded from their own segments, so that
+    // the families not requested are not parsed at all, which spares e.g.
+    // the cost of the XMP toolkit. Other formats are read in full and the
+    // families not requested discarded.
+    void readMetadata(bool exif=true, bool iptc=true, bool xmp=true);
+    // Drop the tags read but the ones with one of the keys or whose key
+    // starts with one of the prefixes, as well as the XMP packet, to
+    // release the memory they use.
+    void pruneMetadata(const KeyProjection& keys,
+                       const boost::python::list& prefixes);
     void writeMetadata();
 
+    // Encode the EXIF data as a TIFF structure, as stored in the APP1
+    // segment of a JPEG image after its "Exif\0\0" identifier, keeping the
+    // layout of the original structure (None if there is none) when
+    // possible. Return empty bytes if there is no EXIF data.
+    boost::python::object encodeExif(const boost::python::object& original);
+    // Serialize the XMP data in a packet, the way it is written to a JPEG
+    // image. Return empty bytes if there is no XMP data.
+    boost::python::object encodeXmp();
+    // Replace the IPTC data in Photoshop data, as stored in the APP13
+    // segments of a JPEG image after their "Photoshop 3.0\0" identifier,
+    // keeping the other resource blocks. Return the new Photoshop data.
+    boost::python::object encodeIptc(const boost::python::object& photoshop);
+    // Write the metadata to a copy of the image data in memory, the image
+    // itself being left untouched. Return the new image data.
+    boost::python::object encodeImage();
+
     // Read-only access to the dimensions of the picture.
     unsigned int pixelWidth() const;
     unsigned int pixelHeight() const;
 
     // Read-only access to the MIME type of the image.
     std::string mimeType() const;
+    // The MIME type of the image as detected from its format, available
+    // without reading the metadata.
+    std::string probeMimeType() const;
 
     // Read and write access to the EXIF tags.
     // For a complete list of the available EXIF tags, see
@@ -193,6 +284,10 @@ public:
     // image.
     boost::python::list exifKeys();
 
+    // Return whether the EXIF tag is set, without creating it.
+    // An invalid key is never set.
+    bool hasExifKey(std::string key);
+
     // Return the required EXIF tag.
     // Throw an exception if the tag is not set.
     const ExifTag getExifTag(std::string key);
@@ -210,6 +305,10 @@ public:
     // even if a tag is present more than once.
     boost::python::list iptcKeys();
 
+    // Return whether the IPTC tag is set, without creating it.
+    // An invalid key is never set.
+    bool hasIptcKey(std::string key);
+
     // Return the required IPTC tag.
     // Throw an exception if the tag is not set.
     const IptcTag getIptcTag(std::string key);
@@ -220,6 +319,10 @@ public:
 
     boost::python::list xmpKeys();
 
+    // Return whether the XMP tag is set, without creating it.
+    // An invalid key is never set.
+    bool hasXmpKey(std::string key);
+
     // Return the required XMP tag.
     // Throw an exception if the tag is not set.
     const XmpTag getXmpTag(std::string key);
@@ -233,14 +336,18 @@ public:
     void setComment(const std::string& comment);
     void clearComment();
 
-    // Read access to the thumbnail embedded in the image.
-    boost::python::list previews();
+    // Read access to the properties of the previews embedded in the image
+    // wrapped by the python object self. The previews keep it alive.
+    static boost::python::list previews(const boost::python::object& self);
 
     // Manipulate the JPEG/TIFF thumbnail embedded in the EXIF data.
     const std::string getExifThumbnailMimeType();
     const std::string getExifThumbnailExtension();
     void writeExifThumbnailToFile(const std::string& path);
-    boost::python::list getExifThumbnailData();
+    boost::python::object getExifThumbnailData();
+    // Copy the thumbnail data into a writable python buffer, and return the
+    // number of bytes written.
+    long getExifThumbnailDataInto(const boost::python::object& buffer);
     void eraseExifThumbnail();
     void setExifThumbnailFromFile(const std::string& path);
     void setExifThumbnailFromData(const std::string& data);
@@ -260,8 +367,44 @@ public:
 
     const std::string getIptcCharset() const;
 
+    // Constant time access to the tags by key, through indexes built on
+    // demand. The keys must be in their canonical form.
+
+    // Return the first EXIF datum for the key, 0 if not set.
+    Exiv2::Exifdatum* findExifDatum(const std::string& key);
+    // Return the first EXIF datum for the key, added if not set.
+    Exiv2::Exifdatum& exifDatum(const std::string& key);
+    // Return the positions in the IPTC data of the datums for the key, 0 if
+    // not set.
+    const std::vector<long>* findIptcPositions(const std::string& key);
+    // To be called whenever a datum for the key is appended to the IPTC
+    // data.
+    void iptcDatumAdded(const std::string& key);
+    // To be called whenever datums are erased from the IPTC data, with their
+    // former positions in increasing order.
+    void iptcDataErased(const std::vector<long>& erased);
+    // Return the XMP datum for the key, 0 if not set.
+    Exiv2::Xmpdatum* findXmpDatum(const std::string& key);
+    // Return the XMP datum for the key, added if not set.
+    Exiv2::Xmpdatum& xmpDatum(const std::string& key);
+
+    // Return the key, type and raw value of all the tags of the requested
+    // families ("exif", "iptc", "xmp") in a single dictionary
+    // {key: (type, raw value)}, without instantiating any tag.
+    boost::python::dict snapshot(const boost::python::list& families);
+
+    // Look up all the keys of the projection at once. Return a list with,
+    // for each key, the tag (or its raw value if raw is true), or None if
+    // the tag is not set. Never throw for a missing tag.
+    boost::python::list getMany(const KeyProjection& projection, bool raw);
+
 private:
+    friend class Preview;
+
     std::string _filename;
+    // View on the memory of the python object the image is read from, if
+    // any, in which case _data points to it (the memory is not owned).
+    Py_buffer _buffer;
     Exiv2::byte* _data;
     long _size;
     Exiv2::Image::AutoPtr _image;
@@ -275,7 +418,41 @@ private:
     // false otherwise
     bool _dataRead;
 
+    // Indexes of the datums by key. They are built on demand, kept up to
+    // date when datums are added or erased, and dropped whenever the
+    // metadata changes in a way they can't follow (reading, writing,
+    // copying, modifying the thumbnail...).
+    // The EXIF data is a list: its iterators are stable and the index maps
+    // each key to its first datum and the number of datums with that key.
+    struct ExifIndexEntry
+    {
+        ExifIndexEntry(): count(0) {}
+        Exiv2::ExifData::iterator first;
+        unsigned int count;
+    };
+    std::unordered_map<std::string, ExifIndexEntry> _exifIndex;
+    bool _exifIndexed;
+    // The IPTC and XMP data are vectors, indexed by position.
+    std::unordered_map<std::string, std::vector<long> > _iptcIndex;
+    bool _iptcIndexed;
+    std::unordered_map<std::string, long> _xmpIndex;
+    bool _xmpIndexed;
+
+    void _indexExifData();
+    void _indexIptcData();
+    void _indexXmpData();
+    void _dropIndexes();
+
+    // The dimensions of the picture read by _readJpegMetadata, -1 if it
+    // wasn't used (Exiv2::Image has no public setter for them).
+    long _pixelWidth;
+    long _pixelHeight;
+
     void _instantiate_image();
+    // Read the requested families from the segments of a JPEG image.
+    // Return false if the image is not a JPEG image.
+    bool _readJpegMetadata(bool exif, bool iptc, bool xmp);
+    void _acquireBuffer(PyObject* object, long size);
 };
 
 
@@ -283,6 +460,21 @@ private:
 void translateExiv2Error(Exiv2::Error const& error);
 
 
+// Read the requested keys from many files, with a pool of nThreads threads
+// (or as many as the hardware supports if nThreads <= 0) running without the
+// GIL. Return a list of (values, error) tuples in the order of paths, where
+// values is the list of the (type, raw value) of the keys, None for a key not
+// set, or None if reading the file failed, in which case error is the
+// exception raised.
+boost::python::list readMany(const boost::python::list& paths,
+                             const boost::python::list& keys, int nThreads);
+
+
+// Initialise the XMP toolkit, if not already done, with a lock serializing
+// its use by several threads. Called when the module is loaded, and again
+// before reading XMP data in case the toolkit has been terminated since.
+bool initialiseXmpToolkit();
+
 // Functions to manipulate custom XMP namespaces
 bool initialiseXmpParser();
 bool closeXmpParser();
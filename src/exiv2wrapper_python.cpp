@@ -37,6 +37,8 @@ using namespace boost::python;
 
 using namespace exiv2wrapper;
 
+BOOST_PYTHON_MEMBER_FUNCTION_OVERLOADS(readMetadataOverloads, readMetadata, 0, 3)
+
 BOOST_PYTHON_MODULE(libexiv2python)
 {
     scope().attr("exiv2_version_info") = \
@@ -46,6 +48,9 @@ BOOST_PYTHON_MODULE(libexiv2python)
 
     register_exception_translator<Exiv2::Error>(&translateExiv2Error);
 
+    // Initialise the XMP toolkit with its lock before any thread uses it.
+    initialiseXmpToolkit();
+
     // Swallow all warnings and error messages written by libexiv2 to stderr
     // (if it was compiled with DEBUG or without SUPPRESS_WARNINGS).
     // See https://bugs.launchpad.net/pyexiv2/+bug/507620.
@@ -66,11 +71,16 @@ BOOST_PYTHON_MODULE(libexiv2python)
         .def("_getRawValue", &ExifTag::getRawValue)
         .def("_getHumanValue", &ExifTag::getHumanValue)
         .def("_getByteOrder", &ExifTag::getByteOrder)
+        .def("_getArrayValue", &ExifTag::getArrayValue)
+        .def("_setArrayValue", &ExifTag::setArrayValue)
+        .def("_getBytesValue", &ExifTag::getBytesValue)
+        .def("_setBytesValue", &ExifTag::setBytesValue)
     ;
 
     class_<IptcTag>("_IptcTag", init<std::string>())
 
         .def("_setRawValues", &IptcTag::setRawValues)
+        .def("_setTypedValues", &IptcTag::setTypedValues)
         .def("_setParentImage", &IptcTag::setParentImage)
 
         .def("_getKey", &IptcTag::getKey)
@@ -83,6 +93,7 @@ BOOST_PYTHON_MODULE(libexiv2python)
         .def("_getRecordName", &IptcTag::getRecordName)
         .def("_getRecordDescription", &IptcTag::getRecordDescription)
         .def("_getRawValues", &IptcTag::getRawValues)
+        .def("_getTypedValues", &IptcTag::getTypedValues)
     ;
 
     class_<XmpTag>("_XmpTag", init<std::string>())
@@ -103,38 +114,47 @@ BOOST_PYTHON_MODULE(libexiv2python)
         .def("_getLangAltValue", &XmpTag::getLangAltValue)
     ;
 
-    class_<Preview>("_Preview", init<Exiv2::PreviewImage>())
+    class_<Preview>("_Preview", no_init)
 
         .def_readonly("mime_type", &Preview::_mimeType)
         .def_readonly("extension", &Preview::_extension)
         .def_readonly("size", &Preview::_size)
         .def_readonly("dimensions", &Preview::_dimensions)
-        .def_readonly("data", &Preview::_data)
+        .add_property("data", &Preview::getData)
 
         .def("get_data", &Preview::getData)
         .def("write_to_file", &Preview::writeToFile)
     ;
 
     class_<Image>("_Image", init<std::string>())
-        .def(init<std::string, long>())
+        .def(init<object, long>())
 
-        .def("_readMetadata", &Image::readMetadata)
+        .def("_readMetadata", &Image::readMetadata, readMetadataOverloads())
+        .def("_pruneMetadata", &Image::pruneMetadata)
         .def("_writeMetadata", &Image::writeMetadata)
+        .def("_encodeExif", &Image::encodeExif)
+        .def("_encodeXmp", &Image::encodeXmp)
+        .def("_encodeIptc", &Image::encodeIptc)
+        .def("_encodeImage", &Image::encodeImage)
 
         .def("_getPixelWidth", &Image::pixelWidth)
         .def("_getPixelHeight", &Image::pixelHeight)
 
         .def("_getMimeType", &Image::mimeType)
+        .def("_probeMimeType", &Image::probeMimeType)
 
         .def("_exifKeys", &Image::exifKeys)
+        .def("_hasExifKey", &Image::hasExifKey)
         .def("_getExifTag", &Image::getExifTag)
         .def("_deleteExifTag", &Image::deleteExifTag)
 
         .def("_iptcKeys", &Image::iptcKeys)
+        .def("_hasIptcKey", &Image::hasIptcKey)
         .def("_getIptcTag", &Image::getIptcTag)
         .def("_deleteIptcTag", &Image::deleteIptcTag)
 
         .def("_xmpKeys", &Image::xmpKeys)
+        .def("_hasXmpKey", &Image::hasXmpKey)
         .def("_getXmpTag", &Image::getXmpTag)
         .def("_deleteXmpTag", &Image::deleteXmpTag)
 
@@ -152,13 +172,22 @@ BOOST_PYTHON_MODULE(libexiv2python)
         .def("_getExifThumbnailExtension", &Image::getExifThumbnailExtension)
         .def("_writeExifThumbnailToFile", &Image::writeExifThumbnailToFile)
         .def("_getExifThumbnailData", &Image::getExifThumbnailData)
+        .def("_getExifThumbnailDataInto", &Image::getExifThumbnailDataInto)
         .def("_eraseExifThumbnail", &Image::eraseExifThumbnail)
         .def("_setExifThumbnailFromFile", &Image::setExifThumbnailFromFile)
         .def("_setExifThumbnailFromData", &Image::setExifThumbnailFromData)
 
         .def("_getIptcCharset", &Image::getIptcCharset)
+
+        .def("_snapshot", &Image::snapshot)
+        .def("_getMany", &Image::getMany)
     ;
 
+    class_<KeyProjection>("_KeyProjection", init<list>())
+    ;
+
+    def("_readMany", readMany, args("paths", "keys", "n_threads"));
+
     def("_initialiseXmpParser", initialiseXmpParser);
     def("_closeXmpParser", closeXmpParser);
     def("_registerXmpNs", registerXmpNs, args("name", "prefix"));
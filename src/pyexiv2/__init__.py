@@ -59,12 +59,15 @@ A typical use of this binding would be:
 
 import libexiv2python
 
-from pyexiv2.metadata import ImageMetadata
+from pyexiv2.metadata import ImageMetadata, Projection
 from pyexiv2.exif import ExifValueError, ExifTag, ExifThumbnail
 from pyexiv2.iptc import IptcValueError, IptcTag
 from pyexiv2.xmp import (XmpValueError, XmpTag, register_namespace,
                          unregister_namespace, unregister_namespaces)
 from pyexiv2.preview import Preview
+from pyexiv2.batch import ReadResult, read_many, extract_many, WriteBatch
+from pyexiv2.aio import aread_many
+from pyexiv2.header import ProbeResult, probe
 from pyexiv2.utils import (FixedOffset, NotifyingList,
                            undefined_to_string, string_to_undefined,
                            GPSCoordinate)
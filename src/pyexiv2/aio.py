@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the py3exiv2 distribution.
+#
+# py3exiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# version 3 as published by the Free Software Foundation.
+#
+# py3exiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with py3exiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+
+"""
+Read the metadata of many images from asyncio code.
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from pyexiv2.batch import _read_one, _resolve_families
+
+
+async def aread_many(paths, workers=4, families=None, keys=None, ordered=True):
+    """Read the metadata of many images without blocking the event loop.
+
+    The asyncio counterpart of read_many(): the images are read by a pool of
+    threads, the underlying library releasing the GIL while doing so, and
+    at most `workers` images are being read at once, so that a slow file
+    does not hold up the others nor the event loop. The paths are consumed
+    lazily.
+
+    Errors are not raised, a ReadResult with the exception as its error is
+    yielded instead.
+
+    Closing the generator (or cancelling the task iterating it) before it
+    is exhausted cancels the images not yet being read.
+
+    Args:
+    paths -- an iterable of paths of image files
+    workers -- the number of threads reading the images, default 4
+    families -- an optional iterable of the families of the tags to read,
+                among 'exif', 'iptc' and 'xmp', default all of them (or the
+                families of keys if keys is given)
+    keys -- an optional iterable of the keys of the tags to read, default
+            all of them
+    ordered -- whether to yield the results in the order of paths (True,
+               default) or as soon as they are available (False)
+
+    Yield ReadResult(path, tags, error) tuples.
+    """
+    if workers < 1:
+        raise ValueError('workers must be at least 1')
+
+    if keys is not None:
+        keys = list(keys)
+
+    families = _resolve_families(families, keys)
+    loop = asyncio.get_running_loop()
+    paths = iter(paths)
+    max_pending = 2 * workers
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+
+    def submit():
+        for path in paths:
+            pending.append(loop.run_in_executor(executor, _read_one, path,
+                                                families, keys))
+            if len(pending) >= max_pending:
+                break
+
+    try:
+        submit()
+        while pending:
+            if ordered:
+                result = await pending[0]
+                pending.popleft()
+
+            else:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+                result = future.result()
+
+            submit()
+            yield result
+
+    finally:
+        for future in pending:
+            future.cancel()
+
+        # Don't block the event loop until the images being read are done.
+        executor.shutdown(wait=False)
@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the py3exiv2 distribution.
+#
+# py3exiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# version 3 as published by the Free Software Foundation.
+#
+# py3exiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with py3exiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+"""
+Read the metadata of many images concurrently, and write it durably.
+"""
+
+import errno
+import os
+import stat
+import tempfile
+
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+import libexiv2python
+
+from pyexiv2.metadata import ImageMetadata
+
+
+#: The result of reading the metadata of one image.
+#: path is the path of the image, tags a dict {key: (type, raw_value)} as
+#: returned by ImageMetadata.to_dict() and error the exception raised while
+#: reading the image, in which case tags is None.
+ReadResult = namedtuple('ReadResult', ['path', 'tags', 'error'])
+
+
+def _families_of(keys):
+    return set(key.split('.')[0].lower() for key in keys)
+
+
+def _resolve_families(families, keys):
+    """Return the list of the families to read, raise ValueError if unknown.
+
+    Args:
+    families -- an optional iterable of families, default all of them (or
+                the families of keys if keys is given)
+    keys -- an optional list of the keys of the tags to read
+    """
+    if families is None:
+        if keys is None:
+            families = ('exif', 'iptc', 'xmp')
+
+        else:
+            families = _families_of(keys)
+
+    families = [family.lower() for family in families]
+    for family in families:
+        if family not in ('exif', 'iptc', 'xmp'):
+            raise ValueError('Unknown metadata family: %s' % family)
+
+    return families
+
+
+def _read_one(path, families, keys):
+    """Read the metadata of one image, never raise.
+
+    Args:
+    path -- the path of the image
+    families -- the families of the tags to read
+    keys -- an optional list of the keys of the tags to read
+    """
+    try:
+        metadata = ImageMetadata(path)
+        metadata.read()
+        tags = metadata.to_dict(families)
+
+    except Exception as error:
+        return ReadResult(path, None, error)
+
+    if keys is not None:
+        tags = dict((key, tags[key]) for key in keys if key in tags)
+
+    return ReadResult(path, tags, None)
+
+
+def read_many(paths, workers=4, families=None, keys=None, ordered=True):
+    """Read the metadata of many images concurrently.
+
+    The images are opened and read by a pool of threads, the underlying
+    library releasing the GIL while doing so. At most `workers` images are
+    being read (hence opened) at once, and the paths are consumed lazily, so
+    that paths may be a generator over a very large number of files.
+
+    Errors are not raised, a ReadResult with the exception as its error is
+    yielded instead.
+
+    Closing the generator before it is exhausted cancels the images not yet
+    being read.
+
+    Args:
+    paths -- an iterable of paths of image files
+    workers -- the number of threads reading the images, default 4
+    families -- an optional iterable of the families of the tags to read,
+                among 'exif', 'iptc' and 'xmp', default all of them (or the
+                families of keys if keys is given)
+    keys -- an optional iterable of the keys of the tags to read, default
+            all of them
+    ordered -- whether to yield the results in the order of paths (True,
+               default) or as soon as they are available (False)
+
+    Yield ReadResult(path, tags, error) tuples. The arguments are checked
+    when read_many() is called, not when the first result is requested.
+    """
+    if workers < 1:
+        raise ValueError('workers must be at least 1')
+
+    if keys is not None:
+        keys = list(keys)
+
+    families = _resolve_families(families, keys)
+    return _read_many(iter(paths), workers, families, keys, ordered)
+
+
+def _read_many(paths, workers, families, keys, ordered):
+    """The generator returned by read_many(), once its arguments checked.
+
+    Args:
+    paths -- an iterator over the paths of the image files
+    workers -- the number of threads reading the images
+    families -- the list of the families of the tags to read
+    keys -- an optional list of the keys of the tags to read
+    ordered -- whether to yield the results in the order of paths
+    """
+    # Keep a few images queued in addition to the ones being read, so that
+    # the workers never wait for the consumer to submit the next one.
+    max_pending = 2 * workers
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+
+    def submit():
+        for path in paths:
+            pending.append(executor.submit(_read_one, path, families, keys))
+            if len(pending) >= max_pending:
+                break
+
+    try:
+        submit()
+        while pending:
+            if ordered:
+                future = pending.popleft()
+
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+
+            result = future.result()
+            submit()
+            yield result
+
+    finally:
+        for future in pending:
+            future.cancel()
+
+        executor.shutdown(wait=True)
+
+
+def extract_many(paths, keys, workers=0, chunk_size=256):
+    """Extract a few tags from many images with native threads.
+
+    Unlike read_many(), the images are opened, read and the requested keys
+    extracted entirely by the underlying library, by a pool of native
+    threads that never hold the GIL. No python object is created for an image
+    until its values are handed back, which makes this the fastest way to
+    extract a narrow set of keys from a large number of files.
+
+    The paths are consumed lazily, chunk_size at a time, and each chunk is
+    read in full before its results are yielded.
+
+    Errors are not raised, a ReadResult with the exception as its error is
+    yielded instead. An invalid key raises a KeyError right away.
+
+    Args:
+    paths -- an iterable of paths of image files, as strings
+    keys -- an iterable of the keys of the tags to extract
+    workers -- the number of native threads reading the images, default 0
+               meaning as many as the hardware can run concurrently
+    chunk_size -- the number of paths handed to the threads at once,
+                  default 256
+
+    Yield ReadResult(path, tags, error) tuples in the order of paths, where
+    tags is a dict {key: (type, raw_value)} of the keys found in the image.
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+
+    keys = list(keys)
+    paths = iter(paths)
+    while True:
+        chunk = list(islice(paths, chunk_size))
+        if not chunk:
+            return
+
+        rows = libexiv2python._readMany(chunk, keys, workers)
+        for path, (values, error) in zip(chunk, rows):
+            if error is not None:
+                yield ReadResult(path, None, error)
+
+            else:
+                tags = dict((key, value) for key, value in zip(keys, values)
+                            if value is not None)
+                yield ReadResult(path, tags, None)
+
+
+# When the images written by a WriteBatch are synced to the disk.
+_FSYNC_POLICIES = ('none', 'file', 'group')
+
+
+def _sync_file(path):
+    # Syncing doesn't need write access, which a read-only image lacks.
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+
+    finally:
+        os.close(fd)
+
+
+def _sync_directory(directory):
+    """Sync a directory to the disk, so that the renames in it are durable,
+    where the platform allows it.
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+
+    except OSError:
+        # Directories can't be opened (e.g. on Windows).
+        return
+
+    try:
+        os.fsync(fd)
+
+    except OSError as error:
+        # Directories can't be synced on some filesystems.
+        if error.errno != errno.EINVAL:
+            raise
+
+    finally:
+        os.close(fd)
+
+
+class WriteBatch(object):
+
+    """Write the metadata of many images durably.
+
+    The metadata of each image added is written, with
+    ImageMetadata.write_to(), to a temporary file next to the image, which
+    replaces it by an atomic rename when the batch is committed: an image is
+    either the old or the new one, never a partially written file, whatever
+    happens to the process.
+
+    Whether the images survive a power loss depends on the fsync policy:
+
+    'none' -- nothing is synced to the disk, which is left to the operating
+              system
+    'file' -- each temporary file is synced before it is renamed, and its
+              directory after it is renamed
+    'group' -- the temporary files are synced when the batch is committed,
+               then renamed, then each directory holding images of the group
+               is synced once: each file is still synced, but the directories
+               are only synced once per group instead of once per image
+
+    The batch is committed every group_size images and by commit(), or when
+    leaving its context without error (it is aborted otherwise).
+
+    The metadata of an image shouldn't be changed between the time it is
+    added and the time the batch is committed. If the path of an image is a
+    symbolic link, the file it points to is replaced, not the link.
+
+    >>> with WriteBatch(fsync='group') as batch:
+    ...     for path in paths:
+    ...         metadata = ImageMetadata(path)
+    ...         metadata.read()
+    ...         metadata['Xmp.xmp.Rating'] = 5
+    ...         batch.add(metadata)
+    """
+
+    def __init__(self, fsync='group', group_size=64,
+                 preserve_timestamps=False):
+        """Instantiate a batch.
+
+        Args:
+        fsync -- the fsync policy, 'none', 'file' or 'group' (default)
+        group_size -- the number of images written before the batch is
+                      committed, default 64
+        preserve_timestamps -- whether to preserve the files' original
+                               timestamps (access time and modification
+                               time), default False
+        """
+        if fsync not in _FSYNC_POLICIES:
+            raise ValueError('Unknown fsync policy: %s' % fsync)
+
+        if group_size < 1:
+            raise ValueError('group_size must be at least 1')
+
+        self.fsync = fsync
+        self.group_size = group_size
+        self.preserve_timestamps = preserve_timestamps
+        # The (metadata, path, temporary path) of the images written but not
+        # committed yet, path being the resolved path of the image.
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+        else:
+            self.abort()
+
+        return False
+
+    def add(self, metadata, force=False):
+        """Write the metadata of an image to a temporary file, to replace the
+        image when the batch is committed.
+
+        Nothing is written if the metadata wasn't changed since it was read
+        or last written, unless force is True.
+
+        Args:
+        metadata -- the ImageMetadata of an image file, read in full
+        force -- whether to write the metadata even if it wasn't changed,
+                 default False
+
+        Return: whether the metadata was written
+        """
+        if metadata.filename is None:
+            raise ValueError('Only the metadata of an image file can be '
+                             'written in a batch')
+
+        metadata._prepare_write()
+        if not (metadata._dirty or force):
+            return False
+
+        # Like the library, replace the target of a symbolic link.
+        path = os.path.realpath(metadata.filename)
+        directory, name = os.path.split(path)
+        fd, temporary = tempfile.mkstemp(prefix='.%s.' % name, dir=directory)
+        try:
+            try:
+                metadata.write_to(fd)
+                os.chmod(temporary, stat.S_IMODE(os.stat(path).st_mode))
+                if self.preserve_timestamps:
+                    os.utime(temporary, (metadata._atime, metadata._mtime))
+
+                if self.fsync == 'file':
+                    os.fsync(fd)
+
+            finally:
+                os.close(fd)
+
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+        self._pending.append((metadata, path, temporary))
+        if len(self._pending) >= self.group_size:
+            self.commit()
+
+        return True
+
+    def commit(self):
+        """Replace the images written since the last commit, syncing them to
+        the disk according to the fsync policy.
+
+        If an error occurs, the images not replaced yet are left untouched.
+
+        Return: the list of the paths of the images replaced
+        """
+        pending, self._pending = self._pending, []
+        committed = []
+        try:
+            if self.fsync == 'group':
+                for metadata, path, temporary in pending:
+                    _sync_file(temporary)
+
+            directories = []
+            for metadata, path, temporary in pending:
+                os.replace(temporary, path)
+                committed.append(metadata)
+                directory = os.path.dirname(path)
+                if self.fsync == 'file':
+                    _sync_directory(directory)
+
+                elif self.fsync == 'group' and directory not in directories:
+                    directories.append(directory)
+
+            for directory in directories:
+                _sync_directory(directory)
+
+        finally:
+            for metadata, path, temporary in pending[len(committed):]:
+                os.remove(temporary)
+
+            for metadata in committed:
+                metadata._written(self.preserve_timestamps)
+
+        return [metadata.filename for metadata in committed]
+
+    def abort(self):
+        """Discard the images written since the last commit, leaving them
+        untouched.
+        """
+        pending, self._pending = self._pending, []
+        for metadata, path, temporary in pending:
+            os.remove(temporary)
@@ -33,12 +33,31 @@ import libexiv2python
 from pyexiv2.utils import (is_fraction, make_fraction, fraction_to_string,
                           NotifyingList, ListenerInterface,
                           undefined_to_string, string_to_undefined,
-                          DateTimeFormatter)
+                          DateTimeFormatter, DateTimeParser, KeyList)
 
-import time
+import array
 import datetime
 import sys
 
+from contextlib import contextmanager
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# The array.array typecodes of the values of the numeric types, as packed by
+# the underlying library. A rational is packed as its numerator followed by
+# its denominator.
+_ARRAY_TYPECODES = {'Short': 'H', 'SShort': 'h', 'Long': 'I', 'SLong': 'i',
+                    'Rational': 'I', 'SRational': 'i'}
+
+# The types whose values are a plain sequence of bytes, transferred as such
+# from and to the underlying library.
+_BYTES_TYPES = ('Undefined', 'Byte', 'SByte')
+
+
 class ExifValueError(ValueError):
     """Exception raised when failing to parse the *value* of an EXIF tag.
 
@@ -70,16 +89,22 @@ class ExifTag(ListenerInterface):
     - Short, SShort: [list of] int
     - Rational, SRational: [list of] :class:`fractions.Fraction` if available
       (Python ≥ 2.6) or :class:`pyexiv2.utils.Rational`      
-    - Undefined: string
+    - Undefined: string, or bytes when set from bytes
+
+    The values of the numeric tags (Short, SShort, Long, SLong, Rational,
+    SRational) are also available as an :class:`array.array` through
+    array_value, and as a NumPy array through numpy_value if NumPy is
+    installed, which is a lot faster for tags with many values.
+
+    The values of the Undefined, Byte and SByte tags are also available as
+    bytes through bytes_value, without going through their decimal string
+    representation, which is a lot faster for large payloads such as
+    Exif.Photo.MakerNote or Exif.Image.InterColorProfile.
     """
-    # According to the EXIF specification, the only accepted format for an Ascii
-    # value representing a datetime is '%Y:%m:%d %H:%M:%S', but it seems that
-    # others formats can be found in the wild.
-    _datetime_formats = ('%Y:%m:%d %H:%M:%S',
-                         '%Y-%m-%d %H:%M:%S',
-                         '%Y-%m-%dT%H:%M:%SZ')
 
-    _date_formats = ('%Y:%m:%d',)
+    # The set of the families changed in the metadata of the image the tag
+    # belongs to, if any.
+    _dirty = None
 
     def __init__(self, key, value=None, _tag=None):
         """ The tag can be initialized with an optional value which expected
@@ -97,6 +122,8 @@ class ExifTag(ListenerInterface):
             self._tag = libexiv2python._ExifTag(key)
 
         self._raw_value = None
+        # Whether the raw value has to be fetched from the underlying library
+        self._raw_value_cookie = False
         self._value = None
         self._value_cookie = False
         if value is not None:
@@ -104,6 +131,12 @@ class ExifTag(ListenerInterface):
 
     def _set_owner(self, metadata):
         self._tag._setParentImage(metadata._image)
+        self._dirty = metadata._dirty
+
+    def _mark_dirty(self):
+        # Record the change in the metadata of the image the tag belongs to.
+        if self._dirty is not None:
+            self._dirty.add('exif')
 
     @staticmethod
     def _from_existing_tag(_tag):
@@ -113,7 +146,9 @@ class ExifTag(ListenerInterface):
         tag = ExifTag(_tag._getKey(), _tag=_tag)
         # Do not set the raw_value property, as it would call _tag._setRawValue
         # (see https://bugs.launchpad.net/pyexiv2/+bug/582445).
-        tag._raw_value = _tag._getRawValue()
+        # The raw value is only fetched when needed, the value of a numeric
+        # tag is computed without it.
+        tag._raw_value_cookie = True
         tag._value_cookie = True
         return tag
 
@@ -169,12 +204,18 @@ class ExifTag(ListenerInterface):
         return self._tag._getSectionDescription()
 
     def _get_raw_value(self):
+        if self._raw_value_cookie:
+            self._raw_value = self._tag._getRawValue()
+            self._raw_value_cookie = False
+
         return self._raw_value
 
     def _set_raw_value(self, value):
         self._tag._setRawValue(value)
         self._raw_value = value
+        self._raw_value_cookie = False
         self._value_cookie = True
+        self._mark_dirty()
 
     raw_value = property(fget=_get_raw_value, fset=_set_raw_value,
                          doc='The raw value of the tag as a string.')
@@ -183,28 +224,116 @@ class ExifTag(ListenerInterface):
         """Lazy computation of the value from the raw value.
 
         """
-        if self.type in ('Short', 'SShort', 'Long', 'SLong', 
-                         'Rational', 'SRational'):
-            # May contain multiple values
-            values = self._raw_value.split()
+        if self.type in _ARRAY_TYPECODES:
+            # May contain multiple values, fetched as numbers rather than
+            # parsed from the raw value.
+            values = self._unpack_values()
             if len(values) > 1:
                 # Make values a notifying list
-                values = [self._convert_to_python(v) for v in values]
                 self._value = NotifyingList(values)
                 self._value.register_listener(self)
                 self._value_cookie = False
                 return
 
-        self._value = self._convert_to_python(self._raw_value)
+            elif len(values) == 1:
+                self._value = values[0]
+                self._value_cookie = False
+                return
+
+        elif self.type == 'Undefined' and self._raw_value_cookie:
+            # Not set from a raw value, the bytes are fetched as such rather
+            # than parsed from the raw value.
+            data = self._tag._getBytesValue()
+            if data is not None:
+                self._value = data.decode('latin-1')
+                self._value_cookie = False
+                return
+
+        self._value = self._convert_to_python(self._get_raw_value())
         self._value_cookie = False
 
+    def _unpack_values(self):
+        # Return the values of a numeric tag as a list of int or Fraction,
+        # fetched straight from the underlying library.
+        packed = self._tag._getArrayValue()
+        if packed is None:
+            return [self._convert_to_python(v)
+                    for v in self._get_raw_value().split()]
+
+        type_, data = packed
+        values = array.array(_ARRAY_TYPECODES[type_])
+        values.frombytes(data)
+        if type_ in ('Rational', 'SRational'):
+            try:
+                return [make_fraction(n, d)
+                        for n, d in zip(values[::2], values[1::2])]
+            except ZeroDivisionError:
+                raise ExifValueError(self._get_raw_value(), self.type)
+
+        return values.tolist()
+
+    def _pack_values(self, values):
+        # Return the values of a numeric tag packed in an array, as expected by
+        # the underlying library.
+        typecode = _ARRAY_TYPECODES[self.type]
+        if self.type in ('Rational', 'SRational'):
+            numbers = []
+            for value in values:
+                if not is_fraction(value) or \
+                    (self.type == 'Rational' and value.numerator < 0):
+                    raise ExifValueError(value, self.type)
+
+                numbers.append(value.numerator)
+                numbers.append(value.denominator)
+
+        else:
+            numbers = values
+            for value in values:
+                if not isinstance(value, int) or \
+                    (self.type in ('Short', 'Long') and value < 0):
+                    raise ExifValueError(value, self.type)
+
+        try:
+            return array.array(typecode, numbers)
+        except OverflowError:
+            raise ExifValueError(values, self.type)
+
     def _get_value(self):
         if self._value_cookie:
             self._compute_value()
         return self._value
 
     def _set_value(self, value):
-        if isinstance(value, (list, tuple)):
+        if self.type in _ARRAY_TYPECODES:
+            # Numbers are passed as such to the underlying library, the raw
+            # value is only computed when needed.
+            if isinstance(value, (list, tuple)):
+                packed = self._pack_values(value)
+
+            else:
+                packed = self._pack_values([value])
+
+            self._tag._setArrayValue(packed)
+            self._raw_value_cookie = True
+
+        elif self.type == 'Undefined' and \
+            isinstance(value, (bytes, bytearray, memoryview)):
+            # Bytes are passed as such to the underlying library. The bytes
+            # value of a Byte or SByte tag is its decimal text, as before,
+            # raw bytes are set through bytes_value.
+            self._tag._setBytesValue(value)
+            self._raw_value_cookie = True
+
+        elif self.type == 'Undefined' and isinstance(value, str):
+            # Each character stands for one byte.
+            try:
+                self._tag._setBytesValue(value.encode('latin-1'))
+            except UnicodeEncodeError:
+                raise ExifValueError(value, self.type)
+
+            self._raw_value_cookie = True
+
+        elif isinstance(value, (list, tuple)):
             raw_values = [self._convert_to_string(v) for v in value]
             self.raw_value = ' '.join(raw_values)
 
@@ -229,10 +358,121 @@ class ExifTag(ListenerInterface):
             self._value = value
 
         self._value_cookie = False
+        self._mark_dirty()
 
     value = property(fget=_get_value, fset=_set_value,
                      doc='The value of the tag as a python object.')
 
+    def _array_typecode(self):
+        # Raise a TypeError if the tag is not numeric.
+        try:
+            return _ARRAY_TYPECODES[self.type]
+        except KeyError:
+            raise TypeError('No array value for EXIF type [%s]' % self.type)
+
+    def _get_array_value(self):
+        typecode = self._array_typecode()
+        packed = self._tag._getArrayValue()
+        if packed is None:
+            # The value read is not of a numeric type, parse its string
+            # representation.
+            raw_value = self._get_raw_value() or ''
+            try:
+                return array.array(typecode, [int(v) for v in
+                                   raw_value.replace('/', ' ').split()])
+            except (ValueError, OverflowError):
+                raise ExifValueError(raw_value, self.type)
+
+        type_, data = packed
+        values = array.array(_ARRAY_TYPECODES.get(type_, typecode))
+        values.frombytes(data)
+        return values
+
+    def _set_packed_values(self, values):
+        # Set the value from packed values, the raw value and the value are
+        # computed again.
+        self._tag._setArrayValue(values)
+        self._forget_value()
+
+    def _forget_value(self):
+        # The value was set straight in the underlying library, the raw value
+        # and the value are computed again when needed.
+        if isinstance(self._value, NotifyingList):
+            self._value.unregister_listener(self)
+
+        self._raw_value_cookie = True
+        self._value = None
+        self._value_cookie = True
+        self._mark_dirty()
+
+    def _set_array_value(self, values):
+        typecode = self._array_typecode()
+        if not (isinstance(values, array.array) and values.typecode == typecode):
+            values = array.array(typecode, values)
+
+        self._set_packed_values(values)
+
+    array_value = property(fget=_get_array_value, fset=_set_array_value,
+        doc='The values of a numeric tag as an array.array, rationals '
+            'flattened as numerator, denominator pairs. The values are read '
+            'and written straight from and to the underlying library, '
+            'without any conversion to string.')
+
+    def _get_numpy_value(self):
+        if numpy is None:
+            raise ImportError('numpy_value requires NumPy')
+
+        values = self._get_array_value()
+        result = numpy.frombuffer(values, dtype=numpy.dtype(values.typecode))
+        if self.type in ('Rational', 'SRational'):
+            result = result.reshape(-1, 2)
+
+        return result
+
+    def _set_numpy_value(self, values):
+        if numpy is None:
+            raise ImportError('numpy_value requires NumPy')
+
+        dtype = numpy.dtype(self._array_typecode())
+        values = numpy.asarray(values).reshape(-1)
+        converted = numpy.ascontiguousarray(values, dtype=dtype)
+        if not numpy.array_equal(converted, values):
+            raise ExifValueError(values, self.type)
+
+        self._set_packed_values(converted)
+
+    numpy_value = property(fget=_get_numpy_value, fset=_set_numpy_value,
+        doc='The values of a numeric tag as a NumPy array, rationals as an '
+            '(N, 2) array of numerators and denominators. Requires NumPy.')
+
+    def _get_bytes_value(self):
+        if self.type not in _BYTES_TYPES:
+            raise TypeError('No bytes value for EXIF type [%s]' % self.type)
+
+        data = self._tag._getBytesValue()
+        if data is None:
+            # The value read is not a sequence of bytes, parse its string
+            # representation.
+            raw_value = self._get_raw_value() or ''
+            try:
+                return bytes(int(v) for v in raw_value.split())
+            except ValueError:
+                raise ExifValueError(raw_value, self.type)
+
+        return data
+
+    def _set_bytes_value(self, data):
+        if self.type not in _BYTES_TYPES:
+            raise TypeError('No bytes value for EXIF type [%s]' % self.type)
+
+        self._tag._setBytesValue(data)
+        self._forget_value()
+
+    bytes_value = property(fget=_get_bytes_value, fset=_set_bytes_value,
+        doc='The value of an Undefined, Byte or SByte tag as bytes. The '
+            'value is read and written straight from and to the underlying '
+            'library, without any conversion to string.')
+
     @property
     def human_value(self):
         """A (read-only) human-readable representation
@@ -247,6 +487,29 @@ class ExifTag(ListenerInterface):
         # self._value is a list of values and its contents changed.
         self._set_value(self._value)
 
+    @contextmanager
+    def batch(self):
+        """Return a context manager yielding the value of the tag, within
+        which the changes to a list of values are converted and passed to the
+        underlying library once, when leaving it, instead of after each
+        change.
+
+        The pending changes are also passed to the underlying library when
+        writing the metadata of the image.
+        """
+        value = self._get_value()
+        if isinstance(value, NotifyingList):
+            with value.batch():
+                yield value
+
+        else:
+            yield value
+
+    def _flush(self):
+        # Pass the changes pending in a batch to the underlying library.
+        if isinstance(self._value, NotifyingList):
+            self._value.flush()
+
     def _match_encoding(self, charset):
         # charset see:
         # http://www.exiv2.org/doc/classExiv2_1_1CommentValue.html
@@ -277,22 +540,14 @@ class ExifTag(ListenerInterface):
         :raise ExifValueError: if the conversion fails
         """
         if self.type == 'Ascii':
-            # The value may contain a Datetime
-            for format in self._datetime_formats:
-                try:
-                    t = time.strptime(value, format)
-                except ValueError:
-                    continue
-                else:
-                    return datetime.datetime(*t[:6])
-            # Or a Date (e.g. Exif.GPSInfo.GPSDateStamp)
-            for format in self._date_formats:
-                try:
-                    t = time.strptime(value, format)
-                except ValueError:
-                    continue
-                else:
-                    return datetime.date(*t[:3])
+            # The value may contain a Datetime or a Date (e.g.
+            # Exif.GPSInfo.GPSDateStamp). According to the EXIF specification,
+            # the only accepted format for a datetime is '%Y:%m:%d %H:%M:%S',
+            # but it seems that others formats can be found in the wild.
+            d = DateTimeParser.exif(value)
+            if d is not None:
+                return d
+
             # Default to string.
             # There is currently no charset conversion.
             # TODO: guess the encoding and decode accordingly into unicode
@@ -491,14 +746,15 @@ class ExifTag(ListenerInterface):
         :rtype: string
         """
         left = '%s [%s]' % (self.key, self.type)
-        if self._raw_value is None:
+        raw_value = self._get_raw_value()
+        if raw_value is None:
             right = '(No value)'
 
-        elif self.type == 'Undefined' and len(self._raw_value) > 100:
+        elif self.type == 'Undefined' and len(raw_value) > 100:
             right = '(Binary value suppressed)'
 
         else:
-             right = self._raw_value
+             right = raw_value
 
         return '<%s = %s>' % (left, right)
 
@@ -545,13 +801,14 @@ class ExifThumbnail(object):
         self._metadata._image._writeExifThumbnailToFile(path)
 
     def _update_exif_tags_cache(self):
-        # Update the cache of EXIF tags
-        keys = self._metadata._image._exifKeys()
+        # The EXIF data changed, update the cache of EXIF tags
+        self._metadata._dirty.add('exif')
+        keys = KeyList(self._metadata._image._exifKeys())
         self._metadata._keys['exif'] = keys
-        #cached = self._metadata._tags['exif'].keys()
-        for key in self._metadata._tags['exif'].keys():
+        cached = self._metadata._tags['exif']
+        for key in list(cached.keys()):
             if key not in keys:
-                del self._metadata._tags['exif'][key]
+                del cached[key]
 
     def erase(self):
         """
@@ -576,14 +833,27 @@ class ExifThumbnail(object):
         self._update_exif_tags_cache()
 
     def _get_data(self):
-        buf_ = self._metadata._image._getExifThumbnailData()
-        return buf_
+        return self._metadata._image._getExifThumbnailData()
 
     def _set_data(self, data):
         self._metadata._image._setExifThumbnailFromData(data)
         self._update_exif_tags_cache()
 
     data = property(fget=_get_data, fset=_set_data,
-                    doc='The raw thumbnail data. Setting it is restricted to ' +
-                        'a buffer in the JPEG format.')
+                    doc='The raw thumbnail data as bytes. Setting it is ' +
+                        'restricted to a buffer in the JPEG format.')
+
+    def data_into(self, buffer_):
+        """
+        Copy the raw thumbnail data into a writable buffer, such as a
+        bytearray, without creating an intermediate bytes object.
+
+        :param buffer_: the buffer to copy the data to, it must be at least
+                        as large as the data
+        :type buffer_: any writable object supporting the buffer protocol
+        :return: the number of bytes copied
+        :rtype: int
+        :raise ValueError: if the buffer is too small
+        """
+        return self._metadata._image._getExifThumbnailDataInto(buffer_)
 
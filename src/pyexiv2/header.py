@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the py3exiv2 distribution.
+#
+# py3exiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# version 3 as published by the Free Software Foundation.
+#
+# py3exiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with py3exiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+
+"""
+Probe the format and the dimensions of an image from its header.
+"""
+
+import os
+import struct
+
+from collections import namedtuple
+from errno import ENOENT
+
+import libexiv2python
+
+
+#: The result of probing an image.
+#: mime_type is the MIME type of the image, width and height its dimensions
+#: in pixels and byte_order the byte order of its EXIF data ('little' or
+#: 'big'). Any of them but mime_type may be None if unknown.
+ProbeResult = namedtuple('ProbeResult',
+                         ['mime_type', 'width', 'height', 'byte_order'])
+
+
+_BYTE_ORDERS = {b'II': 'little', b'MM': 'big'}
+
+# The start of frame markers, that give the dimensions of a JPEG image
+_JPEG_SOF_MARKERS = frozenset(range(0xc0, 0xd0)) - frozenset((0xc4, 0xc8, 0xcc))
+
+
+class _FileReader(object):
+
+    def __init__(self, file_):
+        self._file = file_
+
+    def read(self, offset, size):
+        self._file.seek(offset)
+        return self._file.read(size)
+
+
+class _BufferReader(object):
+
+    def __init__(self, buffer_):
+        self._view = memoryview(buffer_).cast('B')
+
+    def read(self, offset, size):
+        return self._view[offset:offset + size].tobytes()
+
+
+def _probe_jpeg(reader, header):
+    if not header.startswith(b'\xff\xd8'):
+        return None
+
+    width = height = byte_order = None
+    offset = 2
+    while True:
+        segment = reader.read(offset, 4)
+        if len(segment) < 4 or segment[0] != 0xff:
+            break
+
+        marker = segment[1]
+        if marker == 0xff:
+            # Fill byte
+            offset += 1
+            continue
+
+        if marker == 0x01 or 0xd0 <= marker <= 0xd7:
+            # Standalone marker
+            offset += 2
+            continue
+
+        if marker in (0xd9, 0xda):
+            # End of image or start of scan
+            break
+
+        if marker == 0xe1 and byte_order is None:
+            identifier = reader.read(offset + 4, 8)
+            if identifier[:6] == b'Exif\x00\x00':
+                byte_order = _BYTE_ORDERS.get(identifier[6:])
+
+        elif marker in _JPEG_SOF_MARKERS:
+            data = reader.read(offset + 5, 4)
+            if len(data) == 4:
+                height, width = struct.unpack('>HH', data)
+
+            # The EXIF data, if any, comes before the frame.
+            break
+
+        offset += 2 + ((segment[2] << 8) | segment[3])
+
+    return ProbeResult('image/jpeg', width, height, byte_order)
+
+
+def _probe_png(reader, header):
+    if not header.startswith(b'\x89PNG\r\n\x1a\n') or header[12:16] != b'IHDR':
+        return None
+
+    if len(header) < 24:
+        # Truncated header
+        return None
+
+    width, height = struct.unpack('>II', header[16:24])
+    return ProbeResult('image/png', width, height, None)
+
+
+def _probe_gif(reader, header):
+    if header[:6] not in (b'GIF87a', b'GIF89a') or len(header) < 10:
+        return None
+
+    width, height = struct.unpack('<HH', header[6:10])
+    return ProbeResult('image/gif', width, height, None)
+
+
+def _probe_bmp(reader, header):
+    if not header.startswith(b'BM') or len(header) < 18:
+        return None
+
+    if struct.unpack('<I', header[14:18])[0] == 12:
+        # OS/2 1.x header
+        if len(header) < 22:
+            return None
+
+        width, height = struct.unpack('<HH', header[18:22])
+
+    else:
+        if len(header) < 26:
+            return None
+
+        width, height = struct.unpack('<ii', header[18:26])
+
+    return ProbeResult('image/x-ms-bmp', width, abs(height), None)
+
+
+# The size of the header of a WebP image needed to read its dimensions, by
+# type of its first chunk.
+_WEBP_HEADER_SIZES = {b'VP8 ': 30, b'VP8L': 25, b'VP8X': 30}
+
+
+def _probe_webp(reader, header):
+    if header[:4] != b'RIFF' or header[8:12] != b'WEBP':
+        return None
+
+    chunk = header[12:16]
+    if len(header) < _WEBP_HEADER_SIZES.get(chunk, 0):
+        # Truncated header
+        return None
+
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', header[26:30])
+        width &= 0x3fff
+        height &= 0x3fff
+
+    elif chunk == b'VP8L':
+        bits = struct.unpack('<I', header[21:25])[0]
+        width = (bits & 0x3fff) + 1
+        height = ((bits >> 14) & 0x3fff) + 1
+
+    elif chunk == b'VP8X':
+        width = (struct.unpack('<I', header[24:27] + b'\x00')[0]) + 1
+        height = (struct.unpack('<I', header[27:30] + b'\x00')[0]) + 1
+
+    else:
+        width = height = None
+
+    return ProbeResult('image/webp', width, height, None)
+
+
+def _probe_psd(reader, header):
+    if header[:4] != b'8BPS' or len(header) < 22:
+        return None
+
+    height, width = struct.unpack('>II', header[14:22])
+    return ProbeResult('image/x-photoshop', width, height, None)
+
+
+def _probe_tiff(reader, header):
+    byte_order = _BYTE_ORDERS.get(header[:2])
+    if byte_order is None or len(header) < 8:
+        return None
+
+    prefix = '<' if byte_order == 'little' else '>'
+    if struct.unpack(prefix + 'H', header[2:4])[0] != 42:
+        return None
+
+    # Only look at the dimensions in the first IFD.
+    width = height = None
+    offset = struct.unpack(prefix + 'I', header[4:8])[0]
+    count = reader.read(offset, 2)
+    if len(count) == 2:
+        count = struct.unpack(prefix + 'H', count)[0]
+        entries = reader.read(offset + 2, 12 * count)
+        for i in range(len(entries) // 12):
+            tag, type_ = struct.unpack(prefix + 'HH', entries[12 * i:12 * i + 4])
+            if tag not in (256, 257):
+                continue
+
+            if type_ == 3:
+                # SHORT
+                value = struct.unpack(prefix + 'H', entries[12 * i + 8:12 * i + 10])[0]
+
+            elif type_ == 4:
+                # LONG
+                value = struct.unpack(prefix + 'I', entries[12 * i + 8:12 * i + 12])[0]
+
+            else:
+                continue
+
+            if tag == 256:
+                width = value
+
+            else:
+                height = value
+
+    # TIFF based RAW formats are told apart by the library.
+    return ProbeResult(None, width, height, byte_order)
+
+
+_PROBES = (_probe_jpeg, _probe_png, _probe_gif, _probe_bmp, _probe_webp,
+           _probe_psd, _probe_tiff)
+
+
+def _probe(reader, image):
+    header = reader.read(0, 32)
+    for probe_ in _PROBES:
+        result = probe_(reader, header)
+        if result is not None:
+            break
+
+    else:
+        result = ProbeResult(None, None, None, None)
+
+    if result.mime_type is None:
+        # Let the library detect the format, without reading the metadata.
+        result = result._replace(mime_type=image()._probeMimeType())
+
+    return result
+
+
+def probe(path_or_buffer):
+    """Return the MIME type, the dimensions and the byte order of an image.
+
+    Only the header of the image is looked at, its EXIF, IPTC and XMP data
+    are never decoded, which makes it a lot faster than reading the metadata
+    when only the format or the size of an image is needed.
+
+    The dimensions are those found in the header of JPEG, PNG, GIF, BMP,
+    WebP, PSD and TIFF (and TIFF based RAW) images, None for other formats.
+    The byte order is that of the EXIF data of JPEG and TIFF images, None for
+    other formats or when there is no EXIF data.
+
+    Raise an IOError if the file doesn't exist and a TypeError if the image
+    type is not supported.
+
+    Args:
+    path_or_buffer -- the path to an image file or an object supporting the
+                      buffer protocol (bytes, bytearray, memoryview, mmap...)
+                      containing image data
+
+    Return a ProbeResult(mime_type, width, height, byte_order) tuple.
+    """
+    if isinstance(path_or_buffer, str):
+        path = path_or_buffer
+        if not os.path.isfile(path):
+            raise IOError(ENOENT, os.strerror(ENOENT), path)
+
+        with open(path, 'rb') as file_:
+            return _probe(_FileReader(file_),
+                          lambda: libexiv2python._Image(path))
+
+    buffer_ = path_or_buffer
+    return _probe(_BufferReader(buffer_),
+                  lambda: libexiv2python._Image(buffer_,
+                                                memoryview(buffer_).nbytes))
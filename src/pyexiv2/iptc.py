@@ -31,13 +31,14 @@ IPTC specific code.
 import libexiv2python
 
 from pyexiv2.utils import ListenerInterface, NotifyingList, \
-                          FixedOffset, DateTimeFormatter
+                          FixedOffset, DateTimeFormatter, DateTimeParser
 
-import time
 import datetime
 import re
 import warnings
 
+from contextlib import contextmanager
+
 
 class IptcValueError(ValueError):
 
@@ -77,6 +78,10 @@ class IptcTag(ListenerInterface):
     # custom regular expression
     _time_zone_re = r'(?P<sign>\+|-)(?P<ohours>\d{2}):(?P<ominutes>\d{2})'
     _time_re = re.compile(r'(?P<hours>\d{2}):(?P<minutes>\d{2}):(?P<seconds>\d{2})(?P<tzd>%s)' % _time_zone_re)
+    # The set of the families changed in the metadata of the image the tag
+    # belongs to, if any.
+    _dirty = None
+
     def __init__(self, key, values=None, _tag=None):
         """The tag can be initialized with an optional list of values which
         expected type depends on the IPTC type of the tag.
@@ -93,6 +98,8 @@ class IptcTag(ListenerInterface):
             self._tag = libexiv2python._IptcTag(key)
 
         self._raw_values = None
+        # Whether the raw values have to be fetched from the underlying library
+        self._raw_values_cookie = False
         self._values = None
         self._values_cookie = False
         if values is not None:
@@ -100,6 +107,12 @@ class IptcTag(ListenerInterface):
 
     def _set_owner(self, metadata):
         self._tag._setParentImage(metadata._image)
+        self._dirty = metadata._dirty
+
+    def _mark_dirty(self):
+        # Record the change in the metadata of the image the tag belongs to.
+        if self._dirty is not None:
+            self._dirty.add('iptc')
 
     @staticmethod
     def _from_existing_tag(_tag):
@@ -108,7 +121,9 @@ class IptcTag(ListenerInterface):
         # Do not set the raw_value property, as it would call
         # _tag._setRawValues
         # (see https://bugs.launchpad.net/pyexiv2/+bug/582445).
-        tag._raw_values = _tag._getRawValues()
+        # The raw values are only fetched when needed, the values of a Short,
+        # Date or Time tag are computed without them.
+        tag._raw_values_cookie = True
         tag._values_cookie = True
         return tag
 
@@ -178,6 +193,10 @@ class IptcTag(ListenerInterface):
         return self._tag._getRecordDescription()
 
     def _get_raw_values(self):
+        if self._raw_values_cookie:
+            self._raw_values = self._tag._getRawValues()
+            self._raw_values_cookie = False
+
         return self._raw_values
 
     def _set_raw_values(self, values):
@@ -186,15 +205,28 @@ class IptcTag(ListenerInterface):
 
         self._tag._setRawValues(values)
         self._raw_values = values
+        self._raw_values_cookie = False
         self._values_cookie = True
+        self._mark_dirty()
 
     raw_value = property(fget=_get_raw_values, fset=_set_raw_values,
                          doc='The raw values of the tag as a list of strings.')
 
     def _compute_values(self):
-        # Lazy computation of the values from the raw values
-        self._values = NotifyingList([self._convert_to_python(v) 
-                                        for v in self._raw_values])
+        # Lazy computation of the values from the raw values, or straight from
+        # the typed values of the underlying library where available.
+        typed_values = None
+        if self.type in ('Short', 'Date', 'Time'):
+            typed_values = self._tag._getTypedValues()
+
+        if typed_values is None:
+            values = [self._convert_to_python(v)
+                      for v in self._get_raw_values()]
+
+        else:
+            values = [self._convert_typed_to_python(v) for v in typed_values]
+
+        self._values = NotifyingList(values)
         self._values.register_listener(self)
         self._values_cookie = False
 
@@ -208,7 +240,15 @@ class IptcTag(ListenerInterface):
         if not isinstance(values, (list, tuple)):
             raise TypeError('Expecting a list of values')
 
-        self.raw_value = [self._convert_to_string(v) for v in values]
+        if self.type in ('Short', 'Date', 'Time'):
+            # Passed as such to the underlying library, the raw values are
+            # only computed when needed.
+            self._tag._setTypedValues([self._convert_to_typed(v)
+                                       for v in values])
+            self._raw_values_cookie = True
+
+        else:
+            self.raw_value = [self._convert_to_string(v) for v in values]
 
         if isinstance(self._values, NotifyingList):
             self._values.unregister_listener(self)
@@ -223,6 +263,7 @@ class IptcTag(ListenerInterface):
 
         self._values.register_listener(self)
         self._values_cookie = False
+        self._mark_dirty()
 
     value = property(fget=_get_values, fset=_set_values,
                      doc='The values of the tag as a list of python objects.')
@@ -231,9 +272,32 @@ class IptcTag(ListenerInterface):
         # Implementation of the ListenerInterface.
         # React on changes to the list of values of the tag.
         # The contents of self._values was changed.
-        # The following is a quick, non optimal solution.
+        # All the values are passed again, changes made within batch() are
+        # passed at once.
         self._set_values(self._values)
 
+    @contextmanager
+    def batch(self):
+        """Return a context manager yielding the list of values of the tag,
+        within which its changes are converted and passed to the underlying
+        library once, when leaving it, instead of after each change.
+
+        The pending changes are also passed to the underlying library when
+        writing the metadata of the image.
+        """
+        values = self._get_values()
+        if isinstance(values, NotifyingList):
+            with values.batch():
+                yield values
+
+        else:
+            yield values
+
+    def _flush(self):
+        # Pass the changes pending in a batch to the underlying library.
+        if isinstance(self._values, NotifyingList):
+            self._values.flush()
+
     def _convert_to_python(self, value):
         """Convert one raw value to its corresponding python type.
 
@@ -267,10 +331,8 @@ class IptcTag(ListenerInterface):
             # representing a date is '%Y%m%d'. However, the string returned by
             # exiv2 using method DateValue::toString() is formatted using
             # pattern '%Y-%m-%d'.
-            format = '%Y-%m-%d'
             try:
-                t = time.strptime(value, format)
-                return datetime.date(*t[:3])
+                return DateTimeParser.iptc_date(value)
             except ValueError:
                 raise IptcValueError(value, self.type)
 
@@ -302,6 +364,74 @@ class IptcTag(ListenerInterface):
 
         raise IptcValueError(value, self.type)
 
+    def _convert_typed_to_python(self, value):
+        """Convert one typed value of a Short, Date or Time tag, as returned by
+        the underlying library, to its corresponding python type.
+
+        Args:
+        value -- an int, a (year, month, day) tuple or a (hour, minute, second,
+                 tzHour, tzMinute) tuple
+
+        Return: the value converted to its corresponding python type
+
+        Raise IptcValueError: if the conversion fails
+        """
+        if self.type == 'Short':
+            return value
+
+        elif self.type == 'Date':
+            try:
+                return datetime.date(*value)
+            except ValueError:
+                raise IptcValueError(value, self.type)
+
+        elif self.type == 'Time':
+            hours, minutes, seconds, tz_hours, tz_minutes = value
+            sign = '-' if tz_hours < 0 or tz_minutes < 0 else '+'
+            tzinfo = FixedOffset(sign, abs(tz_hours), abs(tz_minutes))
+            try:
+                return datetime.time(hours, minutes, seconds, tzinfo=tzinfo)
+            except ValueError:
+                raise IptcValueError(value, self.type)
+
+        raise IptcValueError(value, self.type)
+
+    def _convert_to_typed(self, value):
+        """Convert one value of a Short, Date or Time tag to the typed value
+        expected by the underlying library.
+
+        Args:
+        value -- the value to be converted
+
+        Return: an int, a (year, month, day) tuple or a (hour, minute, second,
+        tzHour, tzMinute) tuple
+
+        Raise IptcValueError: if the conversion fails
+        """
+        if self.type == 'Short':
+            if isinstance(value, int) and 0 <= value <= 0xffff:
+                return value
+
+        elif self.type == 'Date':
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                return (value.year, value.month, value.day)
+
+        elif self.type == 'Time':
+            if isinstance(value, (datetime.time, datetime.datetime)):
+                offset = 0
+                if value.tzinfo is not None:
+                    t = value.utcoffset()
+                    if t is not None:
+                        offset = int(t.total_seconds()) // 60
+
+                # Both parts of the offset have the sign of the offset.
+                tz_hours = int(abs(offset) / 60) * (-1 if offset < 0 else 1)
+                tz_minutes = abs(offset) % 60 * (-1 if offset < 0 else 1)
+                return (value.hour, value.minute, value.second,
+                        tz_hours, tz_minutes)
+
+        raise IptcValueError(value, self.type)
+
     def _convert_to_string(self, value):
         """Convert one value to its corresponding string representation,
         suitable to pass to libexiv2.
@@ -361,11 +491,12 @@ class IptcTag(ListenerInterface):
 
         """
         left = '%s [%s]' % (self.key, self.type)
-        if self._raw_values is None:
+        raw_values = self._get_raw_values()
+        if raw_values is None:
             right = '(No values)'
 
         else:
-             right = self._raw_values
+             right = raw_values
 
         return '<%s = %s>' % (left, right)
 
@@ -0,0 +1,490 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the py3exiv2 distribution.
+#
+# py3exiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# version 3 as published by the Free Software Foundation.
+#
+# py3exiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with py3exiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+"""
+Write the metadata segments of a JPEG file, in place or around a copy of the
+image data.
+"""
+
+import errno
+import io
+import os
+import stat
+import tempfile
+
+# The identifiers at the start of the APP1 segments holding the EXIF and the
+# XMP data, and of the APP13 segments holding the Photoshop data (and the
+# IPTC data in it).
+_EXIF_ID = b'Exif\x00\x00'
+_XMP_ID = b'http://ns.adobe.com/xap/1.0/\x00'
+_PS_ID = b'Photoshop 3.0\x00'
+
+# The largest payload of a segment.
+_MAX_PAYLOAD = 0xffff - 2
+
+# The processing instruction ending an XMP packet, the padding goes before it.
+_XMP_TRAILER = b'<?xpacket end='
+
+
+def _segments(file_):
+    """Walk the segments of a JPEG file up to the start of scan.
+
+    Args:
+    file_ -- a binary file object, past the start of image marker
+
+    Yield (marker, offset, size) tuples for the segments with a payload,
+    offset being the offset of the marker and size that of the payload. The
+    last one is the start of scan, if found.
+    """
+    offset = 2
+    while True:
+        file_.seek(offset)
+        header = file_.read(4)
+        if len(header) < 4 or header[0] != 0xff:
+            return
+
+        marker = header[1]
+        if marker == 0xff:
+            # Fill byte
+            offset += 1
+            continue
+
+        if marker == 0x01 or 0xd0 <= marker <= 0xd7:
+            # Standalone marker
+            offset += 2
+            continue
+
+        if marker == 0xd9:
+            # End of image
+            return
+
+        size = ((header[2] << 8) | header[3]) - 2
+        if size < 0:
+            return
+
+        yield marker, offset, size
+        if marker == 0xda:
+            # Start of scan
+            return
+
+        offset += 4 + size
+
+
+def _family(marker, payload):
+    """Return the family of the metadata held by a segment, if any.
+
+    Args:
+    marker -- the marker of the segment
+    payload -- the payload of the segment, or at least its start
+    """
+    if marker == 0xe1:
+        if payload.startswith(_EXIF_ID):
+            return 'exif'
+
+        elif payload.startswith(_XMP_ID):
+            return 'xmp'
+
+    elif marker == 0xed and payload.startswith(_PS_ID):
+        return 'iptc'
+
+    elif marker == 0xfe:
+        return 'comment'
+
+    return None
+
+
+def _metadata_segments(file_):
+    """Locate the first EXIF and XMP segments of a JPEG file, like the
+    library does when reading them.
+
+    Args:
+    file_ -- a binary file object
+
+    Return: a dict {family: (offset, size)} of the payloads of the segments
+    found, None if the file is not a JPEG image
+    """
+    file_.seek(0)
+    if file_.read(2) != b'\xff\xd8':
+        return None
+
+    segments = {}
+    for marker, offset, size in _segments(file_):
+        if marker == 0xe1:
+            file_.seek(offset + 4)
+            family = _family(marker, file_.read(len(_XMP_ID)))
+            if family is not None and family not in segments:
+                segments[family] = (offset + 4, size)
+
+    return segments
+
+
+def _exif_payload(tiff, size):
+    """Return the payload of an EXIF segment of the given size, None if the
+    EXIF data doesn't fit in it.
+
+    Args:
+    tiff -- the EXIF data encoded as a TIFF structure
+    size -- the size of the payload of the segment
+    """
+    payload = _EXIF_ID + tiff
+    if not tiff or len(payload) > size:
+        return None
+
+    # The IFDs are located through their offsets, the padding after them is
+    # ignored by readers.
+    return payload + b'\x00' * (size - len(payload))
+
+
+def _xmp_payload(packet, size):
+    """Return the payload of an XMP segment of the given size, None if the
+    XMP packet doesn't fit in it.
+
+    The packet is padded with white space before its trailer, as provided
+    for by the XMP specification.
+
+    Args:
+    packet -- the XMP packet
+    size -- the size of the payload of the segment
+    """
+    end = packet.rfind(_XMP_TRAILER)
+    if end == -1:
+        return None
+
+    # Drop the padding of the packet as serialized, if any.
+    body = packet[:end].rstrip()
+    trailer = packet[end:]
+    padding = size - len(_XMP_ID) - len(body) - len(trailer)
+    if padding < 0:
+        return None
+
+    # Lines of 100 characters, the way XMP writers usually pad.
+    lines = (b'\n' + b' ' * 99) * (padding // 100 + 1)
+    return _XMP_ID + body + lines[:padding] + trailer
+
+
+_PAYLOADS = {'exif': _exif_payload, 'xmp': _xmp_payload}
+
+
+def patch(path, image, families):
+    """Overwrite the EXIF and/or XMP segments of a JPEG file in place.
+
+    The segments keep their size and position, the rest of the file is left
+    untouched. Nothing is written unless the file is a JPEG image with all
+    the segments to patch, and the new data fits in each of them. The EXIF
+    data is encoded over the original one, so that its layout is kept when
+    possible, like the library does when writing the whole file.
+
+    Args:
+    path -- the path of a JPEG file
+    image -- the libexiv2python._Image the metadata is encoded from
+    families -- the families to patch, 'exif' and/or 'xmp'
+
+    Return: True if the file was patched, False otherwise
+    """
+    with open(path, 'r+b') as file_:
+        segments = _metadata_segments(file_)
+        if segments is None:
+            return False
+
+        patches = []
+        for family in families:
+            try:
+                offset, size = segments[family]
+            except KeyError:
+                # Adding a segment requires to rewrite the file.
+                return False
+
+            if family == 'exif':
+                file_.seek(offset + len(_EXIF_ID))
+                value = image._encodeExif(file_.read(size - len(_EXIF_ID)))
+
+            else:
+                value = image._encodeXmp()
+
+            payload = _PAYLOADS[family](value, size)
+            if payload is None:
+                return False
+
+            patches.append((offset, payload))
+
+        for offset, payload in patches:
+            file_.seek(offset)
+            file_.write(payload)
+
+    return True
+
+
+def _exif_segments(image, originals):
+    # The EXIF data is encoded over the original one, the first segment
+    # being the one read, so that its layout is kept when possible.
+    tiff = image._encodeExif(originals[0] if originals else None)
+    return [_EXIF_ID + tiff] if tiff else []
+
+
+def _xmp_segments(image, originals):
+    packet = image._encodeXmp()
+    return [_XMP_ID + packet] if packet else []
+
+
+def _iptc_segments(image, originals):
+    # The other resource blocks of the Photoshop data are kept, and the data
+    # split over as many segments as needed.
+    data = image._encodeIptc(b''.join(originals))
+    step = _MAX_PAYLOAD - len(_PS_ID)
+    return [_PS_ID + data[i:i + step] for i in range(0, len(data), step)]
+
+
+def _comment_segments(image, originals):
+    comment = image._getComment().encode('utf-8')
+    return [comment] if comment else []
+
+
+# The marker, the identifier and the encoder of the segments of each family,
+# the latter called with the image and the payloads of the original segments
+# without their identifier, and returning the payloads of the new ones.
+_SPLICED = {'exif': (0xe1, _EXIF_ID, _exif_segments),
+            'xmp': (0xe1, _XMP_ID, _xmp_segments),
+            'iptc': (0xed, _PS_ID, _iptc_segments),
+            'comment': (0xfe, b'', _comment_segments)}
+
+# The errors telling that a system call can't copy between two files.
+_COPY_UNSUPPORTED = frozenset(getattr(errno, name) for name in
+                              ('EXDEV', 'ENOSYS', 'EINVAL', 'EOPNOTSUPP',
+                               'ENOTSUP', 'EBADF', 'ETXTBSY')
+                              if hasattr(errno, name))
+
+# The size of the chunks copied through user space.
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _copy_range(source, destination, offset, count):
+    """Copy a range of a file at the current position of another one.
+
+    The copy is left to the kernel where possible, with copy_file_range(),
+    which shares the blocks between the files on filesystems supporting it
+    (e.g. XFS or btrfs), or sendfile(). The data goes through user space
+    otherwise.
+
+    Args:
+    source -- the binary file object to copy from
+    destination -- the binary file object to copy to, flushed, with or
+                   without a file descriptor
+    offset -- the offset of the range in source
+    count -- the size of the range
+    """
+    try:
+        fd = destination.fileno()
+
+    except (AttributeError, io.UnsupportedOperation):
+        fd = None
+
+    for name in ('copy_file_range', 'sendfile'):
+        function = getattr(os, name, None)
+        if fd is None or function is None:
+            continue
+
+        try:
+            while count > 0:
+                if name == 'copy_file_range':
+                    copied = function(source.fileno(), fd, count, offset)
+
+                else:
+                    copied = function(fd, source.fileno(), offset, count)
+
+                if copied == 0:
+                    # End of the source file
+                    break
+
+                offset += copied
+                count -= copied
+
+        except OSError as error:
+            if error.errno not in _COPY_UNSUPPORTED:
+                raise
+
+        else:
+            if destination.seekable():
+                # The file object doesn't know the data was written behind
+                # its back.
+                destination.seek(os.lseek(fd, 0, os.SEEK_CUR))
+
+            return
+
+    source.seek(offset)
+    while count > 0:
+        data = source.read(min(count, _CHUNK_SIZE))
+        if not data:
+            return
+
+        destination.write(data)
+        count -= len(data)
+
+
+def _spliced_header(source, image, families):
+    """Build the segments of a JPEG file up to its start of scan, with new
+    segments for the given families.
+
+    The new segments of a family go where its first segment was, or after
+    the leading APP0 segments if it had none.
+
+    Args:
+    source -- the JPEG file, as a binary file object
+    image -- the libexiv2python._Image the metadata is encoded from
+    families -- the families to write, among 'exif', 'xmp', 'iptc' and
+                'comment'
+
+    Return: a tuple (header, offset) of the segments as bytes and of the
+    offset of the start of scan in source, None if it couldn't be done (it
+    is not a JPEG image, it has no start of scan or the new data of a
+    family doesn't fit in a segment)
+    """
+    source.seek(0)
+    if source.read(2) != b'\xff\xd8':
+        return None
+
+    # The segments to write, as bytes, or the family whose new segments go
+    # there.
+    layout = []
+    # The payloads of the segments of each family replaced.
+    originals = {}
+    scan = None
+    for marker, offset, size in _segments(source):
+        if marker == 0xda:
+            scan = offset
+            break
+
+        source.seek(offset)
+        segment = source.read(4 + size)
+        family = _family(marker, segment[4:])
+        if family not in families:
+            layout.append(segment)
+            continue
+
+        if family not in originals:
+            originals[family] = []
+            layout.append(family)
+
+        identifier = _SPLICED[family][1]
+        originals[family].append(segment[4 + len(identifier):])
+
+    if scan is None:
+        return None
+
+    index = 0
+    while (index < len(layout) and isinstance(layout[index], bytes) and
+           layout[index][1] == 0xe0):
+        index += 1
+
+    for family in ('exif', 'xmp', 'iptc', 'comment'):
+        if family in families and family not in originals:
+            layout.insert(index, family)
+            index += 1
+
+    header = [b'\xff\xd8']
+    for item in layout:
+        if isinstance(item, bytes):
+            header.append(item)
+            continue
+
+        marker, identifier, encode = _SPLICED[item]
+        for payload in encode(image, originals.get(item, [])):
+            if len(payload) > _MAX_PAYLOAD:
+                return None
+
+            size = len(payload) + 2
+            header.append(bytes((0xff, marker, size >> 8, size & 0xff)))
+            header.append(payload)
+
+    return b''.join(header), scan
+
+
+def splice_to(path, image, families, destination):
+    """Write a JPEG file with new segments for the given families to a
+    destination, the file itself being left untouched.
+
+    Only the segments of the metadata are built in memory: the segments of
+    the other families are kept as they are, and the image data is copied
+    from the start of scan on without going through user space where
+    possible (see _copy_range()).
+
+    Args:
+    path -- the path of a JPEG file
+    image -- the libexiv2python._Image the metadata is encoded from
+    families -- the families to write, among 'exif', 'xmp', 'iptc' and
+                'comment'
+    destination -- a binary file object open for writing
+
+    Return: True if the file was written, False if it couldn't be done, in
+    which case nothing was written (see _spliced_header())
+    """
+    with open(path, 'rb') as source:
+        spliced = _spliced_header(source, image, families)
+        if spliced is None:
+            return False
+
+        header, scan = spliced
+        destination.write(header)
+        destination.flush()
+        _copy_range(source, destination, scan,
+                    os.fstat(source.fileno()).st_size - scan)
+
+    return True
+
+
+def splice(path, image, families):
+    """Rewrite a JPEG file with new segments for the given families.
+
+    The file is written like with splice_to() to a temporary file in the
+    same directory, which then replaces it. If path is a symbolic link, the
+    file it points to is replaced, not the link.
+
+    Args:
+    path -- the path of a JPEG file
+    image -- the libexiv2python._Image the metadata is encoded from
+    families -- the families to write, among 'exif', 'xmp', 'iptc' and
+                'comment'
+
+    Return: True if the file was written, False if it couldn't be done (see
+    _spliced_header())
+    """
+    # Like the library, replace the target of a symbolic link.
+    path = os.path.realpath(path)
+    directory, name = os.path.split(path)
+    fd, temporary = tempfile.mkstemp(prefix='.%s.' % name, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            spliced = splice_to(path, image, families, destination)
+
+        if spliced:
+            os.chmod(temporary, stat.S_IMODE(os.stat(path).st_mode))
+            os.replace(temporary, path)
+            return True
+
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+    os.remove(temporary)
+    return False
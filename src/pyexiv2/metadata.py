@@ -28,11 +28,14 @@
 Provide the ImageMetadata class.
 """
 
+import io
 import os
 import sys
 import codecs
+import asyncio
 
 from errno import ENOENT
+from functools import partial
 from itertools import chain
 
 if sys.version_info < (3, 3):
@@ -46,6 +49,60 @@ from pyexiv2.exif import ExifTag, ExifThumbnail
 from pyexiv2.iptc import IptcTag
 from pyexiv2.xmp import XmpTag
 from pyexiv2.preview import Preview
+from pyexiv2 import jpeg
+from pyexiv2.utils import KeyList
+
+
+_FAMILIES = frozenset(('exif', 'iptc', 'xmp'))
+
+_TAG_CLASSES = {'exif': ExifTag, 'iptc': IptcTag, 'xmp': XmpTag}
+
+# How the metadata can be written back to an image file.
+_WRITE_MODES = ('rewrite', 'inplace', 'splice')
+
+# The families whose segments can be patched in place in a JPEG file.
+_INPLACE_FAMILIES = frozenset(('exif', 'xmp'))
+
+
+class Projection(object):
+
+    """A list of metadata keys to fetch at once with ImageMetadata.get_many().
+
+    The keys are parsed once when the projection is created, so that a
+    projection can be reused to fetch the same tags from many images at no
+    additional cost.
+    """
+
+    def __init__(self, keys):
+        """Compile a projection.
+
+        Raise a KeyError if one of the keys is invalid.
+
+        Args:
+        keys -- an iterable of metadata keys in the dotted form
+                ``familyName.groupName.tagName`` where ``familyName`` may
+                be one of ``exif``, ``iptc`` or ``xmp``.
+        """
+        self._keys = tuple(keys)
+        self._families = tuple(key.split('.')[0].lower() for key in self._keys)
+        for key, family in zip(self._keys, self._families):
+            if family not in _FAMILIES:
+                raise KeyError(key)
+
+        self._projection = libexiv2python._KeyProjection(list(self._keys))
+
+    @property
+    def keys(self):
+        """The keys of the projection, as a tuple."""
+        return self._keys
+
+    @property
+    def families(self):
+        """The families of the keys of the projection, as a frozenset."""
+        return frozenset(self._families)
+
+    def __repr__(self):
+        return '<Projection %r>' % (self._keys,)
 
 
 class ImageMetadata(MutableMapping):
@@ -68,6 +125,11 @@ class ImageMetadata(MutableMapping):
         self._keys = {'exif': None, 'iptc': None, 'xmp': None}
         self._tags = {'exif': {}, 'iptc': {}, 'xmp': {}}
         self._exif_thumbnail = None
+        self._families = _FAMILIES
+        self._pruned = False
+        # The families changed since the metadata was read or written, among
+        # 'exif', 'iptc', 'xmp' and 'comment'. The tags of the image share it.
+        self._dirty = set()
 
     def _instantiate_image(self, filename):
         """Instanciate the exiv2 image.
@@ -88,13 +150,19 @@ class ImageMetadata(MutableMapping):
 
     @classmethod
     def from_buffer(cls, buffer_):
-        """Instantiate an image container from an image memoryview.
+        """Instantiate an image container from an image buffer.
+
+        The image data is not copied, it is parsed straight from the memory
+        of the buffer object. A reference to it is kept for as long as the
+        image container exists, during which time a bytearray can't be
+        resized and a mmap can't be closed.
 
         Args:
-        buffer_ -- a memoryview containing image data as bytes
+        buffer_ -- an object supporting the buffer protocol (bytes,
+                   bytearray, memoryview, mmap...) containing image data
         """
         obj = cls(None)
-        obj.__image = libexiv2python._Image(buffer_, len(buffer_))
+        obj.__image = libexiv2python._Image(buffer_, memoryview(buffer_).nbytes)
         return obj
 
     @property
@@ -104,27 +172,138 @@ class ImageMetadata(MutableMapping):
 
         return self.__image
 
-    def read(self):
+    def read(self, families=None, keys=None, key_prefixes=None):
         """Read the metadata embedded in the associated image.
 
         It is necessary to call this method once before attempting to access
         the metadata (an exception will be raised if trying to access metadata
         before calling this method).
+
+        Only the families requested are parsed, which is a lot faster on
+        JPEG images when e.g. the XMP metadata isn't needed. Accessing the
+        tags of a family not read raises an IOError, and the metadata can't
+        be written back unless all the families were read.
+
+        If keys or key_prefixes are given, only the matching tags are kept
+        once the metadata is parsed, the other ones are dropped right away
+        to keep the memory used by the image small. The metadata can't be
+        written back then.
+
+        Args:
+        families -- an optional iterable of the families to read, among
+                    'exif', 'iptc' and 'xmp', default all of them (or the
+                    families of keys and key_prefixes if any is given)
+        keys -- an optional iterable of the keys of the tags to keep
+        key_prefixes -- an optional iterable of prefixes of the keys of the
+                        tags to keep, e.g. 'Exif.GPSInfo.'
         """
+        pruned = keys is not None or key_prefixes is not None
+        if pruned:
+            keys = Projection(keys or ())
+            key_prefixes = list(key_prefixes or ())
+            prefix_families = [prefix.split('.')[0].lower()
+                               for prefix in key_prefixes]
+            for prefix, family in zip(key_prefixes, prefix_families):
+                if family not in _FAMILIES:
+                    raise ValueError('Unknown metadata family: %s' % prefix)
+
+            if families is None:
+                families = keys.families.union(prefix_families)
+
+        if families is None:
+            families = _FAMILIES
+
+        else:
+            families = frozenset(family.lower() for family in families)
+            for family in families - _FAMILIES:
+                raise ValueError('Unknown metadata family: %s' % family)
+
         if self.__image is None:
             self.__image = self._instantiate_image(self.filename)
 
-        self.__image._readMetadata()
+        self.__image._readMetadata('exif' in families, 'iptc' in families,
+                                   'xmp' in families)
+        if pruned:
+            self.__image._pruneMetadata(keys._projection, key_prefixes)
+
+        # The tags of a previous read are gone.
+        self._keys = {'exif': None, 'iptc': None, 'xmp': None}
+        self._tags = {'exif': {}, 'iptc': {}, 'xmp': {}}
+        self._families = families
+        self._pruned = pruned
+        self._dirty.clear()
+
+    def _check_family(self, family):
+        """Raise an IOError if the given family has not been read.
+
+        Args:
+        family -- 'exif', 'iptc' or 'xmp'
+        """
+        if family not in self._families:
+            raise IOError('%s metadata has not been read' % family.upper())
 
-    def write(self, preserve_timestamps=False):
+    def write(self, preserve_timestamps=False, force=False, mode='rewrite'):
         """Write the metadata back to the image.
 
+        Nothing is written if the metadata wasn't changed since it was read
+        or last written, unless force is True. The underlying library writes
+        all the metadata of an image at once, a single changed family causes
+        all of them to be written.
+
+        In 'inplace' mode, when only the EXIF and/or XMP data of a JPEG file
+        changed, their segments are overwritten in place if the new data fits
+        in them, instead of the whole file being rewritten. The metadata is
+        written the usual way otherwise.
+
+        In 'splice' mode, a JPEG file is rewritten with new segments for the
+        changed families only, the other segments and the image data being
+        copied as they are, the latter by the kernel where possible. The
+        metadata is written the usual way for other images.
+
         Args:
         preserve_timestamps -- whether to preserve the file's original
                                timestamps (access time and modification time)
                                Type: boolean
+        force -- whether to write the metadata even if it wasn't changed,
+                 default False
+        mode -- 'rewrite' (default), 'inplace' or 'splice'
+
+        Return: a frozenset of the families changed and written, among
+        'exif', 'iptc', 'xmp' and 'comment', empty if nothing was changed
         """
-        self._image._writeMetadata()
+        if mode not in _WRITE_MODES:
+            raise ValueError('Unknown write mode: %s' % mode)
+
+        self._prepare_write()
+        written = frozenset(self._dirty)
+        if not (written or force):
+            return written
+
+        if mode == 'inplace':
+            done = self._write_in_place(written)
+
+        elif mode == 'splice':
+            done = self._write_spliced(written)
+
+        else:
+            done = False
+
+        if not done:
+            self._image._writeMetadata()
+
+        self._written(preserve_timestamps)
+        return written
+
+    def _written(self, preserve_timestamps):
+        """Mark the metadata as written back to the image.
+
+        Args:
+        preserve_timestamps -- whether to revert to the original timestamps
+                               of the file, or to take the new ones as
+                               reference
+        """
+        # The set is shared with the tags, it is emptied rather than replaced.
+        self._dirty.clear()
         if self.filename is None:
             return
 
@@ -138,6 +317,139 @@ class ImageMetadata(MutableMapping):
             self._atime = stat.st_atime
             self._mtime = stat.st_mtime
 
+    def _prepare_write(self):
+        """Check that the metadata can be written and flush the changes still
+        pending in a batch, raise IOError if it was partially read.
+        """
+        if self._families != _FAMILIES or self._pruned:
+            # The families and tags not read would be erased from the image.
+            raise IOError('Metadata partially read, it cannot be written')
+
+        # Changes still pending in a batch have to be written too.
+        for family in ('exif', 'iptc'):
+            for tag in self._tags[family].values():
+                tag._flush()
+
+    def write_to(self, destination):
+        """Write the image with its metadata to a destination, the image
+        itself being left untouched.
+
+        The image data and the new metadata are written in a single pass. For
+        a JPEG file, only the segments of the families changed are encoded,
+        the rest of the file being copied as it is, by the kernel where
+        possible (see write() in 'splice' mode). Other images are written to
+        memory by the underlying library first.
+
+        The metadata of the image is still considered changed afterwards.
+
+        Args:
+        destination -- the path of the file to write, a file descriptor or a
+                       binary file object open for writing, written from its
+                       current position, or a bytearray, whose content is
+                       replaced
+        """
+        self._prepare_write()
+        if isinstance(destination, bytearray):
+            buffer_ = io.BytesIO()
+            self._write_image(buffer_)
+            destination[:] = buffer_.getvalue()
+
+        elif isinstance(destination, int):
+            with os.fdopen(destination, 'wb', closefd=False) as file_:
+                self._write_image(file_)
+
+        elif (isinstance(destination, (str, bytes)) or
+                hasattr(destination, '__fspath__')):
+            if (self.filename is not None and os.path.exists(destination) and
+                    os.path.samefile(destination, self.filename)):
+                raise ValueError('Cannot write the image to itself, '
+                                 'use write()')
+
+            with open(destination, 'wb') as file_:
+                self._write_image(file_)
+
+        else:
+            self._write_image(destination)
+
+    def _write_image(self, file_):
+        """Write the image with its metadata to a binary file object.
+
+        Args:
+        file_ -- a binary file object open for writing
+        """
+        if (self.filename is not None and
+                self._image._getMimeType() == 'image/jpeg' and
+                jpeg.splice_to(self.filename, self._image,
+                               frozenset(self._dirty), file_)):
+            return
+
+        file_.write(self._image._encodeImage())
+
+    def _write_in_place(self, families):
+        """Patch the segments of the changed families of a JPEG file in
+        place, return whether it could be done.
+
+        Args:
+        families -- the families changed
+        """
+        if (self.filename is None or not families or
+                not families <= _INPLACE_FAMILIES or
+                self._image._getMimeType() != 'image/jpeg'):
+            return False
+
+        return jpeg.patch(self.filename, self._image, families)
+
+    def _write_spliced(self, families):
+        """Splice new segments for the changed families into a JPEG file,
+        return whether it could be done.
+
+        Args:
+        families -- the families changed
+        """
+        if (self.filename is None or not families or
+                self._image._getMimeType() != 'image/jpeg'):
+            return False
+
+        return jpeg.splice(self.filename, self._image, families)
+
+    async def aread(self, executor=None):
+        """Read the metadata without blocking the event loop.
+
+        The asyncio counterpart of read(), a coroutine run in an executor of
+        the running event loop. Cancelling it doesn't interrupt a read
+        already running.
+
+        Args:
+        executor -- an optional concurrent.futures.Executor, default the
+                    default executor of the event loop
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.read)
+
+    async def awrite(self, preserve_timestamps=False, executor=None,
+                     force=False, mode='rewrite'):
+        """Write the metadata back to the image without blocking the event loop.
+
+        The asyncio counterpart of write(), a coroutine run in an executor of
+        the running event loop. Cancelling it doesn't interrupt a write
+        already running.
+
+        Args:
+        preserve_timestamps -- whether to preserve the file's original
+                               timestamps (access time and modification time)
+                               Type: boolean
+        executor -- an optional concurrent.futures.Executor, default the
+                    default executor of the event loop
+        force -- whether to write the metadata even if it wasn't changed,
+                 default False
+        mode -- 'rewrite' (default), 'inplace' or 'splice', see write()
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor,
+                                          partial(self.write,
+                                                  preserve_timestamps,
+                                                  force, mode))
+
     @property
     def dimensions(self):
         """A tuple containing the width and height of the image, expressed in
@@ -158,8 +470,9 @@ class ImageMetadata(MutableMapping):
         """Return the list of the keys of the available EXIF tags.
 
         """
+        self._check_family('exif')
         if self._keys['exif'] is None:
-            self._keys['exif'] = self._image._exifKeys()
+            self._keys['exif'] = KeyList(self._image._exifKeys())
 
         return self._keys['exif']
 
@@ -168,8 +481,9 @@ class ImageMetadata(MutableMapping):
         """Return the list of the keys of the available IPTC tags.
 
         """
+        self._check_family('iptc')
         if self._keys['iptc'] is None:
-            self._keys['iptc'] = self._image._iptcKeys()
+            self._keys['iptc'] = KeyList(self._image._iptcKeys())
 
         return self._keys['iptc']
 
@@ -178,8 +492,9 @@ class ImageMetadata(MutableMapping):
         """Return the list of the keys of the available XMP tags.
 
         """
+        self._check_family('xmp')
         if self._keys['xmp'] is None:
-            self._keys['xmp'] = self._image._xmpKeys()
+            self._keys['xmp'] = KeyList(self._image._xmpKeys())
 
         return self._keys['xmp']
 
@@ -191,11 +506,13 @@ class ImageMetadata(MutableMapping):
         Args:
         key -- the exif key
         """
+        self._check_family('exif')
         try:
             return self._tags['exif'][key]
         except KeyError:
             _tag = self._image._getExifTag(key)
             tag = ExifTag._from_existing_tag(_tag)
+            tag._dirty = self._dirty
             self._tags['exif'][key] = tag
             return tag
 
@@ -207,11 +524,13 @@ class ImageMetadata(MutableMapping):
         Args:
         key -- the iptc key
         """
+        self._check_family('iptc')
         try:
             return self._tags['iptc'][key]
         except KeyError:
             _tag = self._image._getIptcTag(key)
             tag = IptcTag._from_existing_tag(_tag)
+            tag._dirty = self._dirty
             self._tags['iptc'][key] = tag
             return tag
 
@@ -223,11 +542,13 @@ class ImageMetadata(MutableMapping):
         Args:
         key -- the xmp key
         """
+        self._check_family('xmp')
         try:
             return self._tags['xmp'][key]
         except KeyError:
             _tag = self._image._getXmpTag(key)
             tag = XmpTag._from_existing_tag(_tag)
+            tag._dirty = self._dirty
             self._tags['xmp'][key] = tag
             return tag
 
@@ -263,6 +584,7 @@ class ImageMetadata(MutableMapping):
             tag = ExifTag(key, tag_or_value)
 
         tag._set_owner(self)
+        self._dirty.add('exif')
         self._tags['exif'][tag.key] = tag
         if tag.key not in self.exif_keys:
             self._keys['exif'].append(tag.key)
@@ -282,6 +604,7 @@ class ImageMetadata(MutableMapping):
             tag = IptcTag(key, tag_or_values)
 
         tag._set_owner(self)
+        self._dirty.add('iptc')
         self._tags['iptc'][tag.key] = tag
         if tag.key not in self.iptc_keys:
             self._keys['iptc'].append(tag.key)
@@ -301,6 +624,7 @@ class ImageMetadata(MutableMapping):
             tag = XmpTag(key, tag_or_value)
 
         tag._set_owner(self)
+        self._dirty.add('xmp')
         self._tags['xmp'][tag.key] = tag
         if tag.key not in self.xmp_keys:
             self._keys['xmp'].append(tag.key)
@@ -344,6 +668,7 @@ class ImageMetadata(MutableMapping):
             raise KeyError('Cannot delete an inexistent tag')
 
         self._image._deleteExifTag(key)
+        self._dirty.add('exif')
         try:
             del self._tags['exif'][key]
         except KeyError:
@@ -365,6 +690,7 @@ class ImageMetadata(MutableMapping):
             raise KeyError('Cannot delete an inexistent tag')
 
         self._image._deleteIptcTag(key)
+        self._dirty.add('iptc')
         try:
             del self._tags['iptc'][key]
         except KeyError:
@@ -386,6 +712,7 @@ class ImageMetadata(MutableMapping):
             raise KeyError('Cannot delete an inexistent tag')
 
         self._image._deleteXmpTag(key)
+        self._dirty.add('xmp')
         try:
             del self._tags['xmp'][key]
         except KeyError:
@@ -413,10 +740,114 @@ class ImageMetadata(MutableMapping):
             raise KeyError(key)
 
     def __iter__(self):
-        return chain(self.exif_keys, self.iptc_keys, self.xmp_keys)
+        # Only the families read
+        return chain(*[getattr(self, '%s_keys' % family)
+                       for family in ('exif', 'iptc', 'xmp')
+                       if family in self._families])
 
     def __len__(self):
-        return len([x for x in self])
+        return sum(len(getattr(self, '%s_keys' % family))
+                   for family in ('exif', 'iptc', 'xmp')
+                   if family in self._families)
+
+    def __contains__(self, key):
+        """Return whether a tag is set for the given key.
+
+        The tag itself is not fetched, the test is done against the cached
+        keys or, if they haven't been listed yet, by the underlying library.
+
+        Args:
+        key -- metadata key in the dotted form
+               ``familyName.groupName.tagName`` where ``familyName`` may
+               be one of ``exif``, ``iptc`` or ``xmp``.
+        """
+        if not isinstance(key, str):
+            return False
+
+        family = key.split('.')[0].lower()
+        if family not in _FAMILIES:
+            return False
+
+        self._check_family(family)
+        keys = self._keys[family]
+        if keys is not None:
+            return key in keys
+
+        return getattr(self._image, '_has%sKey' % family.capitalize())(key)
+
+    def to_dict(self, families=None):
+        """Return the type and the raw value of all the tags of the image.
+
+        All the tags are fetched from the image in a single call, without
+        instantiating any tag object, which is a lot faster than iterating
+        over the keys when all the metadata is needed.
+
+        The result is a dict {key: (type, raw_value)} where raw_value is the
+        same as the raw_value of the corresponding tag object: a string for
+        an EXIF tag, a list of strings for an IPTC tag and a string, a list
+        or a dict for an XMP tag.
+
+        Args:
+        families -- an optional iterable of the families to include, among
+                    'exif', 'iptc' and 'xmp', default all the families read
+        """
+        if families is None:
+            families = [family for family in ('exif', 'iptc', 'xmp')
+                        if family in self._families]
+
+        families = [family.lower() for family in families]
+        for family in families:
+            if family not in _FAMILIES:
+                raise ValueError('Unknown metadata family: %s' % family)
+
+            self._check_family(family)
+
+        return self._image._snapshot(families)
+
+    def get_many(self, keys, default=None, raw=False):
+        """Return the values of several tags at once.
+
+        All the keys are looked up in a single call, and a missing tag
+        doesn't raise an exception, which is a lot faster than getting the
+        tags one at a time when many of them are not set.
+
+        Args:
+        keys -- an iterable of metadata keys, or a Projection compiled
+                beforehand to be reused across images
+        default -- the value of the keys whose tag is not set, default None
+        raw -- if False, default, the values are converted to python types
+               as the value of the tags, otherwise the raw values of the
+               tags are returned
+
+        Return a dict {key: value}. Raise a KeyError if one of the keys is
+        invalid.
+        """
+        if not isinstance(keys, Projection):
+            keys = Projection(keys)
+
+        for family in keys.families:
+            self._check_family(family)
+
+        values = {}
+        tags = self._image._getMany(keys._projection, raw)
+        for key, family, tag in zip(keys._keys, keys._families, tags):
+            if tag is None:
+                values[key] = default
+
+            elif raw:
+                values[key] = tag
+
+            else:
+                cache = self._tags[family]
+                try:
+                    values[key] = cache[key].value
+                except KeyError:
+                    cached = _TAG_CLASSES[family]._from_existing_tag(tag)
+                    cached._dirty = self._dirty
+                    cache[key] = cached
+                    values[key] = cached.value
+
+        return values
 
     def _get_comment(self):
         return self._image._getComment()
@@ -424,12 +855,14 @@ class ImageMetadata(MutableMapping):
     def _set_comment(self, comment):
         if comment is not None:
             self._image._setComment(comment)
+            self._dirty.add('comment')
 
         else:
             self._del_comment()
 
     def _del_comment(self):
         self._image._clearComment()
+        self._dirty.add('comment')
 
     comment = property(fget=_get_comment, fset=_set_comment, fdel=_del_comment,
                        doc='The image comment.')
@@ -439,8 +872,10 @@ class ImageMetadata(MutableMapping):
         """List of the previews available in the image, sorted by increasing
         size.
 
+        The data of a preview is only extracted when it is requested.
         """
-        return [Preview(preview) for preview in self._image._previews()]
+        image = self._image
+        return [Preview(preview, image) for preview in image._previews()]
 
     def copy(self, other, exif=True, iptc=True, xmp=True, comment=True):
         """Copy the metadata to another image.
@@ -458,19 +893,26 @@ class ImageMetadata(MutableMapping):
         xmp -- whether to copy the XMP metadata, default True
         comment -- whether to copy the image comment, default True 
         """
+        for family, copied in (('exif', exif), ('iptc', iptc), ('xmp', xmp)):
+            if copied:
+                self._check_family(family)
+
         self._image._copyMetadata(other._image, exif, iptc, xmp)
         # Empty the cache where needed
         if exif:
             other._keys['exif'] = None
             other._tags['exif'] = {}
+            other._dirty.add('exif')
 
         if iptc:
             other._keys['iptc'] = None
             other._tags['iptc'] = {}
+            other._dirty.add('iptc')
 
         if xmp:
             other._keys['xmp'] = None
             other._tags['xmp'] = {}
+            other._dirty.add('xmp')
 
         if comment:
             other.comment = self.comment
@@ -482,13 +924,31 @@ class ImageMetadata(MutableMapping):
         If metadata has been modified, the data won't be up-to-date until
         :meth:`.write` has been called.
         """
-        return self._image._getDataBuffer()
+        return self.get_buffer()
+
+    def get_buffer(self, as_memoryview=False):
+        """Return the image data.
+
+        If metadata has been modified, the data won't be up-to-date until
+        :meth:`.write` has been called.
+
+        Args:
+        as_memoryview -- if True, a read-only memoryview over the data is
+                         returned instead of bytes, so that it can be sliced
+                         without copying, default False
+        """
+        data = self._image._getDataBuffer()
+        if as_memoryview:
+            return memoryview(data)
+
+        return data
 
     @property
     def exif_thumbnail(self):
         """A thumbnail image optionally embedded in the EXIF data.
 
         """
+        self._check_family('exif')
         if self._exif_thumbnail is None:
             self._exif_thumbnail = ExifThumbnail(self)
 
@@ -536,10 +996,7 @@ class ImageMetadata(MutableMapping):
         """Returns the ISO value as integer.
 
         """
-        try:
-            return self["Exif.Photo.ISOSpeedRatings"].value
-        except KeyError:
-            return
+        return self.get_many(_ISO)['Exif.Photo.ISOSpeedRatings']
 
     def get_shutter_speed(self, float_=False):
         """Returns the exposure time as rational or float.
@@ -548,56 +1005,29 @@ class ImageMetadata(MutableMapping):
         float_ -- if False, default, the value is returned as rational 
                   otherwise as float
         """
-        try:
-            speed = self['Exif.Photo.ExposureTime'].value 
-        except KeyError:
-            return
-
-        if float_:
-            if speed.denominator:
-                return speed.numerator / speed.denominator
-            return float(numerator)
-
-        return speed
+        speed = self.get_many(_SHUTTER_SPEED)['Exif.Photo.ExposureTime']
+        return _to_speed(speed, float_)
 
     def get_focal_length(self):
         """Returns the focal length as float.
 
         """
-        try:
-            focal = self['Exif.Photo.FocalLength'].value
-            if focal.denominator:
-                return round(focal.numerator / focal.denominator, 2)
-
-            else:
-                return float(focal.numerator)
-
-        except KeyError:
-            return
+        focal = self.get_many(_FOCAL_LENGTH)['Exif.Photo.FocalLength']
+        return _to_float(focal)
 
     def get_aperture(self):
         """Returns the fNumber as float.
 
         """
-        try:
-            fnumber = self["Exif.Photo.FNumber"].value
-            if fnumber.denominator:
-                return round(fnumber.numerator / fnumber.denominator, 2)
-
-            else:
-                return float(fnumber.numerator)
-        except KeyError:
-            return
+        fnumber = self.get_many(_APERTURE)['Exif.Photo.FNumber']
+        return _to_float(fnumber)
 
     def get_orientation(self):
         """Returns the orientation of the image as integer.
 
         If the tag is not set, the value 1 is returned.
         """
-        try:
-            return self["Exif.Image.Orientation"].value
-        except KeyError:
-            return 1
+        return self.get_many(_ORIENTATION, 1)['Exif.Image.Orientation']
 
     def get_exposure_data(self, float_=False):
         """Returns the exposure parameters of the image.
@@ -615,11 +1045,13 @@ class ImageMetadata(MutableMapping):
         float_ -- if False, default, the value of the exposure time is returned 
                   as rational otherwise as float
         """
-        data = {"iso": self.get_iso(),
-                "speed": self.get_shutter_speed(float_),
-                "focal": self.get_focal_length(),
-                "aperture": self.get_aperture(),
-                "orientation": self.get_orientation()}
+        values = self.get_many(_EXPOSURE)
+        orientation = values['Exif.Image.Orientation']
+        data = {"iso": values['Exif.Photo.ISOSpeedRatings'],
+                "speed": _to_speed(values['Exif.Photo.ExposureTime'], float_),
+                "focal": _to_float(values['Exif.Photo.FocalLength']),
+                "aperture": _to_float(values['Exif.Photo.FNumber']),
+                "orientation": 1 if orientation is None else orientation}
 
         return data
 
@@ -636,19 +1068,47 @@ class ImageMetadata(MutableMapping):
 
         When a tag is not set, the value will be None
         """
-        tags = [('creator', 'Xmp.dc.creator'), 
-                ('artist', 'Exif.Image.Artist'),
-                ('rights', 'Xmp.dc.rights'), 
-                ('copyright', 'Exif.Image.Copyright'),
-                ('marked', 'Xmp.xmpRights.Marked'), 
-                ('usage', 'Xmp.xmpRights.UsageTerms')]
-        rights = {}
-        for tag in tags:
-            try:
-                rights[tag[0]] = self[tag[1]].value
-            except KeyError:
-                rights[tag[0]] = None
-
-        return rights
-
-
+        values = self.get_many(_RIGHTS)
+        return dict((name, values[key]) for name, key in _RIGHTS_NAMES)
+
+
+def _to_float(value):
+    # Convert a rational to a float rounded to two decimals.
+    if value is None:
+        return None
+
+    if value.denominator:
+        return round(value.numerator / value.denominator, 2)
+
+    return float(value.numerator)
+
+
+def _to_speed(value, float_):
+    # Convert an exposure time to a float if requested.
+    if value is None or not float_:
+        return value
+
+    if value.denominator:
+        return value.numerator / value.denominator
+
+    return float(value.numerator)
+
+
+# The projections used by the convenient functions, compiled once.
+_ISO = Projection(['Exif.Photo.ISOSpeedRatings'])
+_SHUTTER_SPEED = Projection(['Exif.Photo.ExposureTime'])
+_FOCAL_LENGTH = Projection(['Exif.Photo.FocalLength'])
+_APERTURE = Projection(['Exif.Photo.FNumber'])
+_ORIENTATION = Projection(['Exif.Image.Orientation'])
+_EXPOSURE = Projection(['Exif.Photo.ISOSpeedRatings',
+                        'Exif.Photo.ExposureTime',
+                        'Exif.Photo.FocalLength',
+                        'Exif.Photo.FNumber',
+                        'Exif.Image.Orientation'])
+_RIGHTS_NAMES = (('creator', 'Xmp.dc.creator'),
+                 ('artist', 'Exif.Image.Artist'),
+                 ('rights', 'Xmp.dc.rights'),
+                 ('copyright', 'Exif.Image.Copyright'),
+                 ('marked', 'Xmp.xmpRights.Marked'),
+                 ('usage', 'Xmp.xmpRights.UsageTerms'))
+_RIGHTS = Projection([key for name, key in _RIGHTS_NAMES])
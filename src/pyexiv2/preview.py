@@ -34,10 +34,22 @@ import sys
 class Preview(object):
     """A preview image (properties and data buffer) embedded in image metadata.
 
+    The properties of the preview are known without extracting it, its data
+    is only extracted from the image when :attr:`data` or
+    :meth:`write_to_file` is used.
     """
 
-    def __init__(self, preview):
+    def __init__(self, preview, image):
+        """Instanciate the Preview class.
+
+        Args:
+        preview -- the libexiv2python._Preview describing the preview
+        image -- the libexiv2python._Image the preview is embedded in, which
+                 must stay alive as long as the preview data may be extracted
+        """
         self.__preview = preview
+        self.__image = image
+        self.__data = None
 
     @property
     def mime_type(self):
@@ -72,8 +84,12 @@ class Preview(object):
     def data(self):
         """The preview image data buffer.
 
+        It is extracted from the image the first time it is accessed.
         """
-        return self.__preview.get_data()
+        if self.__data is None:
+            self.__data = self.__preview.get_data()
+
+        return self.__data
 
     def write_to_file(self, path):
         """Write the preview image to a file on disk.
@@ -31,6 +31,7 @@ Utilitary classes and functions.
 import datetime
 import re
 
+from contextlib import contextmanager
 from fractions import Fraction
 
 class FixedOffset(datetime.tzinfo):
@@ -147,6 +148,8 @@ def is_fraction(obj):
     """
     return isinstance(obj, Fraction)
 
+_fraction_re = re.compile(r'(?P<numerator>-?\d+)/(?P<denominator>\d+)')
+
 def match_string(string):
     """Match a string against the expected format for a :class:`Fraction`
     (``[-]numerator/denominator``) and return the numerator and denominator
@@ -159,8 +162,7 @@ def match_string(string):
 
     Raise ValueError: if the format of the string is invalid
     """
-    format_re = re.compile(r'(?P<numerator>-?\d+)/(?P<denominator>\d+)')
-    match = format_re.match(string)
+    match = _fraction_re.match(string)
     if match is None:
         raise ValueError('Invalid format for a rational: %s' % string)
 
@@ -226,7 +228,8 @@ class NotifyingList(list):
     """A simplistic implementation of a notifying list.
 
     Any changes to the list are notified in a synchronous way to all previously
-    registered listeners. 
+    registered listeners, unless made within batch(), in which case they are
+    notified once, when leaving the outermost batch() or on flush().
     A listener must implement the class ListenerInterface.
     """
 
@@ -237,6 +240,10 @@ class NotifyingList(list):
     def __init__(self, items=[]):
         super(NotifyingList, self).__init__(items)
         self._listeners = set()
+        # The number of nested batches, and whether changes were made within
+        # them that were not notified yet.
+        self._batch_depth = 0
+        self._pending = False
 
     def register_listener(self, listener):
         """Register a new listener to be notified of changes.
@@ -257,9 +264,39 @@ class NotifyingList(list):
         self._listeners.remove(listener)
 
     def _notify_listeners(self, *args):
+        if self._batch_depth > 0:
+            self._pending = True
+            return
+
         for listener in self._listeners:
             listener.contents_changed(*args)
 
+    @contextmanager
+    def batch(self):
+        """Return a context manager within which the changes to the list are
+        not notified one by one, but all at once when leaving it.
+
+        Batches can be nested, the listeners are only notified when leaving
+        the outermost one, and only if the list was changed.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def flush(self):
+        """Notify the listeners right away of the changes made within the
+        current batch, if any.
+        """
+        if self._pending:
+            self._pending = False
+            for listener in self._listeners:
+                listener.contents_changed()
+
     def __setitem__(self, index, item):
         # FIXME: support slice arguments for extended slicing
         super(NotifyingList, self).__setitem__(index, item)
@@ -325,6 +362,93 @@ class NotifyingList(list):
             self._notify_listeners()
 
 
+class KeyList(list):
+    """A list of metadata keys with constant time membership tests.
+
+    The number of occurrences of each key is kept alongside the list:
+    appending, inserting, extending and removing keys keep it up to date,
+    the other changes to the list rebuild it.
+    """
+
+    def __init__(self, keys=()):
+        super(KeyList, self).__init__(keys)
+        self._rebuild()
+
+    def _rebuild(self):
+        self._counts = {}
+        for key in self:
+            self._add(key)
+
+    def _add(self, key):
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _discard(self, key):
+        count = self._counts[key] - 1
+        if count:
+            self._counts[key] = count
+
+        else:
+            del self._counts[key]
+
+    def __contains__(self, key):
+        return key in self._counts
+
+    def count(self, key):
+        return self._counts.get(key, 0)
+
+    def append(self, key):
+        super(KeyList, self).append(key)
+        self._add(key)
+
+    def insert(self, index, key):
+        super(KeyList, self).insert(index, key)
+        self._add(key)
+
+    def remove(self, key):
+        if key not in self._counts:
+            raise ValueError('%s not in list' % key)
+
+        if self._counts[key] == 1 and self[-1] == key:
+            # Removing the key appended last doesn't need to look for it.
+            self.pop()
+
+        else:
+            super(KeyList, self).remove(key)
+            self._discard(key)
+
+    def pop(self, index=-1):
+        key = super(KeyList, self).pop(index)
+        self._discard(key)
+        return key
+
+    def clear(self):
+        super(KeyList, self).clear()
+        self._counts.clear()
+
+    def extend(self, keys):
+        start = len(self)
+        super(KeyList, self).extend(keys)
+        for key in self[start:]:
+            self._add(key)
+
+    def __setitem__(self, index, key):
+        super(KeyList, self).__setitem__(index, key)
+        self._rebuild()
+
+    def __delitem__(self, index):
+        super(KeyList, self).__delitem__(index)
+        self._rebuild()
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, other):
+        self = super(KeyList, self).__imul__(other)
+        self._rebuild()
+        return self
+
+
 class GPSCoordinate(object):
     """A class representing GPS coordinates (e.g. a latitude or a longitude).
 
@@ -447,6 +571,92 @@ class GPSCoordinate(object):
                                self._direction)
 
 
+class DateTimeParser(object):
+    """Convenience object that exposes static methods to parse the string
+    representation of a date or datetime in libexiv2’s internal
+    representation for various metadata standards.
+
+    Each method tries all the accepted formats at once with a single
+    precompiled regular expression, which is a lot faster than trying
+    `time.strptime()` with one format after the other, in particular for the
+    strings that are not a date at all.
+
+    This class mostly exists for internal usage only. Clients should never need
+    to use it.
+    """
+
+    # The fields accept the same values as the corresponding directives of
+    # time.strptime(), %Y, %m, %d, %H, %M and %S.
+    _exif_re = re.compile(r'(?P<year>\d{4})(?P<sep>[:-])'
+                          r'(?P<month>1[0-2]|0[1-9]|[1-9])(?P=sep)'
+                          r'(?P<day>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])'
+                          r'(?:(?P<tsep>\s+|T)(?P<hour>2[0-3]|[0-1]\d|\d):'
+                          r'(?P<minute>[0-5]\d|\d):(?P<second>6[0-1]|[0-5]\d|\d)'
+                          r'(?P<zulu>Z)?)?\Z', re.IGNORECASE)
+    _iptc_date_re = re.compile(r'(?P<year>\d{4})-(?P<month>1[0-2]|0[1-9]|[1-9])-'
+                               r'(?P<day>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])\Z')
+
+    @staticmethod
+    def exif(value):
+        """Parse a date or a datetime in the representation of the EXIF
+        standard.
+
+        The accepted formats are '%Y:%m:%d %H:%M:%S', '%Y-%m-%d %H:%M:%S' and
+        '%Y-%m-%dT%H:%M:%SZ' for a datetime, '%Y:%m:%d' for a date.
+
+        Args:
+        value -- the string to parse
+
+        Return: a datetime.datetime or datetime.date instance, or None if the
+        string is not a valid date or datetime
+        """
+        match = DateTimeParser._exif_re.match(value)
+        if match is None:
+            return None
+
+        year, sep, month, day, tsep, hour, minute, second, zulu = \
+            match.groups()
+        try:
+            if hour is None:
+                if sep == ':':
+                    return datetime.date(int(year), int(month), int(day))
+
+            elif tsep in ('T', 't'):
+                if sep == '-' and zulu is not None:
+                    return datetime.datetime(int(year), int(month), int(day),
+                                             int(hour), int(minute),
+                                             int(second))
+
+            elif zulu is None:
+                return datetime.datetime(int(year), int(month), int(day),
+                                         int(hour), int(minute), int(second))
+
+        except ValueError:
+            # Out of range, e.g. February 30th
+            pass
+
+        return None
+
+    @staticmethod
+    def iptc_date(value):
+        """Parse a date in libexiv2’s internal representation for the IPTC
+        standard, '%Y-%m-%d'.
+
+        Args:
+        value -- the string to parse
+
+        Return: a datetime.date instance
+
+        Raise ValueError: if the string is not a valid date
+        """
+        match = DateTimeParser._iptc_date_re.match(value)
+        if match is None:
+            raise ValueError('Invalid IPTC date: %s' % value)
+
+        year, month, day = match.groups()
+        return datetime.date(int(year), int(month), int(day))
+
+
 class DateTimeFormatter(object):
     """Convenience object that exposes static methods to convert a date, time or
     datetime object to a string representation suitable for various metadata
@@ -460,6 +670,8 @@ class DateTimeFormatter(object):
     to use it.
     """
 
+    _zero = datetime.timedelta(0)
+
     @staticmethod
     def timedelta_to_offset(t):
         """Convert a time delta to a string..
@@ -567,19 +779,21 @@ class DateTimeFormatter(object):
         Raise TypeError: if the parameter is not a datetime or a date object
         """
         if isinstance(d, datetime.datetime):
+            # The offset is computed once, it may be costly for some tzinfo.
             t = d.utcoffset()
-            if d.tzinfo is None or t is None or t == datetime.timedelta(0):
+            zero = DateTimeFormatter._zero
+            if d.hour == 0 and d.minute == 0 and \
+                d.second == 0 and d.microsecond == 0 and \
+                (d.tzinfo is None or t == zero):
+                return '%04d-%02d-%02d' % (d.year, d.month, d.day)
+
+            if d.tzinfo is None or t is None or t == zero:
                 tz = 'Z'
 
             else:
                 tz = DateTimeFormatter.timedelta_to_offset(t)
 
-            if d.hour == 0 and d.minute == 0 and \
-                d.second == 0 and d.microsecond == 0 and \
-                (d.tzinfo is None or d.utcoffset() == datetime.timedelta(0)):
-                return '%04d-%02d-%02d' % (d.year, d.month, d.day)
-
-            elif d.second == 0 and d.microsecond == 0:
+            if d.second == 0 and d.microsecond == 0:
                 return '%04d-%02d-%02dT%02d:%02d%s' % \
                     (d.year, d.month, d.day, d.hour, d.minute, tz)
 
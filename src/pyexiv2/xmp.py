@@ -88,6 +88,10 @@ class XmpTag(object):
     _time_regex = r'(T(?P<time>(?P<hours>\d{{2}})(:(?P<minutes>\d{{2}})((:(?P<seconds>\d{{2}}))?((\.(?P<decimal>\d+))?{tz}?)?)?)?)?))'
     _date_regex = r"((?P<year>\d{{4}})(-(?P<month>\d{{2}})(-(?P<day>\d{{2}}))?)?{time}?)"
     _date_re = re.compile(_date_regex.format(time= _time_regex.format(tz=_time_zone_regex)))
+    # The set of the families changed in the metadata of the image the tag
+    # belongs to, if any.
+    _dirty = None
+
     def __init__(self, key, value=None, _tag=None):
         """The tag can be initialized with an optional value which expected
         type depends on the XMP type of the tag.
@@ -112,6 +116,12 @@ class XmpTag(object):
 
     def _set_owner(self, metadata):
         self._tag._setParentImage(metadata._image)
+        self._dirty = metadata._dirty
+
+    def _mark_dirty(self):
+        # Record the change in the metadata of the image the tag belongs to.
+        if self._dirty is not None:
+            self._dirty.add('xmp')
 
     @staticmethod
     def _from_existing_tag(_tag):
@@ -192,6 +202,7 @@ class XmpTag(object):
 
         self._raw_value = value
         self._value_cookie = True
+        self._mark_dirty()
 
     raw_value = property(fget=_get_raw_value, fset=_set_raw_value,
                          doc='The raw value of the tag as a [list of] ' \
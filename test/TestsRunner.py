@@ -38,10 +38,15 @@ from xmp import TestXmpTag, TestXmpNamespaces
 from metadata import TestImageMetadata
 from buffer import TestBuffer
 from encoding import TestEncodings
-from utils import TestConversions, TestFractions
+from utils import TestConversions, TestFractions, TestKeyList
 from usercomment import TestUserCommentReadWrite, TestUserCommentAdd
 from pickling import TestPicklingTags
 from datetimeformatter import TestDateTimeFormatter
+from datetimeparser import TestDateTimeParser
+from batch import TestReadMany, TestWriteBatch
+from aio import TestAsyncIO
+from header import TestProbe
+from jpeg import TestJpegPatch, TestJpegSplice
 
 
 def run_unit_tests():
@@ -59,10 +64,18 @@ def run_unit_tests():
     suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestEncodings))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestConversions))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestFractions))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestKeyList))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestUserCommentReadWrite))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestUserCommentAdd))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestPicklingTags))
     suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestDateTimeFormatter))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestDateTimeParser))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestReadMany))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestWriteBatch))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestAsyncIO))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestProbe))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestJpegPatch))
+    suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestJpegSplice))
     # Run the test suite
     return unittest.TextTestRunner(verbosity=2).run(suite)
 
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the pyexiv2 distribution.
+#
+# pyexiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# pyexiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyexiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+
+from pyexiv2.metadata import ImageMetadata
+from pyexiv2.aio import aread_many
+
+import asyncio
+import os
+import tempfile
+import unittest
+from testutils import EMPTY_JPG_DATA
+
+
+class TestAsyncIO(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.pathnames = []
+        for i in range(5):
+            fd, pathname = tempfile.mkstemp(suffix='.jpg')
+            os.write(fd, EMPTY_JPG_DATA)
+            os.close(fd)
+            self.pathnames.append(pathname)
+
+    def tearDown(self):
+        self.loop.close()
+        for pathname in self.pathnames:
+            os.remove(pathname)
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_aread_awrite(self):
+        async def write_then_read(pathname, i):
+            metadata = ImageMetadata(pathname)
+            await metadata.aread()
+            metadata['Exif.Image.Make'] = 'Make %d' % i
+            await metadata.awrite(preserve_timestamps=True)
+            metadata = ImageMetadata(pathname)
+            await metadata.aread()
+            return metadata['Exif.Image.Make'].value
+
+        async def write_then_read_all():
+            return await asyncio.gather(*[write_then_read(pathname, i)
+                                          for i, pathname
+                                          in enumerate(self.pathnames)])
+
+        values = self._run(write_then_read_all())
+        self.assertEqual(values, ['Make %d' % i for i in range(5)])
+
+    def test_aread_error(self):
+        metadata = ImageMetadata('idontexist')
+        self.assertRaises(IOError, self._run, metadata.aread())
+
+    def test_aread_many(self):
+        async def collect(paths, **kwargs):
+            return [result async for result in aread_many(paths, **kwargs)]
+
+        paths = self.pathnames + ['idontexist']
+        results = self._run(collect(paths, workers=2))
+        self.assertEqual([r.path for r in results], paths)
+        for result in results[:-1]:
+            self.assertEqual(result.error, None)
+            self.assertEqual(result.tags, {})
+        self.assertTrue(isinstance(results[-1].error, IOError))
+
+        results = self._run(collect(iter(paths), workers=3, ordered=False))
+        self.assertEqual(sorted(r.path for r in results), sorted(paths))
+
+        self.assertRaises(ValueError, self._run, collect(paths, workers=0))
+        self.assertRaises(ValueError, self._run,
+                          collect(paths, families=('foo',)))
+
+    def test_aread_many_close_early(self):
+        async def first(paths):
+            results = aread_many(paths, workers=2)
+            result = await results.__anext__()
+            await results.aclose()
+            return result
+
+        result = self._run(first(self.pathnames * 10))
+        self.assertEqual(result.path, self.pathnames[0])
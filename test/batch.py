@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the pyexiv2 distribution.
+#
+# pyexiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# pyexiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyexiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+from pyexiv2.metadata import ImageMetadata
+from pyexiv2.batch import read_many, extract_many, WriteBatch
+
+import datetime
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+from testutils import EMPTY_JPG_DATA
+
+
+class TestReadMany(unittest.TestCase):
+
+    def setUp(self):
+        # Create a few images with different metadata
+        self.pathnames = []
+        for i in range(5):
+            fd, pathname = tempfile.mkstemp(suffix='.jpg')
+            os.write(fd, EMPTY_JPG_DATA)
+            os.close(fd)
+            m = ImageMetadata(pathname)
+            m.read()
+            m['Exif.Image.Make'] = 'Make %d' % i
+            m['Exif.Image.DateTime'] = datetime.datetime(2009, 2, 9, 13, 33, i)
+            m['Iptc.Application2.Caption'] = ['Caption %d' % i]
+            m['Xmp.dc.subject'] = ['image', 'test']
+            m.write()
+            self.pathnames.append(pathname)
+
+    def tearDown(self):
+        for pathname in self.pathnames:
+            os.remove(pathname)
+
+    def test_ordered(self):
+        results = list(read_many(self.pathnames, workers=2))
+        self.assertEqual([r.path for r in results], self.pathnames)
+        for i, result in enumerate(results):
+            self.assertEqual(result.error, None)
+            metadata = ImageMetadata(self.pathnames[i])
+            metadata.read()
+            self.assertEqual(result.tags, metadata.to_dict())
+            self.assertEqual(result.tags['Exif.Image.Make'],
+                             ('Ascii', 'Make %d' % i))
+
+    def test_unordered(self):
+        results = list(read_many(iter(self.pathnames), workers=3,
+                                 ordered=False))
+        self.assertEqual(sorted(r.path for r in results),
+                         sorted(self.pathnames))
+
+    def test_families_and_keys(self):
+        for result in read_many(self.pathnames, families=('iptc',)):
+            self.assertEqual(list(result.tags.keys()),
+                             ['Iptc.Application2.Caption'])
+
+        keys = ['Exif.Image.Make', 'Xmp.dc.subject', 'Exif.Photo.FNumber']
+        for result in read_many(self.pathnames, keys=keys):
+            self.assertEqual(sorted(result.tags.keys()),
+                             ['Exif.Image.Make', 'Xmp.dc.subject'])
+
+        # The arguments are checked before the first result is requested.
+        self.assertRaises(ValueError, read_many, self.pathnames,
+                          families=('foo',))
+        self.assertRaises(ValueError, read_many, self.pathnames, workers=0)
+
+    def test_errors_are_returned(self):
+        paths = [self.pathnames[0], 'idontexist', self.pathnames[1]]
+        results = list(read_many(paths))
+        self.assertEqual([r.path for r in results], paths)
+        self.assertEqual(results[0].error, None)
+        self.assertEqual(results[1].tags, None)
+        self.assertTrue(isinstance(results[1].error, IOError))
+        self.assertEqual(results[2].error, None)
+
+    def test_close_early(self):
+        consumed = []
+        def paths():
+            for path in self.pathnames * 10:
+                consumed.append(path)
+                yield path
+        threads = threading.active_count()
+        results = read_many(paths(), workers=2)
+        first = next(results)
+        self.assertEqual(first.path, self.pathnames[0])
+        results.close()
+        # At most the images queued for the 2 workers and the one submitted
+        # after the first result have been submitted, the others are never
+        # consumed, and the workers have stopped.
+        self.assertTrue(len(consumed) <= 5)
+        self.assertEqual(threading.active_count(), threads)
+        self.assertRaises(StopIteration, next, results)
+
+    def test_extract_many(self):
+        keys = ['Exif.Image.Make', 'Exif.Image.DateTime', 'Exif.Photo.FNumber',
+                'Iptc.Application2.Caption', 'Xmp.dc.subject']
+        paths = self.pathnames + ['idontexist']
+        results = list(extract_many(paths, keys, workers=3, chunk_size=2))
+        self.assertEqual([r.path for r in results], paths)
+        expected = list(read_many(self.pathnames, keys=keys))
+        for result, other in zip(results, expected):
+            self.assertEqual(result.error, None)
+            self.assertEqual(result.tags, other.tags)
+            self.assertFalse('Exif.Photo.FNumber' in result.tags)
+        self.assertEqual(results[-1].tags, None)
+        self.assertTrue(isinstance(results[-1].error, IOError))
+
+    def test_extract_many_invalid_key(self):
+        self.assertRaises(KeyError, list,
+                          extract_many(self.pathnames, ['Exif.Image.Make',
+                                                        'Foo.Bar']))
+        self.assertRaises(ValueError, list,
+                          extract_many(self.pathnames, ['Exif.Image.Make'],
+                                       chunk_size=0))
+
+
+class TestWriteBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.pathnames = []
+        for i in range(5):
+            pathname = os.path.join(self.directory, '%d.jpg' % i)
+            with open(pathname, 'wb') as file_:
+                file_.write(EMPTY_JPG_DATA)
+            self.pathnames.append(pathname)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _modified(self, pathname, i):
+        metadata = ImageMetadata(pathname)
+        metadata.read()
+        metadata['Exif.Image.Make'] = 'Make %d' % i
+        metadata['Xmp.dc.subject'] = ['batch']
+        return metadata
+
+    def _check(self, pathname, i):
+        metadata = ImageMetadata(pathname)
+        metadata.read()
+        self.assertEqual(metadata['Exif.Image.Make'].value, 'Make %d' % i)
+        self.assertEqual(metadata['Xmp.dc.subject'].value, ['batch'])
+
+    def test_policies(self):
+        for fsync in ('none', 'file', 'group'):
+            with WriteBatch(fsync=fsync) as batch:
+                for i, pathname in enumerate(self.pathnames):
+                    self.failUnless(batch.add(self._modified(pathname, i)))
+                    # Nothing is replaced until the batch is committed.
+                    with open(pathname, 'rb') as file_:
+                        self.assertEqual(file_.read(), EMPTY_JPG_DATA)
+
+            for i, pathname in enumerate(self.pathnames):
+                self._check(pathname, i)
+                with open(pathname, 'wb') as file_:
+                    file_.write(EMPTY_JPG_DATA)
+
+            # No temporary file is left behind.
+            self.assertEqual(sorted(os.listdir(self.directory)),
+                             sorted(os.path.basename(pathname)
+                                    for pathname in self.pathnames))
+
+    def test_read_only(self):
+        # A read-only image is synced and replaced like any other, keeping
+        # its mode.
+        os.chmod(self.pathnames[0], 0o444)
+        for fsync in ('file', 'group'):
+            with WriteBatch(fsync=fsync) as batch:
+                batch.add(self._modified(self.pathnames[0], 0))
+            self._check(self.pathnames[0], 0)
+            self.assertEqual(stat.S_IMODE(os.stat(self.pathnames[0]).st_mode),
+                             0o444)
+
+    def test_commit(self):
+        batch = WriteBatch(group_size=2)
+        metadatas = [self._modified(pathname, i)
+                     for i, pathname in enumerate(self.pathnames)]
+        for metadata in metadatas[:3]:
+            batch.add(metadata)
+        # The first group was committed.
+        self._check(self.pathnames[0], 0)
+        self._check(self.pathnames[1], 1)
+        self.assertEqual(metadatas[0].write(), frozenset())
+        with open(self.pathnames[2], 'rb') as file_:
+            self.assertEqual(file_.read(), EMPTY_JPG_DATA)
+        self.assertEqual(batch.commit(), [self.pathnames[2]])
+        self._check(self.pathnames[2], 2)
+        self.assertEqual(batch.commit(), [])
+
+    def test_abort(self):
+        try:
+            with WriteBatch() as batch:
+                for i, pathname in enumerate(self.pathnames):
+                    batch.add(self._modified(pathname, i))
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        for pathname in self.pathnames:
+            with open(pathname, 'rb') as file_:
+                self.assertEqual(file_.read(), EMPTY_JPG_DATA)
+        self.assertEqual(len(os.listdir(self.directory)), len(self.pathnames))
+
+    def test_unchanged(self):
+        metadata = ImageMetadata(self.pathnames[0])
+        metadata.read()
+        batch = WriteBatch()
+        self.failIf(batch.add(metadata))
+        self.failUnless(batch.add(metadata, force=True))
+        self.assertEqual(batch.commit(), [self.pathnames[0]])
+
+    def test_preserve_timestamps(self):
+        os.utime(self.pathnames[0], (1000000000, 1000000000))
+        with WriteBatch(preserve_timestamps=True) as batch:
+            batch.add(self._modified(self.pathnames[0], 0))
+        self.assertEqual(os.stat(self.pathnames[0]).st_mtime, 1000000000)
+        self._check(self.pathnames[0], 0)
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'No symbolic links')
+    def test_symlink(self):
+        link = os.path.join(self.directory, 'link.jpg')
+        os.symlink(self.pathnames[0], link)
+        with WriteBatch() as batch:
+            batch.add(self._modified(link, 0))
+        self.failUnless(os.path.islink(link))
+        self._check(self.pathnames[0], 0)
+        os.remove(link)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, WriteBatch, fsync='foo')
+        self.assertRaises(ValueError, WriteBatch, group_size=0)
+        metadata = ImageMetadata.from_buffer(EMPTY_JPG_DATA)
+        metadata.read()
+        self.assertRaises(ValueError, WriteBatch().add, metadata)
@@ -27,6 +27,7 @@
 import unittest
 import os.path
 import hashlib
+import mmap
 from datetime import datetime
 
 from pyexiv2.metadata import ImageMetadata
@@ -72,6 +73,14 @@ class TestBuffer(unittest.TestCase):
         # Check that the buffer has changed
         self.failIfEqual(hashlib.md5(m.buffer).hexdigest(), self.md5sum)
 
+    def test_get_buffer_as_memoryview(self):
+        m = self._metadata_from_buffer()
+        view = m.get_buffer(as_memoryview=True)
+        self.assertTrue(isinstance(view, memoryview))
+        self.assertTrue(view.readonly)
+        self.assertEqual(view.tobytes(), m.buffer)
+        self.assertEqual(hashlib.md5(view).hexdigest(), self.md5sum)
+
     def test_from_original_buffer(self):
         m1 = self._metadata_from_buffer()
         m2 = ImageMetadata.from_buffer(m1.buffer)
@@ -89,3 +98,37 @@ class TestBuffer(unittest.TestCase):
         m2.read()
         self.assertEqual(m2[key].value, value)
 
+    def test_from_buffer_protocol_objects(self):
+        fd = open(self.filepath, 'rb')
+        data = fd.read()
+        fd.close()
+        for buffer_ in (bytearray(data), memoryview(data)):
+            m = ImageMetadata.from_buffer(buffer_)
+            m.read()
+            self.assertEqual(hashlib.md5(m.buffer).hexdigest(), self.md5sum)
+
+    def test_from_mmap(self):
+        fd = open(self.filepath, 'rb')
+        mapped = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        fd.close()
+        m = ImageMetadata.from_buffer(mapped)
+        m.read()
+        self.assertEqual(hashlib.md5(m.buffer).hexdigest(), self.md5sum)
+        # The memory is in use as long as the image container exists.
+        self.assertRaises(BufferError, mapped.close)
+        del m
+        mapped.close()
+
+    def test_buffer_not_modified_by_write(self):
+        fd = open(self.filepath, 'rb')
+        data = bytearray(fd.read())
+        fd.close()
+        m = ImageMetadata.from_buffer(data)
+        m.read()
+        # The buffer can't be resized while it is in use.
+        self.assertRaises(BufferError, data.extend, b'foo')
+        m['Exif.Image.ImageDescription'] = 'my kingdom for a semiquaver'
+        m.write()
+        self.failIfEqual(hashlib.md5(m.buffer).hexdigest(), self.md5sum)
+        self.assertEqual(hashlib.md5(data).hexdigest(), self.md5sum)
+
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2011 Olivier Tilloy <olivier@tilloy.net>
+# Copyright (C) 2015-2016 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the pyexiv2 distribution.
+#
+# pyexiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# pyexiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyexiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+import unittest
+
+from pyexiv2.utils import DateTimeParser
+
+import datetime
+import time
+
+
+class TestDateTimeParser(unittest.TestCase):
+
+    def test_exif_datetime(self):
+        self.assertEqual(DateTimeParser.exif('2009:02:09 13:33:20'),
+                         datetime.datetime(2009, 2, 9, 13, 33, 20))
+        self.assertEqual(DateTimeParser.exif('2009-02-09 13:33:20'),
+                         datetime.datetime(2009, 2, 9, 13, 33, 20))
+        self.assertEqual(DateTimeParser.exif('2009-02-09T13:33:20Z'),
+                         datetime.datetime(2009, 2, 9, 13, 33, 20))
+        self.assertEqual(DateTimeParser.exif('1899:12:31 23:59:59'),
+                         datetime.datetime(1899, 12, 31, 23, 59, 59))
+        self.assertEqual(DateTimeParser.exif('2009:2:9 3:3:2'),
+                         datetime.datetime(2009, 2, 9, 3, 3, 2))
+
+    def test_exif_date(self):
+        self.assertEqual(DateTimeParser.exif('2009:02:09'),
+                         datetime.date(2009, 2, 9))
+        self.assertEqual(DateTimeParser.exif('0001:01:01'),
+                         datetime.date(1, 1, 1))
+
+    def test_exif_not_a_date(self):
+        for value in ('EASTMAN KODAK COMPANY', '', '2009', '2009-02-09',
+                      '2009:02:09T13:33:20Z', '2009-02-09T13:33:20',
+                      '2009:02:09 13:33:20Z', '2009:02-09 13:33:20',
+                      '2009:02:30', '2009:13:01 00:00:00',
+                      '2009:02:09 24:00:00', '2009:02:09 13:33:20 ',
+                      '0000:00:00 00:00:00', '    :  :     :  :  '):
+            self.assertEqual(DateTimeParser.exif(value), None, value)
+
+    def test_exif_same_as_strptime(self):
+        formats = ('%Y:%m:%d %H:%M:%S', '%Y-%m-%d %H:%M:%S',
+                   '%Y-%m-%dT%H:%M:%SZ')
+        values = ('2009:02:09 13:33:20', '2009-02-09t13:33:20z',
+                  '2009:02:09  13:33:20', '2009:02:09\t13:33:20',
+                  '2009:02: 9 13:33:20', '2008:02:29 00:00:00',
+                  '2009:02:29 00:00:00', '2009:02:09 13:33')
+        for value in values:
+            expected = None
+            for format in formats:
+                try:
+                    t = time.strptime(value, format)
+                except ValueError:
+                    continue
+                else:
+                    expected = datetime.datetime(*t[:6])
+                    break
+            self.assertEqual(DateTimeParser.exif(value), expected, value)
+
+    def test_iptc_date(self):
+        self.assertEqual(DateTimeParser.iptc_date('2004-07-13'),
+                         datetime.date(2004, 7, 13))
+        self.assertEqual(DateTimeParser.iptc_date('1899-12-31'),
+                         datetime.date(1899, 12, 31))
+        for value in ('20040713', '2004-07-32', '2004-02-30', '2004:07:13',
+                      '2004-07-13 ', 'foo'):
+            self.assertRaises(ValueError, DateTimeParser.iptc_date, value)
@@ -33,9 +33,15 @@ from pyexiv2.utils import make_fraction
 
 import testutils
 
+import array
 import datetime
 import os.path
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestExifTag(unittest.TestCase):
 
@@ -326,6 +332,30 @@ class TestExifTag(unittest.TestCase):
         value = '2 0 0 foo'
         self.failUnlessRaises(ValueError, setattr, tag, 'raw_value', value)
 
+    def test_typed_values(self):
+        tag = ExifTag('Exif.Image.XResolution', make_fraction(72, 1))
+        self.assertEqual(tag.raw_value, '72/1')
+        tag.raw_value = '300/1'
+        self.assertEqual(tag.value, make_fraction(300, 1))
+
+        tag = ExifTag('Exif.Image.StripByteCounts', [1, 2, 3])
+        self.assertEqual(tag.raw_value, '1 2 3')
+        self.failUnlessRaises(ExifValueError, setattr, tag, 'value', [-1])
+        self.failUnlessRaises(ExifValueError, setattr, tag, 'value', ['1'])
+
+    def test_batch(self):
+        tag = ExifTag('Exif.Image.StripByteCounts', [1, 2])
+        with tag.batch() as values:
+            values.extend(range(3, 1001))
+            values[0] = 0
+            self.assertEqual(tag.raw_value, '1 2')
+
+        self.assertEqual(tag.array_value, array.array('I', [0] + list(range(2, 1001))))
+
+        tag = ExifTag('Exif.Image.Orientation', 1)
+        with tag.batch() as value:
+            self.assertEqual(value, 1)
+
     def test_makernote_types(self):
         # Makernote tags not attached to an image have an Undefined type by
         # default. When read from an existing image though, their type should be
@@ -350,3 +380,97 @@ class TestExifTag(unittest.TestCase):
         self.assertEqual(tag2.type, 'Long')
         self.assertEqual(tag2.value, [76830, 20070527, 2, 1, 4228109])
 
+    def test_array_value(self):
+        tag = ExifTag('Exif.Image.StripOffsets', [8, 1024, 2048])
+        self.assertEqual(tag.type, 'Long')
+        self.assertEqual(tag.array_value, array.array('I', [8, 1024, 2048]))
+
+        tag.array_value = array.array('I', range(5))
+        self.assertEqual(tag.raw_value, '0 1 2 3 4')
+        self.assertEqual(tag.value, [0, 1, 2, 3, 4])
+        tag.array_value = [4294967295]
+        self.assertEqual(tag.value, 4294967295)
+        self.failUnlessRaises(OverflowError, setattr, tag, 'array_value', [-1])
+
+        tag = ExifTag('Exif.Image.Orientation', 6)
+        self.assertEqual(tag.array_value, array.array('H', [6]))
+
+        tag = ExifTag('Exif.Image.Make', 'Canon')
+        self.failUnlessRaises(TypeError, getattr, tag, 'array_value')
+        self.failUnlessRaises(TypeError, setattr, tag, 'array_value', [1])
+
+    def test_array_value_rational(self):
+        tag = ExifTag('Exif.Image.PrimaryChromaticities')
+        self.assertEqual(tag.type, 'Rational')
+        tag.value = [make_fraction(64, 100), make_fraction(33, 100)]
+        self.assertEqual(tag.array_value, array.array('I', [16, 25, 33, 100]))
+        tag.array_value = [1, 2, 3, 4]
+        self.assertEqual(tag.value, [make_fraction(1, 2), make_fraction(3, 4)])
+
+        tag = ExifTag('Exif.Photo.ExposureBiasValue', make_fraction(-1, 3))
+        self.assertEqual(tag.type, 'SRational')
+        self.assertEqual(tag.array_value, array.array('i', [-1, 3]))
+
+    def test_array_value_from_image(self):
+        filepath = testutils.get_absolute_file_path(os.path.join('data', 'pentax-makernote.jpg'))
+        metadata = ImageMetadata(filepath)
+        metadata.read()
+        tag = metadata['Exif.Pentax.PreviewResolution']
+        self.assertEqual(tag.array_value, array.array('H', [640, 480]))
+        tag.array_value = array.array('H', [320, 240])
+        self.assertEqual(metadata['Exif.Pentax.PreviewResolution'].value,
+                         [320, 240])
+
+    def test_bytes_value(self):
+        tag = ExifTag('Exif.Photo.ExifVersion', '0100')
+        self.assertEqual(tag.bytes_value, b'0100')
+        self.assertEqual(tag.raw_value, '48 49 48 48')
+        tag.value = b'0221'
+        self.assertEqual(tag.value, b'0221')
+        self.assertEqual(tag.raw_value, '48 50 50 49')
+        tag.raw_value = '48 50 51 48'
+        self.assertEqual(tag.bytes_value, b'0230')
+        self.assertEqual(tag.value, '0230')
+        tag.bytes_value = bytearray(b'\x00\xff')
+        self.assertEqual(tag.value, '\x00\xff')
+        self.failUnlessRaises(ExifValueError, setattr, tag, 'value', 'ʐ')
+
+        tag = ExifTag('Exif.GPSInfo.GPSVersionID')
+        tag.bytes_value = b'\x02\x02\x00\x00'
+        self.assertEqual(tag.raw_value, '2 2 0 0')
+        self.assertEqual(tag.bytes_value, b'\x02\x02\x00\x00')
+        # Bytes set as the value of a Byte tag are still its decimal text.
+        tag.value = b'2 3 0 0'
+        self.assertEqual(tag.raw_value, '2 3 0 0')
+        self.assertEqual(tag.bytes_value, b'\x02\x03\x00\x00')
+
+        tag = ExifTag('Exif.Image.Orientation', 1)
+        self.failUnlessRaises(TypeError, getattr, tag, 'bytes_value')
+        self.failUnlessRaises(TypeError, setattr, tag, 'bytes_value', b'1')
+
+    def test_bytes_value_from_image(self):
+        filepath = testutils.get_absolute_file_path(os.path.join('data', 'pentax-makernote.jpg'))
+        metadata = ImageMetadata(filepath)
+        metadata.read()
+        tag = metadata['Exif.Photo.MakerNote']
+        data = tag.bytes_value
+        self.assertEqual(data, bytes(int(v) for v in tag.raw_value.split()))
+        self.assertEqual(metadata['Exif.Photo.MakerNote'].value,
+                         data.decode('latin-1'))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy_value(self):
+        tag = ExifTag('Exif.Image.StripByteCounts', [1, 2, 3])
+        values = tag.numpy_value
+        self.assertEqual(values.dtype, numpy.dtype('I'))
+        self.assertEqual(values.tolist(), [1, 2, 3])
+        tag.numpy_value = numpy.arange(10000)
+        self.assertEqual(len(tag.value), 10000)
+        self.failUnlessRaises(ExifValueError, setattr, tag, 'numpy_value',
+                              numpy.array([-1]))
+
+        tag = ExifTag('Exif.Image.PrimaryChromaticities',
+                      [make_fraction(1, 2), make_fraction(3, 4)])
+        self.assertEqual(tag.numpy_value.tolist(), [[1, 2], [3, 4]])
+        tag.numpy_value = numpy.array([[5, 6], [7, 8]])
+        self.assertEqual(tag.value, [make_fraction(5, 6), make_fraction(7, 8)])
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the pyexiv2 distribution.
+#
+# pyexiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# pyexiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyexiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+
+from pyexiv2.header import probe, ProbeResult, _PROBES
+from pyexiv2.metadata import ImageMetadata
+
+import os.path
+import struct
+import unittest
+
+import testutils
+
+
+class TestProbe(unittest.TestCase):
+
+    def _get_path(self, filename):
+        return testutils.get_absolute_file_path(os.path.join('data', filename))
+
+    def test_jpeg_files(self):
+        for filename in ('smiley1.jpg', 'DSCF_0273.JPG', 'exiv2-bug540.jpg',
+                         'usercomment-unicode-ii.jpg'):
+            path = self._get_path(filename)
+            result = probe(path)
+            metadata = ImageMetadata(path)
+            metadata.read()
+            self.assertEqual(result.mime_type, metadata.mime_type)
+            self.assertEqual((result.width, result.height),
+                             metadata.dimensions)
+
+        self.assertEqual(probe(self._get_path('smiley1.jpg')).byte_order, 'big')
+        self.assertEqual(probe(self._get_path('usercomment-unicode-ii.jpg')).byte_order,
+                         'little')
+        # No EXIF data
+        self.assertEqual(probe(self._get_path('exiv2-bug540.jpg')).byte_order,
+                         None)
+
+    def test_buffer(self):
+        path = self._get_path('smiley1.jpg')
+        with open(path, 'rb') as fd:
+            data = fd.read()
+        self.assertEqual(probe(data), probe(path))
+        self.assertEqual(probe(bytearray(data)), probe(path))
+        self.assertEqual(probe(data),
+                         ProbeResult('image/jpeg', 167, 140, 'big'))
+
+    def test_other_formats(self):
+        png = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + \
+              struct.pack('>IIBBBBB', 640, 480, 8, 2, 0, 0, 0)
+        self.assertEqual(probe(png), ProbeResult('image/png', 640, 480, None))
+
+        gif = b'GIF89a' + struct.pack('<HH', 3, 4) + b'\x00' * 20
+        self.assertEqual(probe(gif), ProbeResult('image/gif', 3, 4, None))
+
+        tiff = b'MM\x00\x2a' + struct.pack('>I', 8) + struct.pack('>H', 2) + \
+               struct.pack('>HHIHH', 256, 3, 1, 100, 0) + \
+               struct.pack('>HHII', 257, 4, 1, 200) + b'\x00' * 4
+        self.assertEqual(probe(tiff), ProbeResult('image/tiff', 100, 200, 'big'))
+
+    def test_truncated_headers(self):
+        png = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR'
+        for header in (b'BM1234', png, png + b'\x00\x00',
+                       b'RIFF\x00\x00\x00\x00WEBPVP8 ', b'GIF89a\x03',
+                       b'8BPS\x00\x01', b'MM\x00'):
+            for probe_ in _PROBES:
+                self.assertEqual(probe_(None, header), None)
+
+    def test_errors(self):
+        self.assertRaises(IOError, probe, 'idontexist')
+        self.assertRaises(TypeError, probe, b'not an image at all')
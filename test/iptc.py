@@ -211,6 +211,43 @@ class TestIptcTag(unittest.TestCase):
         value = ['foo']
         self.failUnlessRaises(ValueError, setattr, tag, 'raw_value', value)
 
+    def test_typed_values(self):
+        tag = IptcTag('Iptc.Application2.DateCreated',
+                      [datetime.date(2009, 2, 9)])
+        self.assertEqual(tag.raw_value, ['2009-02-09'])
+        self.assertEqual(tag.value, [datetime.date(2009, 2, 9)])
+
+        value = datetime.time(10, 52, 4, tzinfo=FixedOffset('-', 4, 30))
+        tag = IptcTag('Iptc.Application2.TimeCreated', [value])
+        self.assertEqual(tag.raw_value, ['10:52:04-04:30'])
+        self.assertEqual(tag.value, [value])
+        tag.value = [datetime.time(10, 52, 4)]
+        self.assertEqual(tag.raw_value, ['10:52:04+00:00'])
+
+        tag = IptcTag('Iptc.Envelope.FileFormat', [2])
+        self.assertEqual(tag.raw_value, ['2'])
+        tag.raw_value = ['3']
+        self.assertEqual(tag.value, [3])
+        self.failUnlessRaises(IptcValueError, setattr, tag, 'value', [-1])
+        self.failUnlessRaises(IptcValueError, setattr, tag, 'value', ['2'])
+
+    def test_batch(self):
+        tag = IptcTag('Iptc.Application2.Keywords', ['keyword'])
+        with tag.batch() as values:
+            self.failUnless(values is tag.value)
+            for i in range(100):
+                values.append('keyword %d' % i)
+            self.assertEqual(len(tag.raw_value), 1)
+
+        self.assertEqual(len(tag.raw_value), 101)
+        self.assertEqual(tag.raw_value[-1], b'keyword 99')
+
+        # Invalid values are only detected when leaving the batch
+        def append_invalid():
+            with tag.batch() as values:
+                values.append(None)
+        self.failUnlessRaises(IptcValueError, append_invalid)
+
     def test_set_value_non_repeatable(self):
         tag = IptcTag('Iptc.Application2.ReleaseDate')
         value = [datetime.date.today(), datetime.date.today()]
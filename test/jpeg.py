@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+# ******************************************************************************
+#
+# Copyright (C) 2015-2019 Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# This file is part of the pyexiv2 distribution.
+#
+# pyexiv2 is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# pyexiv2 is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyexiv2; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, 5th Floor, Boston, MA 02110-1301 USA.
+#
+# Maintainer: Vincent Vande Vyvre <vincent.vandevyvre@oqapy.eu>
+#
+# ******************************************************************************
+
+
+from pyexiv2 import jpeg
+
+import io
+import os
+import tempfile
+import unittest
+
+
+def _segment(marker, payload):
+    size = len(payload) + 2
+    return bytes((0xff, marker, size >> 8, size & 0xff)) + payload
+
+
+class _Image(object):
+
+    # Stands for a libexiv2python._Image, with fixed encoded data.
+
+    def __init__(self, exif=b'', xmp=b'', photoshop=b'', comment=''):
+        self.exif = exif
+        self.xmp = xmp
+        self.photoshop = photoshop
+        self.comment = comment
+        # The original data passed to the encoders, by family.
+        self.originals = {}
+
+    def _encodeExif(self, original):
+        self.originals['exif'] = original
+        return self.exif
+
+    def _encodeXmp(self):
+        return self.xmp
+
+    def _encodeIptc(self, original):
+        self.originals['iptc'] = original
+        return self.photoshop
+
+    def _getComment(self):
+        return self.comment
+
+
+class TestJpegPatch(unittest.TestCase):
+
+    def setUp(self):
+        self.exif = jpeg._EXIF_ID + b'II*\x00' + b'\x01' * 60
+        self.xmp = (jpeg._XMP_ID + b'<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+                    b'<x:xmpmeta xmlns:x="adobe:ns:meta/"></x:xmpmeta>'
+                    + b' ' * 100 + b'<?xpacket end="w"?>')
+        self.data = (b'\xff\xd8' + _segment(0xe0, b'JFIF\x00' + b'\x00' * 9) +
+                     _segment(0xe1, self.exif) + _segment(0xe1, self.xmp) +
+                     _segment(0xda, b'\x00' * 10) + b'\x12\x34\xff\xd9')
+        fd, self.pathname = tempfile.mkstemp(suffix='.jpg')
+        os.write(fd, self.data)
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.pathname)
+
+    def _read(self):
+        with open(self.pathname, 'rb') as file_:
+            return file_.read()
+
+    def test_metadata_segments(self):
+        with open(self.pathname, 'rb') as file_:
+            segments = jpeg._metadata_segments(file_)
+        exif_offset = 2 + 18 + 4
+        self.assertEqual(segments,
+                         {'exif': (exif_offset, len(self.exif)),
+                          'xmp': (exif_offset + len(self.exif) + 4,
+                                  len(self.xmp))})
+
+    def test_exif_payload(self):
+        payload = jpeg._exif_payload(b'MM\x00*', 20)
+        self.assertEqual(payload, b'Exif\x00\x00MM\x00*' + b'\x00' * 10)
+        self.assertEqual(jpeg._exif_payload(b'MM\x00*', 9), None)
+        self.assertEqual(jpeg._exif_payload(b'', 20), None)
+
+    def test_xmp_payload(self):
+        packet = b'<?xpacket begin=""?><x/>   \n<?xpacket end="w"?>'
+        payload = jpeg._xmp_payload(packet, 300)
+        self.assertEqual(len(payload), 300)
+        self.failUnless(payload.startswith(jpeg._XMP_ID +
+                                           b'<?xpacket begin=""?><x/>\n '))
+        self.failUnless(payload.endswith(b' <?xpacket end="w"?>'))
+        self.assertEqual(jpeg._xmp_payload(packet, 50), None)
+        self.assertEqual(jpeg._xmp_payload(b'<x/>', 300), None)
+
+    def test_patch(self):
+        image = _Image(exif=b'MM\x00*')
+        self.failUnless(jpeg.patch(self.pathname, image, frozenset(['exif'])))
+        # The EXIF data is encoded over the original one.
+        self.assertEqual(image.originals['exif'],
+                         self.exif[len(jpeg._EXIF_ID):])
+        data = self._read()
+        self.assertEqual(len(data), len(self.data))
+        self.failUnless(b'Exif\x00\x00MM\x00*\x00\x00' in data)
+        self.failUnless(data.endswith(self.data[-30:]))
+
+        # Nothing is patched unless all the segments can be.
+        image = _Image(exif=b'II*\x00', xmp=b'<x/>' * 100)
+        self.failIf(jpeg.patch(self.pathname, image,
+                               frozenset(['exif', 'xmp'])))
+        self.assertEqual(self._read(), data)
+
+    def test_patch_not_jpeg(self):
+        with open(self.pathname, 'wb') as file_:
+            file_.write(b'\x89PNG\r\n\x1a\n')
+        self.failIf(jpeg.patch(self.pathname, _Image(exif=b'II*\x00'),
+                               frozenset(['exif'])))
+
+    def test_patch_missing_segment(self):
+        data = b'\xff\xd8' + _segment(0xe1, self.exif) + b'\xff\xd9'
+        with open(self.pathname, 'wb') as file_:
+            file_.write(data)
+        self.failIf(jpeg.patch(self.pathname,
+                               _Image(xmp=b'<?xpacket end="w"?>'),
+                               frozenset(['xmp'])))
+        self.assertEqual(self._read(), data)
+
+
+class TestJpegSplice(unittest.TestCase):
+
+    def setUp(self):
+        self.jfif = _segment(0xe0, b'JFIF\x00' + b'\x00' * 9)
+        self.exif = _segment(0xe1, jpeg._EXIF_ID + b'II*\x00' + b'\x01' * 60)
+        self.iptc = _segment(0xed, jpeg._PS_ID + b'8BIM\x04\x04' + b'\x02' * 10)
+        self.scan = _segment(0xda, b'\x00' * 10) + b'\x12\x34' * 1000 + b'\xff\xd9'
+        self.data = b'\xff\xd8' + self.jfif + self.exif + self.iptc + self.scan
+        fd, self.pathname = tempfile.mkstemp(suffix='.jpg')
+        os.write(fd, self.data)
+        os.close(fd)
+        os.chmod(self.pathname, 0o640)
+
+    def tearDown(self):
+        os.remove(self.pathname)
+
+    def _read(self):
+        with open(self.pathname, 'rb') as file_:
+            return file_.read()
+
+    def test_segments(self):
+        with open(self.pathname, 'rb') as file_:
+            file_.read(2)
+            segments = list(jpeg._segments(file_))
+        self.assertEqual([marker for marker, offset, size in segments],
+                         [0xe0, 0xe1, 0xed, 0xda])
+        self.assertEqual(segments[-1][1], len(self.data) - len(self.scan))
+
+    def test_splice(self):
+        image = _Image(exif=b'MM\x00*', comment='Hello')
+        self.failUnless(jpeg.splice(self.pathname, image,
+                                    frozenset(['exif', 'comment'])))
+        # The EXIF data is encoded over the original one.
+        self.assertEqual(image.originals['exif'], b'II*\x00' + b'\x01' * 60)
+        self.assertEqual(self._read(),
+                         b'\xff\xd8' + self.jfif +
+                         _segment(0xfe, b'Hello') +
+                         _segment(0xe1, jpeg._EXIF_ID + b'MM\x00*') +
+                         self.iptc + self.scan)
+        self.assertEqual(os.stat(self.pathname).st_mode & 0o777, 0o640)
+        self.assertEqual([name for name in os.listdir(os.path.dirname(self.pathname))
+                          if name.startswith('.' + os.path.basename(self.pathname))],
+                         [])
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'No symbolic links')
+    def test_splice_symlink(self):
+        link = self.pathname + '.link'
+        os.symlink(self.pathname, link)
+        try:
+            image = _Image(exif=b'MM\x00*')
+            self.failUnless(jpeg.splice(link, image, frozenset(['exif'])))
+            self.failUnless(os.path.islink(link))
+            data = self._read()
+            self.failUnless(b'Exif\x00\x00MM\x00*' in data)
+            with open(link, 'rb') as file_:
+                self.assertEqual(file_.read(), data)
+            self.assertEqual(os.stat(self.pathname).st_mode & 0o777, 0o640)
+        finally:
+            os.remove(link)
+
+    def test_splice_iptc(self):
+        photoshop = b'8BIM\x04\x04' + b'\x03' * (2 * jpeg._MAX_PAYLOAD)
+        image = _Image(photoshop=photoshop)
+        self.failUnless(jpeg.splice(self.pathname, image, frozenset(['iptc'])))
+        self.assertEqual(image.originals['iptc'], b'8BIM\x04\x04' + b'\x02' * 10)
+        data = self._read()
+        self.failUnless(data.startswith(b'\xff\xd8' + self.jfif + self.exif))
+        self.failUnless(data.endswith(self.scan))
+        with open(self.pathname, 'rb') as file_:
+            file_.read(2)
+            segments = list(jpeg._segments(file_))
+        self.assertEqual([marker for marker, offset, size in segments],
+                         [0xe0, 0xe1, 0xed, 0xed, 0xed, 0xda])
+
+    def test_splice_remove(self):
+        self.failUnless(jpeg.splice(self.pathname, _Image(),
+                                    frozenset(['exif', 'xmp'])))
+        self.assertEqual(self._read(),
+                         b'\xff\xd8' + self.jfif + self.iptc + self.scan)
+
+        # No EXIF data to encode over.
+        image = _Image(exif=b'MM\x00*')
+        self.failUnless(jpeg.splice(self.pathname, image, frozenset(['exif'])))
+        self.assertEqual(image.originals['exif'], None)
+
+    def test_splice_too_large(self):
+        image = _Image(xmp=b' ' * jpeg._MAX_PAYLOAD)
+        self.failIf(jpeg.splice(self.pathname, image, frozenset(['xmp'])))
+        self.assertEqual(self._read(), self.data)
+
+    def test_splice_not_jpeg(self):
+        with open(self.pathname, 'wb') as file_:
+            file_.write(b'\x89PNG\r\n\x1a\n')
+        self.failIf(jpeg.splice(self.pathname, _Image(), frozenset(['exif'])))
+
+    def test_splice_to(self):
+        image = _Image(xmp=b'<x/>')
+        destination = io.BytesIO()
+        self.failUnless(jpeg.splice_to(self.pathname, image,
+                                       frozenset(['xmp']), destination))
+        self.assertEqual(destination.getvalue(),
+                         b'\xff\xd8' + self.jfif +
+                         _segment(0xe1, jpeg._XMP_ID + b'<x/>') +
+                         self.exif + self.iptc + self.scan)
+        self.assertEqual(self._read(), self.data)
+
+        destination = io.BytesIO()
+        self.failUnless(jpeg.splice_to(self.pathname, image, frozenset(),
+                                       destination))
+        self.assertEqual(destination.getvalue(), self.data)
+
+    def test_copy_range(self):
+        with open(self.pathname, 'rb') as source:
+            with tempfile.TemporaryFile() as destination:
+                destination.write(b'head')
+                destination.flush()
+                jpeg._copy_range(source, destination, 2, 100)
+                destination.seek(0)
+                self.assertEqual(destination.read(),
+                                 b'head' + self.data[2:102])
@@ -25,7 +25,7 @@
 #
 # ******************************************************************************
 
-from pyexiv2.metadata import ImageMetadata
+from pyexiv2.metadata import ImageMetadata, Projection
 from pyexiv2.exif import ExifTag
 from pyexiv2.iptc import IptcTag
 from pyexiv2.xmp import XmpTag
@@ -33,10 +33,12 @@ from pyexiv2.utils import FixedOffset, make_fraction
 
 import datetime
 import os
+import shutil
 import tempfile
 import time
 import unittest
 from testutils import EMPTY_JPG_DATA
+import testutils
 
 from pyexiv2 import metadata
 
@@ -98,6 +100,7 @@ class TestImageMetadata(unittest.TestCase):
         self.assertRaises(IOError, thumb.erase)
         self.assertRaises(IOError, thumb.set_from_file, '/tmp/foobar.jpg')
         self.assertRaises(IOError, getattr, self.metadata, 'iptc_charset')
+        self.assertRaises(IOError, self.metadata.to_dict)
 
     def test_read(self):
         self.assertRaises(IOError, getattr, self.metadata, '_image')
@@ -629,6 +632,282 @@ class TestImageMetadata(unittest.TestCase):
 
         self.failUnlessEqual(self.metadata.comment, self.other.comment)
 
+    def test_set_tags_from_other_image(self):
+        self.metadata.read()
+        self._set_up_other()
+        self.other.read()
+        keys = ('Exif.Image.Make', 'Iptc.Application2.Caption', 'Xmp.dc.subject')
+        for key in keys:
+            self.other[key] = self.metadata[key]
+
+        for key in keys:
+            self.assertEqual(self.other[key].value, self.metadata[key].value)
+        self.other.write()
+        # The tags still belong to the source image.
+        self.assertEqual(self.metadata._image._getExifTag('Exif.Image.Make')._getRawValue(),
+                         'EASTMAN KODAK COMPANY')
+        self.assertEqual(self.metadata._image._getIptcTag('Iptc.Application2.Caption')._getRawValues(),
+                         ['blabla'])
+        self.assertEqual(self.metadata._image._getXmpTag('Xmp.dc.subject')._getArrayValue(),
+                         ['image', 'test', 'pyexiv2'])
+
+    def test_write_only_changes(self):
+        self.metadata.read()
+        mtime = os.stat(self.pathname).st_mtime_ns
+        self.assertEqual(self.metadata.write(), frozenset())
+        self.assertEqual(os.stat(self.pathname).st_mtime_ns, mtime)
+
+        self.metadata['Exif.Image.Make'].value = 'Canon'
+        self.metadata['Xmp.dc.subject'].value = ['foo']
+        self.assertEqual(self.metadata.write(), frozenset(['exif', 'xmp']))
+        self.assertEqual(self.metadata.write(), frozenset())
+
+        del self.metadata['Iptc.Application2.Caption']
+        self.metadata.comment = 'Yellow Submarine'
+        self.assertEqual(self.metadata.write(),
+                         frozenset(['iptc', 'comment']))
+
+        self.metadata['Iptc.Application2.DateCreated'].value[0] = \
+            datetime.date(2009, 2, 9)
+        self.assertEqual(self.metadata.write(), frozenset(['iptc']))
+
+        self.metadata.exif_thumbnail.erase()
+        self.assertEqual(self.metadata.write(), frozenset(['exif']))
+
+        # A new read forgets the changes.
+        self.metadata['Exif.Image.Make'] = 'Nikon'
+        self.metadata.read()
+        self.assertEqual(self.metadata.write(), frozenset())
+        self.assertEqual(self.metadata['Exif.Image.Make'].value, 'Canon')
+        self.assertEqual(self.metadata.write(force=True), frozenset())
+
+    def test_write_in_place(self):
+        self.metadata.read()
+        size = os.path.getsize(self.pathname)
+        self.metadata['Exif.Image.Make'].value = 'Canon'
+        self.metadata['Xmp.dc.subject'].value = ['foo']
+        self.assertEqual(self.metadata.write(mode='inplace'),
+                         frozenset(['exif', 'xmp']))
+        self.assertEqual(os.path.getsize(self.pathname), size)
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other['Exif.Image.Make'].value, 'Canon')
+        self.assertEqual(other['Exif.Image.DateTime'].value,
+                         datetime.datetime(2009, 2, 9, 13, 33, 20))
+        self.assertEqual(other['Xmp.dc.subject'].value, ['foo'])
+        self.assertEqual(other['Iptc.Application2.Caption'].value, ['blabla'])
+        self.assertEqual(other.comment, 'Hello World!')
+
+        # The new data doesn't fit, the file is rewritten.
+        self.metadata['Exif.Image.ImageDescription'] = 'x' * 1000
+        self.metadata.write(mode='inplace')
+        self.failUnless(os.path.getsize(self.pathname) > size)
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other['Exif.Image.ImageDescription'].value, 'x' * 1000)
+        self.assertEqual(other['Exif.Image.Make'].value, 'Canon')
+
+        # Only EXIF and XMP segments are patched.
+        self.metadata['Iptc.Application2.Caption'] = ['foo']
+        self.metadata.write(mode='inplace')
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other['Iptc.Application2.Caption'].value, ['foo'])
+
+        self.assertRaises(ValueError, self.metadata.write, mode='foo')
+
+    def _check_makernote_kept(self, mode):
+        source = testutils.get_absolute_file_path(
+            os.path.join('data', 'pentax-makernote.jpg'))
+        shutil.copyfile(source, self.pathname)
+        metadata = ImageMetadata(self.pathname)
+        metadata.read()
+        makernote = dict((key, metadata[key].raw_value)
+                         for key in metadata.exif_keys
+                         if key.startswith('Exif.Pentax.'))
+        self.failUnless(makernote)
+        # A value of the same size, the layout of the EXIF data is kept.
+        make = metadata['Exif.Image.Make'].value.swapcase()
+        metadata['Exif.Image.Make'] = make
+        size = os.path.getsize(self.pathname)
+        metadata.write(mode=mode)
+        self.assertEqual(os.path.getsize(self.pathname), size)
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other['Exif.Image.Make'].value, make)
+        for key, raw_value in makernote.items():
+            self.assertEqual(other[key].raw_value, raw_value)
+
+    def test_write_in_place_keeps_makernote(self):
+        self._check_makernote_kept('inplace')
+
+    def test_write_splice_keeps_makernote(self):
+        self._check_makernote_kept('splice')
+
+    def test_write_splice(self):
+        self.metadata.read()
+        with open(self.pathname, 'rb') as file_:
+            data = file_.read()
+        scan = data[data.index(b'\xff\xda'):]
+        self.metadata['Exif.Image.ImageDescription'] = 'x' * 1000
+        self.metadata['Iptc.Application2.Caption'] = ['foo']
+        self.assertEqual(self.metadata.write(mode='splice'),
+                         frozenset(['exif', 'iptc']))
+        with open(self.pathname, 'rb') as file_:
+            self.failUnless(file_.read().endswith(scan))
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other['Exif.Image.ImageDescription'].value, 'x' * 1000)
+        self.assertEqual(other['Exif.Image.DateTime'].value,
+                         datetime.datetime(2009, 2, 9, 13, 33, 20))
+        self.assertEqual(other['Iptc.Application2.Caption'].value, ['foo'])
+        self.assertEqual(other['Xmp.dc.subject'].value,
+                         ['image', 'test', 'pyexiv2'])
+        self.assertEqual(other.comment, 'Hello World!')
+
+        self.metadata.comment = 'Bye'
+        self.assertEqual(self.metadata.write(mode='splice'),
+                         frozenset(['comment']))
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other.comment, 'Bye')
+        self.assertEqual(other['Iptc.Application2.Caption'].value, ['foo'])
+
+    def test_write_to(self):
+        self.metadata.read()
+        with open(self.pathname, 'rb') as file_:
+            original = file_.read()
+        self.metadata['Exif.Image.Make'] = 'Canon'
+        self.metadata['Xmp.dc.subject'] = ['foo']
+
+        def check(data):
+            other = ImageMetadata.from_buffer(data)
+            other.read()
+            self.assertEqual(other['Exif.Image.Make'].value, 'Canon')
+            self.assertEqual(other['Xmp.dc.subject'].value, ['foo'])
+            self.assertEqual(other['Iptc.Application2.Caption'].value,
+                             ['blabla'])
+            self.assertEqual(other.comment, 'Hello World!')
+
+        fd, pathname = tempfile.mkstemp(suffix='.jpg')
+        os.close(fd)
+        try:
+            self.metadata.write_to(pathname)
+            with open(pathname, 'rb') as file_:
+                data = file_.read()
+            check(data)
+
+            with open(pathname, 'wb') as file_:
+                file_.write(b'foo')
+                self.metadata.write_to(file_)
+            with open(pathname, 'rb') as file_:
+                self.assertEqual(file_.read(), b'foo' + data)
+
+            fd = os.open(pathname, os.O_WRONLY | os.O_TRUNC)
+            try:
+                self.metadata.write_to(fd)
+            finally:
+                os.close(fd)
+            with open(pathname, 'rb') as file_:
+                self.assertEqual(file_.read(), data)
+
+        finally:
+            os.remove(pathname)
+
+        buffer_ = bytearray(b'foo')
+        self.metadata.write_to(buffer_)
+        self.assertEqual(bytes(buffer_), data)
+
+        # The image itself is left untouched.
+        with open(self.pathname, 'rb') as file_:
+            self.assertEqual(file_.read(), original)
+        self.assertRaises(ValueError, self.metadata.write_to, self.pathname)
+        self.assertEqual(self.metadata.write(), frozenset(['exif', 'xmp']))
+
+        # From a buffer
+        other = ImageMetadata.from_buffer(original)
+        other.read()
+        other['Exif.Image.Make'] = 'Canon'
+        other['Xmp.dc.subject'] = ['foo']
+        buffer_ = bytearray()
+        other.write_to(buffer_)
+        check(buffer_)
+        self.assertEqual(other.buffer, original)
+
+    def test_write_pending_batch(self):
+        self.metadata.read()
+        self.metadata['Iptc.Application2.Keywords'] = ['a']
+        tag = self.metadata['Iptc.Application2.Keywords']
+        with tag.batch() as values:
+            values.extend(['b', 'c'])
+            values.append('d')
+            # The changes are pending until the batch is left, or the
+            # metadata written.
+            self.assertEqual(
+                self.metadata._image._getIptcTag(tag.key)._getRawValues(),
+                ['a'])
+            self.metadata.write()
+
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other['Iptc.Application2.Keywords'].value,
+                         ['a', 'b', 'c', 'd'])
+
+    def test_lookups_follow_changes(self):
+        self.metadata.read()
+        image = self.metadata._image
+        image._deleteExifTag('Exif.Image.Make')
+        self.assertRaises(KeyError, image._getExifTag, 'Exif.Image.Make')
+        self.assertEqual(image._getExifTag('Exif.Image.DateTime')._getRawValue(),
+                         '2009:02:09 13:33:20')
+        self.metadata['Exif.Image.Make'] = 'Canon'
+        self.assertEqual(image._getExifTag('Exif.Image.Make')._getRawValue(),
+                         'Canon')
+
+        self.metadata['Iptc.Application2.Keywords'] = ['a', 'b', 'c']
+        image._deleteIptcTag('Iptc.Application2.Caption')
+        self.assertRaises(KeyError, image._getIptcTag, 'Iptc.Application2.Caption')
+        self.assertEqual(image._getIptcTag('Iptc.Application2.Keywords')._getRawValues(),
+                         ['a', 'b', 'c'])
+        self.metadata['Iptc.Application2.Keywords'] = ['d']
+        self.assertEqual(image._getIptcTag('Iptc.Application2.Keywords')._getRawValues(),
+                         ['d'])
+        self.assertEqual(image._getIptcTag('Iptc.Application2.DateCreated')._getRawValues(),
+                         ['2004-07-13'])
+
+        image._deleteXmpTag('Xmp.dc.format')
+        self.assertRaises(KeyError, image._getXmpTag, 'Xmp.dc.format')
+        self.assertEqual(image._getXmpTag('Xmp.dc.subject')._getArrayValue(),
+                         ['image', 'test', 'pyexiv2'])
+
+    def test_lookups_follow_interleaved_changes(self):
+        self.metadata.read()
+        image = self.metadata._image
+        self.metadata['Iptc.Application2.Keywords'] = ['a', 'b', 'c']
+        self.metadata['Iptc.Application2.City'] = ['Paris']
+        self.metadata['Iptc.Application2.Keywords'] = ['a']
+        self.metadata['Iptc.Application2.Writer'] = ['me']
+        del self.metadata['Iptc.Application2.Caption']
+        self.metadata['Iptc.Application2.Keywords'] = ['e', 'f']
+        expected = {'Iptc.Application2.DateCreated': ['2004-07-13'],
+                    'Iptc.Application2.Keywords': ['e', 'f'],
+                    'Iptc.Application2.City': ['Paris'],
+                    'Iptc.Application2.Writer': ['me']}
+        for key, values in expected.items():
+            self.assertEqual(image._getIptcTag(key)._getRawValues(), values)
+        self.assertRaises(KeyError, image._getIptcTag,
+                          'Iptc.Application2.Caption')
+
+        self.metadata['Xmp.dc.title'] = {'x-default': 'Title'}
+        self.metadata['Xmp.dc.creator'] = ['me']
+        del self.metadata['Xmp.dc.format']
+        del self.metadata['Xmp.dc.title']
+        self.assertEqual(image._getXmpTag('Xmp.dc.subject')._getArrayValue(),
+                         ['image', 'test', 'pyexiv2'])
+        self.assertEqual(image._getXmpTag('Xmp.dc.creator')._getArrayValue(),
+                         ['me'])
+        self.assertRaises(KeyError, image._getXmpTag, 'Xmp.dc.title')
+
     #############################
     # Test MutableMapping methods
     #############################
@@ -676,6 +955,226 @@ class TestImageMetadata(unittest.TestCase):
         self.assertTrue('Iptc.Application2.Caption' not in self.clean)
         self.assertTrue('Xmp.dc.subject' not in self.clean)
 
+    def test_get_many(self):
+        self.metadata.read()
+        keys = ['Exif.Image.Make', 'Exif.Photo.FNumber',
+                'Iptc.Application2.DateCreated', 'Iptc.Application2.Keywords',
+                'Xmp.dc.subject', 'Xmp.dc.creator']
+        values = self.metadata.get_many(keys)
+        self.assertEqual(values, {'Exif.Image.Make': 'EASTMAN KODAK COMPANY',
+                                  'Exif.Photo.FNumber': None,
+                                  'Iptc.Application2.DateCreated':
+                                      [datetime.date(2004, 7, 13)],
+                                  'Iptc.Application2.Keywords': None,
+                                  'Xmp.dc.subject': ['image', 'test', 'pyexiv2'],
+                                  'Xmp.dc.creator': None})
+        # The tags found are cached.
+        self.assertTrue(self.metadata._tags['exif']['Exif.Image.Make'] is
+                        self.metadata['Exif.Image.Make'])
+        self.assertFalse('Exif.Photo.FNumber' in self.metadata._tags['exif'])
+
+        values = self.metadata.get_many(keys, default=0, raw=True)
+        self.assertEqual(values['Exif.Image.Make'], 'EASTMAN KODAK COMPANY')
+        self.assertEqual(values['Exif.Photo.FNumber'], 0)
+        self.assertEqual(values['Iptc.Application2.DateCreated'],
+                         ['2004-07-13'])
+        self.assertEqual(values['Xmp.dc.subject'], ['image', 'test', 'pyexiv2'])
+
+        self.assertRaises(KeyError, self.metadata.get_many, ['Foo.Bar.Baz'])
+        self.assertRaises(KeyError, self.metadata.get_many, ['Exif.Foo.Bar'])
+
+    def test_get_many_projection(self):
+        projection = Projection(['Exif.Image.DateTime', 'Xmp.dc.format'])
+        self.assertEqual(projection.keys,
+                         ('Exif.Image.DateTime', 'Xmp.dc.format'))
+        self.assertEqual(projection.families, frozenset(('exif', 'xmp')))
+        self.assertRaises(KeyError, Projection, ['Exif.Image.Make', 'Foo.Bar'])
+
+        self.metadata.read(families=('exif',))
+        self.assertRaises(IOError, self.metadata.get_many, projection)
+        self.metadata.read()
+        values = self.metadata.get_many(projection)
+        self.assertEqual(values, {'Exif.Image.DateTime':
+                                      datetime.datetime(2009, 2, 9, 13, 33, 20),
+                                  'Xmp.dc.format': ('image', 'jpeg')})
+
+        # The same projection applies to another image.
+        other = ImageMetadata.from_buffer(EMPTY_JPG_DATA)
+        other.read()
+        self.assertEqual(other.get_many(projection),
+                         {'Exif.Image.DateTime': None, 'Xmp.dc.format': None})
+
+    def test_get_exposure_and_rights_data(self):
+        self.metadata.read()
+        self.assertEqual(self.metadata.get_exposure_data(),
+                         {'iso': None, 'speed': None, 'focal': None,
+                          'aperture': None, 'orientation': 1})
+        self.metadata['Exif.Photo.ISOSpeedRatings'] = 200
+        self.metadata['Exif.Photo.ExposureTime'] = make_fraction(1, 250)
+        self.metadata['Exif.Photo.FocalLength'] = make_fraction(35, 1)
+        self.metadata['Exif.Photo.FNumber'] = make_fraction(28, 10)
+        self.metadata['Exif.Image.Orientation'] = 6
+        self.assertEqual(self.metadata.get_exposure_data(float_=True),
+                         {'iso': 200, 'speed': 0.004, 'focal': 35.0,
+                          'aperture': 2.8, 'orientation': 6})
+        self.assertEqual(self.metadata.get_shutter_speed(),
+                         make_fraction(1, 250))
+
+        self.metadata['Exif.Image.Artist'] = 'John Doe'
+        self.metadata['Xmp.dc.creator'] = ['John Doe']
+        self.assertEqual(self.metadata.get_rights_data(),
+                         {'creator': ['John Doe'], 'artist': 'John Doe',
+                          'rights': None, 'copyright': None, 'marked': None,
+                          'usage': None})
+
+    def test_contains_and_len(self):
+        self.metadata.read()
+        # Lookups before the keys are listed.
+        self.assertTrue('Exif.Image.Make' in self.metadata)
+        self.assertTrue('Iptc.Application2.Caption' in self.metadata)
+        self.assertTrue('Xmp.dc.subject' in self.metadata)
+        self.assertFalse('Exif.Photo.FNumber' in self.metadata)
+        self.assertFalse('Exif.Foo.Bar' in self.metadata)
+        self.assertFalse('Xmp.foo.bar' in self.metadata)
+        self.assertFalse('Foo.Bar.Baz' in self.metadata)
+        self.assertFalse(None in self.metadata)
+        self.assertEqual(self.metadata._keys,
+                         {'exif': None, 'iptc': None, 'xmp': None})
+
+        count = len(self.metadata.exif_keys) + \
+                len(self.metadata.iptc_keys) + \
+                len(self.metadata.xmp_keys)
+        self.assertEqual(len(self.metadata), count)
+        self.assertEqual(len(self.metadata), len(list(self.metadata)))
+
+        # Lookups against the cached keys.
+        self.assertTrue('Exif.Image.Make' in self.metadata)
+        del self.metadata['Exif.Image.Make']
+        self.assertFalse('Exif.Image.Make' in self.metadata)
+        self.metadata['Exif.Photo.FNumber'] = make_fraction(28, 10)
+        self.assertTrue('Exif.Photo.FNumber' in self.metadata)
+        self.assertEqual(len(self.metadata), count)
+
+    def test_contains_families_not_read(self):
+        self.metadata.read(families=('iptc',))
+        self.assertTrue('Iptc.Application2.Caption' in self.metadata)
+        self.assertRaises(IOError, self.metadata.__contains__, 'Exif.Image.Make')
+        self.assertEqual(len(self.metadata), len(self.metadata.iptc_keys))
+
+    #####################
+    # Test the snapshot #
+    #####################
+
+    def test_to_dict(self):
+        self.metadata.read()
+        snapshot = self.metadata.to_dict()
+        keys = self.metadata.exif_keys + \
+               self.metadata.iptc_keys + \
+               self.metadata.xmp_keys
+        self.assertEqual(sorted(snapshot.keys()), sorted(keys))
+        for key in keys:
+            tag = self.metadata[key]
+            self.assertEqual(snapshot[key], (tag.type, tag.raw_value))
+
+    def test_to_dict_families(self):
+        self.metadata.read()
+        snapshot = self.metadata.to_dict(families=('iptc',))
+        self.assertEqual(sorted(snapshot.keys()),
+                         sorted(self.metadata.iptc_keys))
+        self.assertEqual(snapshot['Iptc.Application2.Caption'],
+                         ('String', ['blabla']))
+        self.assertEqual(self.metadata.to_dict(families=()), {})
+        self.assertRaises(ValueError, self.metadata.to_dict, ('foo',))
+
+    def test_to_dict_modified(self):
+        self.metadata.read()
+        self.metadata['Exif.Image.Make'] = 'Canon'
+        del self.metadata['Xmp.dc.format']
+        snapshot = self.metadata.to_dict()
+        self.assertEqual(snapshot['Exif.Image.Make'], ('Ascii', 'Canon'))
+        self.assertTrue('Xmp.dc.format' not in snapshot)
+
+    def test_read_families(self):
+        self.metadata.read(families=('exif',))
+        self.assertEqual(self.metadata['Exif.Image.Make'].value,
+                         'EASTMAN KODAK COMPANY')
+        self.assertEqual(self.metadata.comment, 'Hello World!')
+        self.assertEqual(list(self.metadata), self.metadata.exif_keys)
+        self.assertEqual(len(self.metadata), len(self.metadata.exif_keys))
+        self.assertEqual(sorted(self.metadata.to_dict().keys()),
+                         sorted(self.metadata.exif_keys))
+        self.assertRaises(IOError, getattr, self.metadata, 'iptc_keys')
+        self.assertRaises(IOError, getattr, self.metadata, 'xmp_keys')
+        self.assertRaises(IOError, self.metadata.__getitem__,
+                          'Iptc.Application2.Caption')
+        self.assertRaises(IOError, self.metadata.__setitem__,
+                          'Xmp.dc.format', ('foo', 'bar'))
+        self.assertRaises(IOError, self.metadata.to_dict, ('xmp',))
+        self.assertRaises(IOError, self.metadata.write)
+
+        self.metadata.read(families=['IPTC', 'xmp'])
+        self.assertEqual(self.metadata['Iptc.Application2.Caption'].value,
+                         ['blabla'])
+        self.assertEqual(self.metadata['Xmp.dc.subject'].value,
+                         ['image', 'test', 'pyexiv2'])
+        self.assertRaises(IOError, getattr, self.metadata, 'exif_keys')
+
+        self.assertRaises(ValueError, self.metadata.read, ('foo',))
+
+    def test_read_families_from_buffer(self):
+        with open(self.pathname, 'rb') as fd:
+            metadata = ImageMetadata.from_buffer(fd.read())
+        metadata.read(families=('xmp',))
+        self.assertEqual(metadata.xmp_keys, ['Xmp.dc.format', 'Xmp.dc.subject'])
+        self.assertEqual(metadata.mime_type, 'image/jpeg')
+
+    def test_read_all_families_after_partial_read(self):
+        self.metadata.read(families=('exif',))
+        self.metadata.read()
+        self.metadata['Iptc.Application2.Caption'] = ['foo']
+        self.metadata.write()
+        other = ImageMetadata(self.pathname)
+        other.read()
+        self.assertEqual(other['Iptc.Application2.Caption'].value, ['foo'])
+        self.assertEqual(other['Xmp.dc.format'].value, ('image', 'jpeg'))
+
+    def test_read_keys(self):
+        self.metadata.read(keys=['Exif.Image.Make', 'Xmp.dc.subject',
+                                 'Xmp.dc.creator'])
+        self.assertEqual(self.metadata.exif_keys, ['Exif.Image.Make'])
+        self.assertEqual(self.metadata.xmp_keys, ['Xmp.dc.subject'])
+        self.assertRaises(IOError, getattr, self.metadata, 'iptc_keys')
+        self.assertEqual(self.metadata['Xmp.dc.subject'].value,
+                         ['image', 'test', 'pyexiv2'])
+        self.assertRaises(IOError, self.metadata.write)
+
+        self.metadata.read(families=('exif', 'iptc'),
+                           keys=['Exif.Image.DateTime'],
+                           key_prefixes=['Iptc.Application2.'])
+        self.assertEqual(self.metadata.exif_keys, ['Exif.Image.DateTime'])
+        self.assertEqual(sorted(self.metadata.iptc_keys),
+                         ['Iptc.Application2.Caption',
+                          'Iptc.Application2.DateCreated'])
+        self.assertRaises(IOError, getattr, self.metadata, 'xmp_keys')
+
+        self.assertRaises(KeyError, self.metadata.read, keys=['Exif.Foo.Bar'])
+        self.assertRaises(ValueError, self.metadata.read, key_prefixes=['Foo.'])
+
+    def test_read_key_prefixes(self):
+        self.metadata.read(key_prefixes=['Exif.Image.Da', 'Xmp.dc.'])
+        self.assertEqual(self.metadata.exif_keys, ['Exif.Image.DateTime'])
+        self.assertEqual(self.metadata.xmp_keys,
+                         ['Xmp.dc.format', 'Xmp.dc.subject'])
+        self.assertEqual(sorted(self.metadata.to_dict().keys()),
+                         ['Exif.Image.DateTime', 'Xmp.dc.format',
+                          'Xmp.dc.subject'])
+        self.assertRaises(IOError, self.metadata.write)
+
+        # A full read brings everything back.
+        self.metadata.read()
+        self.assertTrue('Exif.Image.Make' in self.metadata)
+        self.metadata.write()
+
     ###########################
     # Test the EXIF thumbnail #
     ###########################
@@ -692,8 +1191,7 @@ class TestImageMetadata(unittest.TestCase):
         thumb = self.metadata.exif_thumbnail
         self.assertEqual(thumb.mime_type, '')
         self.assertEqual(thumb.extension, '')
-        # ExifThumbnail._get_data not yet implemented
-        #self.assertEqual(thumb.data, '')
+        self.assertEqual(thumb.data, b'')
         self._test_thumbnail_tags(False)
 
     def test_set_exif_thumbnail_from_data(self):
@@ -703,8 +1201,7 @@ class TestImageMetadata(unittest.TestCase):
         thumb.data = EMPTY_JPG_DATA
         self.assertEqual(thumb.mime_type, 'image/jpeg')
         self.assertEqual(thumb.extension, '.jpg')
-        # ExifThumbnail._get_data not yet implemented
-        #self.assertEqual(thumb.data, EMPTY_JPG_DATA)
+        self.assertEqual(thumb.data, EMPTY_JPG_DATA)
         self._test_thumbnail_tags(True)
 
     def test_set_exif_thumbnail_from_file(self):
@@ -718,10 +1215,19 @@ class TestImageMetadata(unittest.TestCase):
         os.remove(pathname)
         self.assertEqual(thumb.mime_type, 'image/jpeg')
         self.assertEqual(thumb.extension, '.jpg')
-        # ExifThumbnail._get_data not yet implemented
-        #self.assertEqual(thumb.data, EMPTY_JPG_DATA)
+        self.assertEqual(thumb.data, EMPTY_JPG_DATA)
         self._test_thumbnail_tags(True)
 
+    def test_exif_thumbnail_data_into(self):
+        self.metadata.read()
+        thumb = self.metadata.exif_thumbnail
+        thumb.data = EMPTY_JPG_DATA
+        buffer_ = bytearray(len(EMPTY_JPG_DATA) + 10)
+        self.assertEqual(thumb.data_into(buffer_), len(EMPTY_JPG_DATA))
+        self.assertEqual(bytes(buffer_[:len(EMPTY_JPG_DATA)]), EMPTY_JPG_DATA)
+        self.assertRaises(ValueError, thumb.data_into, bytearray(10))
+        self.assertRaises(BufferError, thumb.data_into, b'readonly')
+
     def test_write_exif_thumbnail_to_file(self):
         self.metadata.read()
         self._test_thumbnail_tags(False)
@@ -744,13 +1250,12 @@ class TestImageMetadata(unittest.TestCase):
         thumb.data = EMPTY_JPG_DATA
         self.assertEqual(thumb.mime_type, 'image/jpeg')
         self.assertEqual(thumb.extension, '.jpg')
-        # ExifThumbnail._get_data not yet implemented
-        #self.assertEqual(thumb.data, EMPTY_JPG_DATA)
+        self.assertEqual(thumb.data, EMPTY_JPG_DATA)
         self._test_thumbnail_tags(True)
         thumb.erase()
         self.assertEqual(thumb.mime_type, '')
         self.assertEqual(thumb.extension, '')
-        #self.assertEqual(thumb.data, '')
+        self.assertEqual(thumb.data, b'')
         self._test_thumbnail_tags(False)
 
     def test_set_exif_thumbnail_from_invalid_data(self):
@@ -785,6 +1290,22 @@ class TestImageMetadata(unittest.TestCase):
         self.assertEqual(thumb.mime_type, preview.mime_type)
         self.assertEqual(thumb.extension, preview.extension)
 
+    def test_preview_data_extracted_on_demand(self):
+        self.metadata.read()
+        self.metadata.exif_thumbnail.data = EMPTY_JPG_DATA
+        preview = self.metadata.previews[0]
+        self.assertEqual(preview.size, len(EMPTY_JPG_DATA))
+        self.assertEqual(preview.data, EMPTY_JPG_DATA)
+        fd, pathname = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(pathname)
+        preview.write_to_file(pathname)
+        pathname = pathname + preview.extension
+        fd = open(pathname, 'rb')
+        self.assertEqual(fd.read(), EMPTY_JPG_DATA)
+        fd.close()
+        os.remove(pathname)
+
     #########################
     # Test the IPTC charset #
     #########################
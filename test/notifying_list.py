@@ -328,3 +328,53 @@ class TestNotifyingList(unittest.TestCase):
         self.failUnlessEqual(self.values, [])
         for listener in listeners:
             self.failUnlessEqual(listener.changes, 8)
+
+    def test_batch(self):
+        listeners = self._register_listeners()
+
+        with self.values.batch() as values:
+            self.failUnless(values is self.values)
+            for i in range(100):
+                values.append(i)
+            values.sort()
+            # Nested batches are notified when leaving the outermost one.
+            with values.batch():
+                values.remove(57)
+
+            for listener in listeners:
+                self.failUnlessEqual(listener.changes, 0)
+
+        self.failUnlessEqual(len(self.values), 106)
+        for listener in listeners:
+            self.failUnlessEqual(listener.changes, 1)
+
+        # No change, no notification
+        with self.values.batch():
+            pass
+
+        for listener in listeners:
+            self.failUnlessEqual(listener.changes, 1)
+
+        # Changes are notified even if the batch is left with an exception
+        try:
+            with self.values.batch():
+                self.values.pop()
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+
+        for listener in listeners:
+            self.failUnlessEqual(listener.changes, 2)
+
+    def test_batch_flush(self):
+        listeners = self._register_listeners()
+        with self.values.batch():
+            self.values.append(1)
+            self.values.flush()
+            for listener in listeners:
+                self.failUnlessEqual(listener.changes, 1)
+
+            self.values.flush()
+
+        for listener in listeners:
+            self.failUnlessEqual(listener.changes, 1)
@@ -25,11 +25,12 @@
 #
 # ******************************************************************************
 
+import json
 import unittest
 
 from pyexiv2.utils import (undefined_to_string, string_to_undefined,
                            Fraction, is_fraction, make_fraction, 
-                           fraction_to_string)
+                           fraction_to_string, KeyList)
 
 
 class TestConversions(unittest.TestCase):
@@ -85,3 +86,69 @@ class TestFractions(unittest.TestCase):
         self.assertRaises(TypeError, fraction_to_string, None)
         self.assertRaises(TypeError, fraction_to_string, 'invalid')
 
+
+class TestKeyList(unittest.TestCase):
+
+    def test_membership_follows_changes(self):
+        keys = KeyList(['Exif.Image.Make', 'Exif.Image.Model'])
+        self.assertEqual(keys, ['Exif.Image.Make', 'Exif.Image.Model'])
+        self.failUnless('Exif.Image.Make' in keys)
+        self.failIf('Exif.Image.DateTime' in keys)
+
+        keys.append('Exif.Image.DateTime')
+        self.failUnless('Exif.Image.DateTime' in keys)
+        keys.remove('Exif.Image.Make')
+        self.failIf('Exif.Image.Make' in keys)
+        self.assertRaises(ValueError, keys.remove, 'Exif.Image.Make')
+
+        keys.insert(0, 'Exif.Image.Orientation')
+        self.assertEqual(keys.pop(0), 'Exif.Image.Orientation')
+        self.failIf('Exif.Image.Orientation' in keys)
+
+        keys[0] = 'Exif.Image.Artist'
+        self.failUnless('Exif.Image.Artist' in keys)
+        self.failIf('Exif.Image.Model' in keys)
+        del keys[0]
+        self.failIf('Exif.Image.Artist' in keys)
+
+        keys.extend(['Exif.Photo.FNumber'])
+        keys += ['Exif.Photo.ISOSpeedRatings']
+        self.assertTrue(isinstance(keys, KeyList))
+        self.failUnless('Exif.Photo.FNumber' in keys)
+        self.failUnless('Exif.Photo.ISOSpeedRatings' in keys)
+
+        keys.clear()
+        self.assertEqual(keys, [])
+        self.failIf('Exif.Photo.FNumber' in keys)
+
+    def test_list_behaviour(self):
+        keys = KeyList(['Exif.Image.Make', 'Exif.Image.Model'])
+        self.assertEqual(keys[1], 'Exif.Image.Model')
+        self.assertEqual(keys[-1:], ['Exif.Image.Model'])
+        self.assertEqual(keys.index('Exif.Image.Model'), 1)
+        self.assertEqual(keys + ['Iptc.Application2.City'],
+                         ['Exif.Image.Make', 'Exif.Image.Model',
+                          'Iptc.Application2.City'])
+        self.assertEqual(['Iptc.Application2.City'] + keys,
+                         ['Iptc.Application2.City', 'Exif.Image.Make',
+                          'Exif.Image.Model'])
+        self.assertEqual(keys, KeyList(['Exif.Image.Make', 'Exif.Image.Model']))
+        self.failIfEqual(keys, ['Exif.Image.Model', 'Exif.Image.Make'])
+        self.assertEqual(repr(keys), repr(['Exif.Image.Make', 'Exif.Image.Model']))
+
+        # A KeyList is a real list, duplicates included.
+        self.failUnless(isinstance(keys, list))
+        self.assertEqual(json.dumps(keys),
+                         '["Exif.Image.Make", "Exif.Image.Model"]')
+        keys.append('Exif.Image.Make')
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(keys.count('Exif.Image.Make'), 2)
+        keys.remove('Exif.Image.Make')
+        self.failUnless('Exif.Image.Make' in keys)
+        self.assertEqual(list(keys), ['Exif.Image.Model', 'Exif.Image.Make'])
+        keys.sort()
+        self.assertEqual(list(keys), ['Exif.Image.Make', 'Exif.Image.Model'])
+        self.assertEqual(keys.pop(), 'Exif.Image.Model')
+        self.assertEqual(keys.pop(), 'Exif.Image.Make')
+        self.failIf('Exif.Image.Make' in keys)
+        self.assertRaises(IndexError, keys.pop)